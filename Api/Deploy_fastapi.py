@@ -2,18 +2,23 @@
 FastAPI deployment for Medicine Detection, OCR, and Drug Matching.
 This service detects text from prescription images, applies OCR, and 
 matches the extracted text against a structured drug dataset.
+
+Models and the drug catalog are loaded at application startup (or on first
+use), not at import time; /healthz and /readyz report liveness and readiness.
 """
 
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
+import time
+
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, File, Header, Request, UploadFile
+from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import cv2
+import json
 import numpy as np
 import os
 import sys
-import pandas as pd
-from ultralytics import YOLO
-import easyocr
-from rapidfuzz import process, fuzz
 
 # Configure paths for the "scr" module and project root
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Current "api" folder
@@ -24,80 +29,199 @@ for path in [SCR_DIR, ROOT_DIR]:
     if path not in sys.path:
         sys.path.insert(0, path)
 
-from scr.text_extraction import extract_text_with_yolo, clean_extracted_texts
-
-# Load YOLO detection model
+from scr.text_extraction import (extract_texts_batch, iter_text_with_yolo, recognize_crops,
+                                 clean_extracted_texts, clean_arabic_texts)
+from scr.image_processing import decode_image
+from scr.detector import load_detector
+from scr.ocr_recognizer import create_reader
+from scr.script_routing import create_routed_reader
+from scr.catalog_manager import CatalogManager
+from scr.inference_pool import InferencePool, QueueFullError
+from scr.micro_batcher import MicroBatcher
+from scr.result_cache import ResultCache, content_hash, perceptual_hash
+from scr.lifecycle import ServiceLifecycle
+from scr.match_memo import MatchMemo
+from scr.metrics import MATCHES_PER_IMAGE, callback, collect, histogram, render as render_metrics, span, timings_ms
+
+# YOLO detection model and its inference backend: "pytorch", "onnx" (FP32) or
+# "onnx-int8" (static INT8), exported with python -m scr.detector_export
 MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
-det_model = YOLO(MODEL_PATH)
-
-# Initialize OCR reader (supports English and Arabic)
-ocr_reader = easyocr.Reader(["en", "ar"])
-
-# Load drug dataset (CSV)
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "pytorch")
+
+# Run a synthetic inference at startup so the first real request is not slow
+WARMUP_ENABLED = True
+
+# Maximum number of images accepted by one /predict_medicine/batch request
+MAX_BATCH_IMAGES = 16
+
+# Inference worker pool: blocking YOLO/OCR/matching runs off the event loop.
+# Once all workers are busy and INFERENCE_QUEUE_SIZE requests are waiting,
+# new requests get an immediate 503 with a Retry-After header.
+INFERENCE_WORKERS = 2
+INFERENCE_QUEUE_SIZE = 8
+INFERENCE_USE_PROCESSES = False
+RETRY_AFTER_SECONDS = 2
+
+# Dynamic micro-batching of concurrent /predict_medicine requests: requests are
+# collected for up to MICRO_BATCH_WINDOW_MS (or MICRO_BATCH_MAX_SIZE requests)
+# and run through YOLO and OCR as one batch
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_MAX_SIZE = 8
+MICRO_BATCH_WINDOW_MS = 10
+
+# Content-addressed cache of pipeline results (LRU + TTL + memory cap). Set
+# RESULT_CACHE_DISK_PATH to keep entries across restarts, and
+# RESULT_CACHE_PHASH_DISTANCE >= 0 to also serve near-duplicate images.
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_MAX_MB = 64
+RESULT_CACHE_TTL_SECONDS = 3600
+RESULT_CACHE_DISK_PATH = None
+RESULT_CACHE_PHASH_DISTANCE = -1
+
+# Recognize YOLO boxes directly (batched, without EasyOCR's own text detector)
+OCR_RECOGNIZE_ONLY = False
+
+# OCR recognizer backend: "fp32", "int8" (EasyOCR's dynamic quantization, the
+# default), "onnx" or "onnx-int8" (ONNX Runtime, exported to OCR_RECOGNIZER_ONNX_PATH
+# on first use). Check a change with python -m benchmarks.ocr_recognizer.
+OCR_RECOGNIZER = os.environ.get("OCR_RECOGNIZER", "int8")
+OCR_RECOGNIZER_ONNX_PATH = os.path.join(ROOT_DIR, "models", "ocr_recognizer.onnx")
+
+# Script routing: text regions are detected once, recognized by the English-only
+# reader, and only regions it is not confident about (Arabic, mixed, unreadable)
+# are recognized again by the English+Arabic reader. Off until
+# python -m benchmarks.script_routing shows a gain on real crops. Arabic text is
+# matched through transliteration either way.
+OCR_SCRIPT_ROUTING = False
+OCR_ROUTING_MIN_CONFIDENCE = 0.5
+
+# Uploads are decoded at reduced resolution (JPEG DCT scaling), made upright from
+# their EXIF orientation and capped at IMAGE_MAX_SIDE pixels for OCR crops;
+# detection runs on a copy scaled to DETECTION_SIZE
+IMAGE_MAX_SIDE = 2048
+DETECTION_SIZE = 640
+
+# Drug dataset (CSV) and its compiled, memory-mapped form (python -m scr.drug_catalog CSV OUTPUT).
+# The compiled file is used when it is up to date, so workers skip CSV parsing and share its pages.
 CSV_PATH = os.path.join(ROOT_DIR, "dataset", "durg.csv")
-data = pd.read_csv(CSV_PATH, on_bad_lines='skip')  # Skip problematic rows
-data = data.fillna("")  # Replace NaN values with empty strings
-
-# Convert dataset to dictionary format for easier lookup
-DRUG_DICTIONARY = data.to_dict(orient="records")
+CATALOG_PATH = os.path.join(ROOT_DIR, "dataset", "durg.catalog")
 
 # Threshold for drug name matching accuracy
 MATCH_THRESHOLD = 60
 
+# Batched (vectorized) scoring of all OCR tokens and its worker thread count
+MATCH_BATCHED = True
+MATCH_WORKERS = -1
+
+# Matching cascade: packaging words are dropped and exact names looked up before
+# fuzzy scoring (same matches; per-tier counts in /metrics)
+MATCH_CASCADE = True
+
+# Trigram candidate prefilter for large catalogs (top-K per token)
+MATCH_PREFILTER_K = 500
+MATCH_PREFILTER_MIN_SIZE = 20000
+
+# Memo of fuzzy-scored tokens shared by all API and inference worker processes
+# through one SQLite file (bounded, least recently used dropped); entries are
+# keyed by catalog version, and a worker drops the version it replaces on reload
+MATCH_MEMO_ENABLED = True
+MATCH_MEMO_PATH = os.environ.get("MATCH_MEMO_PATH", os.path.join(ROOT_DIR, "dataset", "match_memo.sqlite"))
+MATCH_MEMO_MAX_ENTRIES = 100000
+
+# Catalog hot reload: the CSV is checked for changes every CATALOG_RELOAD_POLL_SECONDS
+# (0 disables the watcher; POST /admin/reload_catalog reloads on demand). When at most
+# CATALOG_INCREMENTAL_MAX_CHANGED of the rows changed, the index is updated incrementally.
+CATALOG_RELOAD_POLL_SECONDS = 30
+CATALOG_INCREMENTAL_MAX_CHANGED = 0.05
+
+# Token required in the X-Admin-Token header of admin endpoints (unset: no check)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Prediction endpoints add a per-request stage timing breakdown ("timings_ms")
+# to their response when called with ?debug=true; /metrics serves the
+# Prometheus metrics either way
+DEBUG_TIMINGS_ENABLED = True
+
+
+
+def load_det_model():
+    """
+    Load the YOLO detection model.
+
+    Returns:
+        YOLO: An initialized YOLO model ready for inference.
+    """
+    return load_detector(MODEL_PATH, DETECTOR_BACKEND)
+
 
-def match_drug_names(cleaned_texts, dictionary=DRUG_DICTIONARY, threshold=MATCH_THRESHOLD):
+def load_ocr_reader():
+    """
+    Initialize the OCR reader (supports English and Arabic). The detector network
+    is only needed when EasyOCR detects text inside each crop itself.
+
+    Returns:
+        easyocr.Reader: An OCR reader instance.
+    """
+    if OCR_SCRIPT_ROUTING:
+        return create_routed_reader(["en", "ar"], detector=not OCR_RECOGNIZE_ONLY, mode=OCR_RECOGNIZER,
+                                    onnx_path=OCR_RECOGNIZER_ONNX_PATH,
+                                    min_confidence=OCR_ROUTING_MIN_CONFIDENCE)
+    return create_reader(["en", "ar"], detector=not OCR_RECOGNIZE_ONLY, mode=OCR_RECOGNIZER,
+                         onnx_path=OCR_RECOGNIZER_ONNX_PATH)
+
+
+# Versioned drug catalog and matching index, swapped atomically on reload
+catalog = CatalogManager(
+    CSV_PATH,
+    CATALOG_PATH,
+    prefilter_k=MATCH_PREFILTER_K,
+    prefilter_min_size=MATCH_PREFILTER_MIN_SIZE,
+    poll_seconds=CATALOG_RELOAD_POLL_SECONDS,
+    incremental_max_changed=CATALOG_INCREMENTAL_MAX_CHANGED
+)
+
+
+# Heavy resources are created at startup (or on first use), not at import time
+lifecycle = ServiceLifecycle()
+det_model = lifecycle.resource("det_model", load_det_model)
+ocr_reader = lifecycle.resource("ocr_reader", load_ocr_reader)
+lifecycle.resource("drug_catalog", catalog.get)
+match_memo = MatchMemo(MATCH_MEMO_PATH, MATCH_MEMO_MAX_ENTRIES) if MATCH_MEMO_ENABLED else None
+if match_memo is not None:
+    catalog.add_listener(lambda snapshot: match_memo.switch(snapshot.index.memo_namespace))
+
+
+def match_drug_names(cleaned_texts, index=None, threshold=MATCH_THRESHOLD, arabic_texts=None, record=True):
     """
     Match OCR-extracted texts against the drug dictionary.
 
     Args:
         cleaned_texts (list[str]): List of cleaned OCR text strings.
-        dictionary (list[dict]): List of drug records (converted from CSV).
+        index (DrugIndex, optional): Prebuilt index over the drug records. Defaults to
+            the index of the current catalog version.
         threshold (int): Minimum similarity score required for a match.
+        arabic_texts (list[str], optional): Arabic OCR texts, matched through transliteration.
+        record (bool, optional): Count the matches in the per-image match histogram;
+            False for the partial texts of one streamed box. Defaults to True.
 
     Returns:
         list[dict]: List of matched drug records with details.
     """
-    if not dictionary:
-        return []
-
-    # Build a lookup dictionary: lowercase name → drug record
-    drug_lookup = {}
-    for drug in dictionary:
-        if "drug_name" in drug and drug["drug_name"]:
-            drug_lookup[drug["drug_name"].lower()] = drug
-
-        # Include substitute names if available
-        for k, v in drug.items():
-            if k.lower().startswith("substitute") and v:
-                drug_lookup[v.lower()] = drug
-
-    search_space = list(drug_lookup.keys())
-
-    # Perform fuzzy matching on OCR results
-    matches = []
-    for word in cleaned_texts:
-        word_lower = word.lower().strip()
-        result = process.extractOne(word_lower, search_space, scorer=fuzz.token_sort_ratio)
-        if result:
-            match_name, score, _ = result
-            if score >= threshold:
-                drug_info = drug_lookup[match_name]
-                matches.append({
-                    "extracted_word": word,
-                    "matched_name": match_name,
-                    "score": score,
-                    "details": map_to_final_schema(drug_info)
-                })
-
-    # Remove duplicates (keep the first occurrence)
-    unique_matches = []
-    seen = set()
-    for m in matches:
-        if m["matched_name"] not in seen:
-            unique_matches.append(m)
-            seen.add(m["matched_name"])
-
-    return unique_matches
+    if index is None:
+        index = catalog.get().index
+
+    # Perform fuzzy matching on OCR results (duplicates are already removed,
+    # keeping the first occurrence)
+    with span("match"):
+        matches = index.match(cleaned_texts, threshold, batched=MATCH_BATCHED, workers=MATCH_WORKERS,
+                              arabic_tokens=arabic_texts, cascade=MATCH_CASCADE, memo=match_memo)
+        for m in matches:
+            m["details"] = map_to_final_schema(m["details"])
+
+    if record:
+        MATCHES_PER_IMAGE.observe(len(matches))
+    return matches
 
 
 def map_to_final_schema(details):
@@ -124,12 +248,344 @@ def map_to_final_schema(details):
     }
 
 
-# Initialize FastAPI application
+def decode_upload(contents: bytes):
+    """
+    Decode one uploaded image, treating any decoding error as an undecodable image.
+
+    Args:
+        contents (bytes): Encoded image bytes.
+
+    Returns:
+        np.ndarray | None: The decoded image, or None.
+    """
+    try:
+        return decode_image(contents, IMAGE_MAX_SIDE)
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return None
+
+
+def predict_images(images_bytes: List[bytes]) -> List[dict]:
+    """
+    Run the pipeline on several encoded images with batched detection and OCR (blocking).
+
+    Images already in the result cache (by decoded-pixel hash, or perceptual
+    hash when enabled) are answered from it and skip the pipeline. The whole
+    batch is matched against one catalog version, even if a reload swaps in a
+    new one meanwhile.
+
+    Every result carries a "timings_ms" breakdown: the batch-wide stages
+    (decode, cache, detect, ocr) shared by the batch, its own clean and match
+    stages, the pipeline total and the batch size. Handlers drop it unless
+    debugging; cached entries never contain it.
+
+    Args:
+        images_bytes (List[bytes]): Encoded image bytes.
+
+    Returns:
+        List[dict]: OCR texts, matches and catalog version of each image, in input
+                    order. Images that cannot be decoded get an error entry instead.
+    """
+    start = time.perf_counter()
+    with collect() as timings:
+        snapshot = catalog.get()
+
+        # Decode all images into OpenCV format (reduced, upright and capped); a bad
+        # image only gets its own error entry, not the rest of the batch
+        with span("decode"):
+            images = [decode_upload(contents) for contents in images_bytes]
+
+        results = [None] * len(images)
+        cache_keys = [None] * len(images)
+        with span("cache"):
+            for i, img in enumerate(images):
+                if img is None:
+                    results[i] = {"error": "Could not decode image"}
+                elif result_cache is not None:
+                    # Results depend on the catalog, so each version has its own entries
+                    key = f"{snapshot.version}:{content_hash(img)}"
+                    phash = perceptual_hash(img) if RESULT_CACHE_PHASH_DISTANCE >= 0 else None
+                    cache_keys[i] = (key, phash)
+                    results[i] = result_cache.get(key, phash)
+
+        # Extract texts of all remaining images in one batch
+        pending = [i for i, result in enumerate(results) if result is None]
+        batch_texts = extract_texts_batch(det_model.get(), ocr_reader.get(), [images[i] for i in pending],
+                                          conf_threshold=0.5, recognize_only=OCR_RECOGNIZE_ONLY,
+                                          det_size=DETECTION_SIZE)
+        shared = dict(timings)
+
+        image_timings = [{} for _ in images]
+        for i, texts in zip(pending, batch_texts):
+            with collect() as image_timings[i]:
+                # Clean extracted texts and match them against the drug dataset
+                cleaned_texts = clean_extracted_texts(texts)
+                arabic_texts = clean_arabic_texts(texts)
+                results[i] = {
+                    "ocr_texts": cleaned_texts,
+                    "ocr_texts_ar": arabic_texts,
+                    "matches": match_drug_names(cleaned_texts, index=snapshot.index, arabic_texts=arabic_texts),
+                    "catalog_version": snapshot.version
+                }
+            if cache_keys[i] is not None:
+                key, phash = cache_keys[i]
+                result_cache.put(key, results[i], phash)
+
+    shared["pipeline"] = time.perf_counter() - start
+    return [
+        {**result, "timings_ms": {**timings_ms({**shared, **own}), "batch_size": len(images)}}
+        for result, own in zip(results, image_timings)
+    ]
+
+
+def stream_prediction(contents: bytes):
+    """
+    Run the pipeline on one encoded image and report progress as events (blocking generator).
+
+    Events:
+        - {"event": "boxes", "boxes": [[x1, y1, x2, y2], ...], "catalog_version": ...}
+          once YOLO has run.
+        - {"event": "box", "index": i, "box": [...], "ocr_texts": [...], "ocr_texts_ar": [...],
+          "matches": [...]} as each box is read; matches already reported for an
+          earlier box are not repeated.
+        - {"event": "summary", ...} last: the same result as /predict_medicine
+          (with "cached": true when it came from the result cache).
+        - {"event": "error", "error": ...} instead, when the image cannot be decoded.
+
+    Args:
+        contents (bytes): Encoded image bytes.
+
+    Yields:
+        dict: Pipeline events, in order.
+    """
+    snapshot = catalog.get()
+
+    image = decode_upload(contents)
+    if image is None:
+        yield {"event": "error", "error": "Could not decode image"}
+        return
+
+    key = phash = None
+    if result_cache is not None:
+        key = f"{snapshot.version}:{content_hash(image)}"
+        phash = perceptual_hash(image) if RESULT_CACHE_PHASH_DISTANCE >= 0 else None
+        cached = result_cache.get(key, phash)
+        if cached is not None:
+            yield {"event": "summary", **cached, "cached": True}
+            return
+
+    texts = []
+    reported = set()
+    for event in iter_text_with_yolo(det_model.get(), ocr_reader.get(), image, conf_threshold=0.5,
+                                     recognize_only=OCR_RECOGNIZE_ONLY, det_size=DETECTION_SIZE):
+        if event["event"] == "boxes":
+            yield {"event": "boxes", "boxes": [list(box) for box in event["boxes"]],
+                   "catalog_version": snapshot.version}
+            continue
+
+        texts.extend(event["texts"])
+        # Per-image histograms are only recorded for the summary
+        cleaned_texts = clean_extracted_texts(event["texts"], record=False)
+        arabic_texts = clean_arabic_texts(event["texts"], record=False)
+        matches = [m for m in match_drug_names(cleaned_texts, index=snapshot.index, arabic_texts=arabic_texts,
+                                               record=False)
+                   if m["matched_name"] not in reported]
+        reported.update(m["matched_name"] for m in matches)
+        yield {
+            "event": "box",
+            "index": event["index"],
+            "box": list(event["box"]),
+            "ocr_texts": cleaned_texts,
+            "ocr_texts_ar": arabic_texts,
+            "matches": matches
+        }
+
+    # Match all texts together, so the summary equals the non-streaming result
+    cleaned_texts = clean_extracted_texts(texts)
+    arabic_texts = clean_arabic_texts(texts)
+    result = {
+        "ocr_texts": cleaned_texts,
+        "ocr_texts_ar": arabic_texts,
+        "matches": match_drug_names(cleaned_texts, index=snapshot.index, arabic_texts=arabic_texts),
+        "catalog_version": snapshot.version
+    }
+    if key is not None:
+        result_cache.put(key, result, phash)
+    yield {"event": "summary", **result}
+
+
+def format_event(event: dict, sse: bool) -> str:
+    """
+    Serialize a pipeline event for a streaming response.
+
+    Args:
+        event (dict): Event from stream_prediction.
+        sse (bool): Server-Sent Events framing instead of one JSON object per line.
+
+    Returns:
+        str: An NDJSON line, or an SSE message named after the event type.
+    """
+    data = json.dumps(event, ensure_ascii=False)
+    if sse:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def warmup():
+    """
+    Run a synthetic inference through detection, OCR and matching, so that lazy
+    framework initialization happens before the first real request.
+    """
+    image = np.full((640, 640, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "PANADOL", (60, 340), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 8)
+    extract_texts_batch(det_model.get(), ocr_reader.get(), [image], conf_threshold=0.5,
+                        recognize_only=OCR_RECOGNIZE_ONLY, det_size=DETECTION_SIZE)
+
+    # YOLO may find no box on the synthetic image, so also run OCR on the text area
+    crop = image[260:380, 40:600]
+    if OCR_RECOGNIZE_ONLY:
+        recognize_crops(ocr_reader.get(), [crop])
+    else:
+        ocr_reader.get().readtext(crop, detail=0)
+
+    match_drug_names(["panadol"])
+
+
+def with_timings(result: dict, debug: bool, request_seconds: float) -> dict:
+    """
+    Keep or drop the timing breakdown of a pipeline result.
+
+    Args:
+        result (dict): Result of predict_images (with "timings_ms").
+        debug (bool): Keep the breakdown (only when DEBUG_TIMINGS_ENABLED).
+        request_seconds (float): Time the handler spent on the request so far.
+
+    Returns:
+        dict: The result without "timings_ms", or with it completed by the request
+              time and the wait before the pipeline ran (micro-batch window and queue).
+    """
+    result = dict(result)
+    timings = result.pop("timings_ms", None)
+    if debug and DEBUG_TIMINGS_ENABLED and timings is not None:
+        request_ms = round(request_seconds * 1000, 2)
+        result["timings_ms"] = {
+            **timings,
+            "request": request_ms,
+            "wait": round(max(0.0, request_ms - timings.get("pipeline", 0.0)), 2)
+        }
+    return result
+
+
+def busy_response(error: QueueFullError) -> JSONResponse:
+    """
+    Build the fast rejection returned when the inference queue is full.
+
+    Args:
+        error (QueueFullError): The rejection raised by the inference pool.
+
+    Returns:
+        JSONResponse: 503 response with a Retry-After header.
+    """
+    return JSONResponse(
+        {"error": "Server is busy, please retry later"},
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+# Initialize FastAPI application, the result cache and the inference worker pool
 app = FastAPI(title="Medicine Detection + OCR + Matcher")
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+    disk_path=RESULT_CACHE_DISK_PATH,
+    phash_distance=RESULT_CACHE_PHASH_DISTANCE
+) if RESULT_CACHE_ENABLED else None
+inference_pool = InferencePool(
+    max_workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_QUEUE_SIZE,
+    use_processes=INFERENCE_USE_PROCESSES,
+    retry_after=RETRY_AFTER_SECONDS
+)
+micro_batcher = MicroBatcher(
+    predict_images,
+    inference_pool,
+    max_batch_size=MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=MICRO_BATCH_WINDOW_MS
+)
+if result_cache is not None:
+    # Entries of older catalog versions can no longer be hit
+    catalog.add_listener(lambda snapshot: result_cache.clear())
+
+
+# ===== Prometheus metrics =====
+# Stage histograms, box/token/match counts come from scr.metrics; the service
+# state below is read from the existing stats() at scrape time
+REQUEST_SECONDS = histogram("dawak_http_request_seconds", "HTTP request latency by route and status.",
+                            ["method", "route", "status"])
+
+
+def _result_cache_stats():
+    return result_cache.stats() if result_cache is not None else None
+
+
+def _ocr_routing_stats():
+    reader = ocr_reader.get() if ocr_reader.loaded else None
+    return reader.stats() if hasattr(reader, "stats") else None
+
+
+callback("dawak_result_cache_lookups_total", "Result cache lookups by outcome.",
+         lambda: {k: v for k, v in (_result_cache_stats() or {}).items()
+                  if k in ("hits", "near_hits", "disk_hits", "misses")} or None,
+         ["result"], kind="counter")
+callback("dawak_result_cache_hit_ratio", "Share of result cache lookups that were served from the cache.",
+         lambda: (_result_cache_stats() or {}).get("hit_ratio"))
+callback("dawak_result_cache_entries", "Entries in the result cache.",
+         lambda: (_result_cache_stats() or {}).get("entries"))
+callback("dawak_result_cache_bytes", "Memory used by result cache entries.",
+         lambda: (_result_cache_stats() or {}).get("bytes"))
+callback("dawak_inference_jobs", "Inference jobs running or waiting in the pool.",
+         lambda: {k: v for k, v in inference_pool.stats().items() if k in ("running", "queued")},
+         ["state"])
+callback("dawak_inference_completed_total", "Inference jobs completed by the pool.",
+         lambda: inference_pool.stats()["completed"], kind="counter")
+callback("dawak_inference_rejected_total", "Inference jobs rejected because the queue was full.",
+         lambda: inference_pool.stats()["rejected"], kind="counter")
+callback("dawak_micro_batch_mean_size", "Mean size of the micro-batches run so far.",
+         lambda: micro_batcher.stats()["mean_batch_size"])
+callback("dawak_match_memo_hit_ratio", "Share of match memo lookups answered without fuzzy scoring.",
+         lambda: match_memo.stats()["hit_ratio"] if match_memo is not None else None)
+callback("dawak_ocr_routed_crops_total", "OCR crops kept by the English reader or sent to the fallback reader.",
+         _ocr_routing_stats, ["reader"], kind="counter")
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe the latency of every request, labelled by its route template."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                            route=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
+
+
+@app.on_event("startup")
+def start_lifecycle():
+    """Load models and the catalog in the background, then warm them up."""
+    lifecycle.start(warmup=warmup if WARMUP_ENABLED else None)
+
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    """Release the inference workers and stop the catalog watcher when the server stops."""
+    inference_pool.shutdown()
+    catalog.stop()
 
 
 @app.post("/predict_medicine")
-async def predict_medicine(file: UploadFile = File(...)):
+async def predict_medicine(file: UploadFile = File(...), debug: bool = False):
     """
     Predict medicines from a prescription image.
 
@@ -140,32 +596,209 @@ async def predict_medicine(file: UploadFile = File(...)):
         4. Match texts against drug dictionary.
         5. Return structured results in JSON format.
 
+    Steps 1-4 run in the inference worker pool, so the event loop stays free
+    for other connections. With micro-batching enabled, concurrent requests
+    are grouped and processed as one batch.
+
     Args:
         file (UploadFile): Uploaded prescription image.
+        debug (bool): Add the stage timing breakdown ("timings_ms") to the response.
 
     Returns:
-        JSONResponse: OCR text results and matched drug information.
+        JSONResponse: OCR text results and matched drug information, or a 503
+                      response when the inference queue is full.
     """
+    start = time.perf_counter()
     contents = await file.read()
 
-    # Decode image into OpenCV format
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-    # Extract texts using YOLO detection and OCR
-    texts = extract_text_with_yolo(det_model, ocr_reader, img, conf_threshold=0.5)
-    cleaned_texts = clean_extracted_texts(texts)
+    try:
+        if MICRO_BATCH_ENABLED:
+            result = await micro_batcher.submit(contents)
+        else:
+            result = (await inference_pool.run(predict_images, [contents]))[0]
+    except QueueFullError as e:
+        return busy_response(e)
 
-    # Match extracted texts against drug dataset
-    matches = match_drug_names(cleaned_texts)
+    result = with_timings(result, debug, time.perf_counter() - start)
+    if "error" in result:
+        return JSONResponse(result, status_code=400)
 
     # Return results as JSON
+    return JSONResponse(content=result)
+
+
+@app.post("/predict_medicine/batch")
+async def predict_medicine_batch(files: List[UploadFile] = File(...), debug: bool = False):
+    """
+    Predict medicines from several images in one request.
+
+    Detection runs on all decodable images as one batched YOLO call and OCR
+    runs on all of their crops together; matching is done per image.
+
+    Args:
+        files (List[UploadFile]): Uploaded images (at most MAX_BATCH_IMAGES).
+        debug (bool): Add the stage timing breakdown ("timings_ms") to each result.
+
+    Returns:
+        JSONResponse: Per-image OCR texts and matches, in upload order. Images that
+                      cannot be decoded get an error entry instead.
+    """
+    if len(files) > MAX_BATCH_IMAGES:
+        return JSONResponse(
+            {"error": f"Too many images: {len(files)} (maximum is {MAX_BATCH_IMAGES})"},
+            status_code=400
+        )
+
+    start = time.perf_counter()
+    images_bytes = [await file.read() for file in files]
+
+    try:
+        results = await inference_pool.run(predict_images, images_bytes)
+    except QueueFullError as e:
+        return busy_response(e)
+
+    request_seconds = time.perf_counter() - start
     return JSONResponse(content={
-        "ocr_texts": cleaned_texts,
-        "matches": matches
+        "results": [{"filename": file.filename, **with_timings(result, debug, request_seconds)}
+                    for file, result in zip(files, results)]
     })
 
 
+@app.post("/predict_medicine/stream")
+async def predict_medicine_stream(file: UploadFile = File(...), format: str = "ndjson"):
+    """
+    Predict medicines from a prescription image, streaming results as they are found.
+
+    The detected boxes are sent as soon as YOLO has run, then each box's OCR
+    texts and new drug matches as it is recognized, then a summary equal to
+    the /predict_medicine result (see stream_prediction for the events). The
+    pipeline runs in the inference worker pool, without micro-batching.
+
+    Args:
+        file (UploadFile): Uploaded prescription image.
+        format (str): "ndjson" (application/x-ndjson, one JSON event per line) or
+                      "sse" (text/event-stream).
+
+    Returns:
+        StreamingResponse: The event stream, or a JSONResponse with 400 for an unknown
+                           format, 501 when the inference pool uses worker processes
+                           (INFERENCE_USE_PROCESSES) and 503 when the inference queue
+                           is full.
+    """
+    if format not in ("ndjson", "sse"):
+        return JSONResponse({"error": f"Unknown format {format!r}, expected 'ndjson' or 'sse'"}, status_code=400)
+    if inference_pool.use_processes:
+        # The pipeline generator cannot be streamed back from a worker process
+        return JSONResponse({"error": "Streaming is not available when inference runs in worker processes; "
+                                      "use /predict_medicine"}, status_code=501)
+
+    contents = await file.read()
+    events = inference_pool.iterate(stream_prediction, contents)
+
+    # Admission happens on the first event, before the response starts
+    try:
+        first = await events.__anext__()
+    except QueueFullError as e:
+        return busy_response(e)
+
+    sse = format == "sse"
+
+    async def body():
+        try:
+            yield format_event(first, sse)
+            async for event in events:
+                yield format_event(event, sse)
+        finally:
+            # Stops the worker early when the client disconnects
+            await events.aclose()
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Report the service's runtime state.
+
+    Returns:
+        dict: Inference pool workers, running and queued requests, and counters,
+              the micro-batching batch-size distribution, result cache counters,
+              the catalog version and reload state, and OCR script routing counters.
+    """
+    reader = ocr_reader.get() if ocr_reader.loaded else None
+    return {
+        "inference": inference_pool.stats(),
+        "micro_batching": micro_batcher.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "catalog": catalog.status(),
+        "ocr_routing": reader.stats() if hasattr(reader, "stats") else None
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint.
+
+    Returns:
+        PlainTextResponse: Stage latency and per-image count histograms, request
+                           latency, result cache, inference pool, micro-batching and
+                           OCR routing metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload_catalog")
+async def reload_catalog(force: bool = False, x_admin_token: str = Header(None)):
+    """
+    Reload the drug catalog in the background and swap it in when built.
+
+    Requests already running finish on the current version; later requests
+    use the new one.
+
+    Args:
+        force (bool): Rebuild even if the CSV content is unchanged.
+        x_admin_token (str): Must match ADMIN_TOKEN when it is set.
+
+    Returns:
+        JSONResponse: 202 when the reload started, 409 if one is already running,
+                      403 for a wrong token; with the current catalog status.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"error": "Invalid admin token"}, status_code=403)
+
+    if not catalog.reload_in_background(force=force):
+        return JSONResponse({"error": "A catalog reload is already running", **catalog.status()}, status_code=409)
+    return JSONResponse(catalog.status(), status_code=202)
+
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+        dict: Static OK status.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: models and catalog are loaded and warm.
+
+    Returns:
+        JSONResponse: 200 when ready, 503 otherwise, with import, load and warmup timings.
+    """
+    status = lifecycle.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+lifecycle.import_seconds = time.perf_counter() - _IMPORT_START
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("Deploy_fastapi:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,14 +1,47 @@
 import os
-import tempfile
-import json
+import sys
 from dotenv import load_dotenv
 import google.generativeai as genai
 from fastapi import FastAPI, UploadFile, File
 from fastapi.responses import JSONResponse
 
+# Configure the project root so the "scr" package can be imported
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from scr.inference_pool import QueueFullError
+from scr.result_cache import ResultCache
+from scr.generative_client import AsyncGenerativeClient, FakeGenerativeBackend, InvalidModelResponse
+
 # Load environment variables from the .env file
 load_dotenv()
 
+# Concurrent Gemini calls. Once GEMINI_MAX_CONCURRENCY calls are running and
+# GEMINI_QUEUE_SIZE requests are waiting, new requests get an immediate 503.
+# Identical in-flight requests share one call.
+GEMINI_MAX_CONCURRENCY = 4
+GEMINI_QUEUE_SIZE = 16
+RETRY_AFTER_SECONDS = 2
+
+# Retries of transient Gemini errors (rate limiting, timeouts, 5xx), with
+# jittered exponential backoff
+GEMINI_MAX_ATTEMPTS = 3
+GEMINI_BACKOFF_BASE_SECONDS = 0.5
+GEMINI_BACKOFF_MAX_SECONDS = 8
+
+# Set GEMINI_FAKE_LATENCY_MS to serve answers from a local fake model with that
+# latency (no API key or network needed, e.g. for load tests)
+GEMINI_FAKE_LATENCY_MS = os.getenv("GEMINI_FAKE_LATENCY_MS")
+
+# Cache of parsed model responses, keyed by a hash of the uploaded bytes
+# (LRU + TTL + memory cap; set ANALYZE_CACHE_DISK_PATH to persist across restarts)
+ANALYZE_CACHE_ENABLED = True
+ANALYZE_CACHE_MAX_ENTRIES = 1024
+ANALYZE_CACHE_MAX_MB = 32
+ANALYZE_CACHE_TTL_SECONDS = 24 * 3600
+ANALYZE_CACHE_DISK_PATH = None
+
 
 class MedPrescriptionAssistant:
     """
@@ -32,32 +65,64 @@ class MedPrescriptionAssistant:
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
 
-    def get_response(self, file_path: str, prompt: str) -> str:
+    def get_response(self, image_bytes: bytes, prompt: str, mime_type: str = "image/jpeg") -> str:
+        """
+        Send an image to the model inline, along with a prompt.
+
+        The image bytes are embedded in the request, so nothing is written to
+        disk and no separate file upload/delete round trip is needed.
+
+        Args:
+            image_bytes (bytes): Raw (encoded) image data.
+            prompt (str): Instructional text for the model.
+            mime_type (str, optional): MIME type of the image. Defaults to "image/jpeg".
+
+        Returns:
+            str: The generated response text from the model.
+        """
+        image_part = {"mime_type": mime_type, "data": image_bytes}
+        response = self.model.generate_content([image_part, prompt])
+        return response.text.strip()
+
+    async def get_response_async(self, image_bytes: bytes, prompt: str, mime_type: str = "image/jpeg") -> str:
         """
-        Upload a file and send it to the model along with a prompt.
+        Async version of get_response (does not block the event loop).
 
         Args:
-            file_path (str): Path to the file to be uploaded.
+            image_bytes (bytes): Raw (encoded) image data.
             prompt (str): Instructional text for the model.
+            mime_type (str, optional): MIME type of the image. Defaults to "image/jpeg".
 
         Returns:
             str: The generated response text from the model.
         """
-        uploaded_file = genai.upload_file(file_path)
-        try:
-            response = self.model.generate_content([uploaded_file, prompt])
-            return response.text.strip()
-        finally:
-            # Attempt to clean up the uploaded file on Google's side
-            try:
-                genai.delete_file(uploaded_file.name)
-            except Exception as delete_err:
-                print("Failed to delete file:", delete_err)
-
-
-# Initialize FastAPI application
+        image_part = {"mime_type": mime_type, "data": image_bytes}
+        response = await self.model.generate_content_async([image_part, prompt])
+        return response.text.strip()
+
+
+# Initialize FastAPI application and the Gemini client layer
 app = FastAPI(title="Gemini Prescription API")
-assistant = MedPrescriptionAssistant(model_name="gemini-2.5-flash")
+if GEMINI_FAKE_LATENCY_MS:
+    backend = FakeGenerativeBackend(latency_ms=float(GEMINI_FAKE_LATENCY_MS))
+else:
+    backend = MedPrescriptionAssistant(model_name="gemini-2.5-flash").get_response_async
+analyze_cache = ResultCache(
+    max_entries=ANALYZE_CACHE_MAX_ENTRIES,
+    max_bytes=ANALYZE_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=ANALYZE_CACHE_TTL_SECONDS,
+    disk_path=ANALYZE_CACHE_DISK_PATH
+) if ANALYZE_CACHE_ENABLED else None
+gemini_client = AsyncGenerativeClient(
+    backend,
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    max_queue=GEMINI_QUEUE_SIZE,
+    retry_after=RETRY_AFTER_SECONDS,
+    max_attempts=GEMINI_MAX_ATTEMPTS,
+    backoff_base=GEMINI_BACKOFF_BASE_SECONDS,
+    backoff_max=GEMINI_BACKOFF_MAX_SECONDS,
+    cache=analyze_cache
+)
 
 
 @app.post("/analyze")
@@ -70,13 +135,13 @@ async def analyze(file: UploadFile = File(...)):
 
     Returns:
         JSONResponse: A response containing extracted details in JSON format,
-                      or an error message if the response is invalid.
+                      or an error message if the response is invalid, or a 503
+                      response when the Gemini wait queue is full.
     """
     try:
-        # Save uploaded file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-            tmp_file.write(await file.read())
-            tmp_path = tmp_file.name
+        # Keep the uploaded image in memory
+        image_bytes = await file.read()
+        mime_type = file.content_type or "image/jpeg"
 
         # Instructional prompt for the model
         prompt_text = (
@@ -100,34 +165,41 @@ async def analyze(file: UploadFile = File(...)):
             "IMPORTANT: Return ONLY raw JSON (no markdown, no explanation, no code block)."
         )
 
-        # Get model output
-        raw_result = assistant.get_response(tmp_path, prompt_text)
-
-        # Clean response if wrapped with code block markers
-        cleaned = raw_result.strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.strip("`")
-            if cleaned.lower().startswith("json"):
-                cleaned = cleaned[4:].strip()
-
-        # Validate the JSON structure
-        try:
-            parsed = json.loads(cleaned)
-        except Exception:
-            return JSONResponse(
-                {"error": "Invalid JSON returned from model", "raw_response": raw_result},
-                status_code=500
-            )
-
+        # Get the parsed model output (cached by image hash, identical in-flight
+        # requests coalesced, concurrency limited, transient errors retried)
+        parsed = await gemini_client.generate_json(image_bytes, prompt_text, mime_type=mime_type)
         return JSONResponse({"response": parsed})
 
+    except InvalidModelResponse as e:
+        return JSONResponse(
+            {"error": "Invalid JSON returned from model", "raw_response": e.raw_response},
+            status_code=500
+        )
+
+    except QueueFullError as e:
+        return JSONResponse(
+            {"error": "Server is busy, please retry later"},
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
-    finally:
-        # Ensure temporary file is always removed
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+
+@app.get("/stats")
+async def stats():
+    """
+    Report the service's runtime state.
+
+    Returns:
+        dict: Gemini client load and counters (cache hits, coalesced requests,
+              backend calls, retries), and response cache counters.
+    """
+    return {
+        "gemini": gemini_client.stats(),
+        "result_cache": analyze_cache.stats() if analyze_cache is not None else None
+    }
 
 
 if __name__ == "__main__":
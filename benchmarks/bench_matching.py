@@ -0,0 +1,88 @@
+"""
+Matching Micro-benchmark
+
+Compares the per-token extractOne loop with the batched cdist mode of
+DrugIndex.match, each with and without the matching cascade, and the cascade
+with a warm match memo (tokens already scored by an earlier request), checks
+that all modes return identical matches, and reports the share of tokens
+resolved by each cascade tier.
+
+Token mixes:
+    ocr  - noisy drug names, substitutes and packaging words (0-3 edits each)
+    box  - clean boxes: mostly exact names and packaging words
+
+Usage:
+    python -m benchmarks.bench_matching [--tokens 30 80] [--mix ocr box] [--catalog-size N] [--workers -1]
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import best_of, box_tokens, load_records, ocr_tokens, synthetic_records
+from scr.drug_index import DrugIndex
+from scr.match_cascade import TIERS
+from scr.match_memo import MatchMemo
+
+MIXES = {"ocr": ocr_tokens, "box": box_tokens}
+
+
+def tier_shares(index: DrugIndex, tokens, threshold: float, batched: bool, workers: int) -> str:
+    """Share of the tokens resolved by each cascade tier in one match call."""
+    before = index.cascade().stats()
+    index.match(tokens, threshold, batched=batched, workers=workers, cascade=True)
+    after = index.cascade().stats()
+    counts = {tier: after[tier]["tokens"] - before[tier]["tokens"] for tier in TIERS}
+    total = sum(counts.values()) or 1
+    return "  ".join(f"{tier} {counts[tier] / total:5.1%}" for tier in TIERS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-token vs batched drug matching benchmark")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[30, 80], help="OCR token counts to test")
+    parser.add_argument("--mix", nargs="+", choices=list(MIXES), default=list(MIXES), help="Token mixes to test")
+    parser.add_argument("--catalog-size", type=int, default=0, help="Grow the catalog synthetically to N rows")
+    parser.add_argument("--threshold", type=float, default=60)
+    parser.add_argument("--workers", type=int, default=-1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = load_records()
+    if args.catalog_size > len(records):
+        records = synthetic_records(records, args.catalog_size)
+    index = DrugIndex(records, version="bench")
+    memo_dir = tempfile.TemporaryDirectory()
+    memo = MatchMemo(os.path.join(memo_dir.name, "match_memo.sqlite"))
+    print(f"Catalog: {len(index)} records, {len(index.choices)} choices")
+
+    modes = {
+        "loop": dict(),
+        "batched": dict(batched=True, workers=args.workers),
+        "cascade": dict(cascade=True),
+        "cascade+batched": dict(batched=True, workers=args.workers, cascade=True),
+        "cascade+memo": dict(batched=True, workers=args.workers, cascade=True, memo=memo),
+    }
+    print(f"{'mix':>4} {'tokens':>6} " + " ".join(f"{name + ' ms':>18}" for name in modes))
+    tiers = []
+    for mix in args.mix:
+        for count in args.tokens:
+            tokens = MIXES[mix](records, count)
+            expected = index.match(tokens, args.threshold)
+            for name, kwargs in modes.items():
+                if index.match(tokens, args.threshold, **kwargs) != expected:
+                    raise SystemExit(f"{name} results differ from the per-token loop ({mix}, {count} tokens)")
+
+            times = [best_of(lambda: index.match(tokens, args.threshold, **kwargs), args.repeat)
+                     for kwargs in modes.values()]
+            print(f"{mix:>4} {count:>6} " + " ".join(f"{ms:>18.2f}" for ms in times))
+            tiers.append((mix, count, "per-token", tier_shares(index, tokens, args.threshold, False, args.workers)))
+            tiers.append((mix, count, "batched", tier_shares(index, tokens, args.threshold, True, args.workers)))
+
+    print("\nCascade tier hit rates")
+    for mix, count, mode, shares in tiers:
+        print(f"{mix:>4} {count:>6} {mode:<9}  {shares}")
+    memo_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Catalog Memory and Load-Time Report
+
+Compares ways of holding a synthetic drug catalog in a worker process:
+    - dicts:  one dict per row (what ``to_dict(orient="records")`` produced)
+    - pandas: ``read_csv`` + ``to_dict(orient="records")`` (skipped when pandas is missing)
+    - csv:    DrugCatalog parsed from the CSV (column-oriented)
+    - mmap:   DrugCatalog memory-mapped from the compiled file
+
+Each mode runs in a fresh subprocess that loads the catalog, reads every
+drug name, and reports the load time and the growth of its anonymous (private)
+and file-backed resident memory. File-backed pages of the mapped catalog come
+from the page cache and are shared by every worker mapping the same file.
+
+Usage:
+    python -m benchmarks.catalog_memory [--catalog-size 500000] [--workdir /tmp]
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ROOT_DIR, load_records, synthetic_records
+from scr.drug_catalog import DrugCatalog
+
+MODES = ["dicts", "pandas", "csv", "mmap"]
+
+
+def memory_kb() -> dict:
+    """Anonymous and file-backed resident memory of this process (KiB), from /proc."""
+    out = {"RssAnon": 0, "RssFile": 0}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in out:
+                out[key] = int(line.split()[1])
+    return out
+
+
+def load(mode: str, csv_path: str, compiled_path: str):
+    """Load the catalog in the given mode."""
+    if mode == "dicts":
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            records = list(csv.DictReader(f))
+    elif mode == "pandas":
+        import pandas as pd
+        records = pd.read_csv(csv_path, on_bad_lines="skip").fillna("").to_dict(orient="records")
+    elif mode == "csv":
+        records = DrugCatalog.from_csv(csv_path)
+    else:
+        records = DrugCatalog.load(compiled_path)
+    return records
+
+
+def worker(mode: str, csv_path: str, compiled_path: str) -> None:
+    """Measure one mode in this process and print the result as JSON."""
+    if mode == "pandas":
+        import pandas  # noqa: F401  (import cost is not part of the load time)
+    before = memory_kb()
+    start = time.perf_counter()
+    records = load(mode, csv_path, compiled_path)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    names = sum(1 for record in records if record["drug_name"])
+    scan_s = time.perf_counter() - start
+    after = memory_kb()
+
+    print(json.dumps({
+        "mode": mode,
+        "rows": len(records),
+        "names": names,
+        "load_s": load_s,
+        "scan_s": scan_s,
+        "anon_mb": (after["RssAnon"] - before["RssAnon"]) / 1024,
+        "file_mb": (after["RssFile"] - before["RssFile"]) / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-size", type=int, default=500000)
+    parser.add_argument("--workdir", default="/tmp")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--csv-path", help=argparse.SUPPRESS)
+    parser.add_argument("--compiled-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.csv_path, args.compiled_path)
+        return
+
+    # Write the synthetic catalog as CSV, then compile it
+    records = synthetic_records(load_records(), args.catalog_size)
+    csv_path = os.path.join(args.workdir, f"catalog_{args.catalog_size}.csv")
+    compiled_path = os.path.join(args.workdir, f"catalog_{args.catalog_size}.catalog")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0].keys()), extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+
+    start = time.perf_counter()
+    DrugCatalog.from_csv(csv_path).save(compiled_path)
+    print(f"Catalog: {args.catalog_size} rows, CSV {os.path.getsize(csv_path) / 2**20:.1f} MiB, "
+          f"compiled {os.path.getsize(compiled_path) / 2**20:.1f} MiB "
+          f"(build {time.perf_counter() - start:.2f} s)")
+
+    print(f"{'mode':<8} {'load ms':>10} {'scan ms':>10} {'private MiB':>12} {'shared MiB':>11}")
+    for mode in MODES:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.catalog_memory", "--worker", mode,
+             "--csv-path", csv_path, "--compiled-path", compiled_path],
+            cwd=ROOT_DIR, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{mode:<8} skipped ({proc.stderr.strip().splitlines()[-1]})")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{mode:<8} {r['load_s'] * 1000:>10.1f} {r['scan_s'] * 1000:>10.1f} "
+              f"{r['anon_mb']:>12.1f} {r['file_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
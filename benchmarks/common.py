@@ -0,0 +1,264 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks load the catalog straight from ``dataset/durg.csv`` (independent of
+the deployment paths in config.py) and generate OCR-like noisy tokens from it.
+"""
+
+import csv
+import glob
+import os
+import random
+import resource
+import sys
+import time
+from typing import Callable, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+CSV_PATH = os.path.join(ROOT_DIR, "dataset", "durg.csv")
+MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
+VALID_IMAGES_DIR = os.path.join(ROOT_DIR, "dataset", "valid", "images")
+
+# Words commonly printed on medicine boxes that are not drug names
+NOISE_WORDS = [
+    "tablets", "tablet", "film", "coated", "capsules", "oral", "use",
+    "each", "contains", "store", "below", "keep", "children", "reach",
+]
+
+
+def load_records(csv_path: str = CSV_PATH) -> List[dict]:
+    """
+    Load the drug catalog as a list of records (missing cells become empty strings).
+
+    Args:
+        csv_path (str): Path to the drug CSV.
+
+    Returns:
+        list[dict]: One dict per CSV row.
+    """
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def synthetic_records(records: List[dict], size: int, seed: int = 0) -> List[dict]:
+    """
+    Grow a catalog to ``size`` rows by mutating the names of existing records.
+
+    Args:
+        records (list[dict]): Seed records.
+        size (int): Number of rows to produce.
+        seed (int): Random seed.
+
+    Returns:
+        list[dict]: The original records followed by synthetic ones.
+    """
+    rnd = random.Random(seed)
+    out = list(records)
+    while len(out) < size:
+        base = rnd.choice(records)
+        row = dict(base)
+        row["drug_name"] = mutate(base["drug_name"], rnd, edits=rnd.randint(2, 4))
+        row["substitutes"] = ";".join(
+            mutate(sub, rnd, edits=rnd.randint(2, 4)) for sub in base["substitutes"].split(";")
+        )
+        out.append(row)
+    return out
+
+
+def mutate(word: str, rnd: random.Random, edits: int) -> str:
+    """
+    Apply random OCR-style character edits (drop, insert, substitute) to a word.
+
+    Args:
+        word (str): Source word.
+        rnd (random.Random): Random generator.
+        edits (int): Number of edits to apply.
+
+    Returns:
+        str: Mutated word.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    chars = list(word.lower())
+    for _ in range(edits):
+        i = rnd.randrange(len(chars) + 1)
+        op = rnd.random()
+        if op < 0.33 and chars:
+            chars.pop(min(i, len(chars) - 1))
+        elif op < 0.66:
+            chars.insert(i, rnd.choice(letters))
+        elif chars:
+            chars[min(i, len(chars) - 1)] = rnd.choice(letters)
+    return "".join(chars)
+
+
+def ocr_tokens(records: List[dict], count: int, seed: int = 0) -> List[str]:
+    """
+    Generate OCR-like tokens: noisy drug names, substitutes and packaging words.
+
+    Args:
+        records (list[dict]): Catalog records to draw names from.
+        count (int): Number of tokens.
+        seed (int): Random seed.
+
+    Returns:
+        list[str]: Generated tokens.
+    """
+    rnd = random.Random(seed)
+    words = list(NOISE_WORDS)
+    for r in records:
+        words.append(r["drug_name"])
+        words.extend(s for s in r["substitutes"].split(";") if s)
+    return [mutate(rnd.choice(words), rnd, edits=rnd.randint(0, 3)) for _ in range(count)]
+
+
+def box_tokens(records: List[dict], count: int, seed: int = 0) -> List[str]:
+    """
+    Generate the tokens of clean medicine boxes: mostly exact drug names and
+    packaging words, with a few misread names.
+
+    Args:
+        records (list[dict]): Catalog records to draw names from.
+        count (int): Number of tokens.
+        seed (int): Random seed.
+
+    Returns:
+        list[str]: Generated tokens.
+    """
+    rnd = random.Random(seed)
+    names = [r["drug_name"] for r in records if r["drug_name"]]
+    tokens = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.3:
+            tokens.append(rnd.choice(names))
+        elif kind < 0.8:
+            tokens.append(" ".join(rnd.sample(NOISE_WORDS, rnd.randint(1, 2))))
+        else:
+            tokens.append(mutate(rnd.choice(names), rnd, edits=1))
+    return tokens
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """
+    Time a callable and return the best wall-clock time in milliseconds.
+
+    Args:
+        fn (Callable): Function to time.
+        repeat (int): Number of runs.
+
+    Returns:
+        float: Fastest run in milliseconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def list_images(images_dir: str = VALID_IMAGES_DIR, limit: int = 0) -> List[str]:
+    """
+    List the image files of a dataset split in a stable order.
+
+    Args:
+        images_dir (str): Directory of images.
+        limit (int): Keep only the first N images (0 keeps all).
+
+    Returns:
+        list[str]: Sorted image paths.
+    """
+    paths = sorted(
+        p for p in glob.glob(os.path.join(images_dir, "*"))
+        if p.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    return paths[:limit] if limit else paths
+
+
+def label_boxes(image_path: str, shape) -> List[tuple]:
+    """
+    Ground-truth text boxes of a dataset image, from its YOLO label file.
+
+    Args:
+        image_path (str): Image path inside an "<split>/images" directory.
+        shape (tuple): Shape of the image the boxes are wanted for.
+
+    Returns:
+        list[tuple]: Pixel (x1, y1, x2, y2) boxes (empty when there is no label file).
+    """
+    images_dir = os.path.dirname(image_path)
+    label_path = os.path.join(os.path.dirname(images_dir), "labels",
+                              os.path.splitext(os.path.basename(image_path))[0] + ".txt")
+    height, width = shape[:2]
+    boxes = []
+    if not os.path.exists(label_path):
+        return boxes
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 5:
+                continue
+            cx, cy, w, h = (float(v) for v in parts[1:])
+            x1, y1 = max(0, int((cx - w / 2) * width)), max(0, int((cy - h / 2) * height))
+            x2, y2 = min(width, int((cx + w / 2) * width)), min(height, int((cy + h / 2) * height))
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+    return boxes
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in MiB.
+
+    VmHWM is used where available: ru_maxrss is inherited across exec on Linux,
+    so in a subprocess it may report the parent's peak.
+
+    Returns:
+        float: Peak resident memory in MiB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size of this process in MiB (peak RSS where /proc is unavailable).
+
+    Returns:
+        float: Resident memory in MiB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (list[float]): Samples.
+        q (float): Percentile in [0, 100].
+
+    Returns:
+        float: The percentile value (0.0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
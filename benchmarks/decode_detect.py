@@ -0,0 +1,145 @@
+"""
+Decode + Detect Latency and Memory Report
+
+Builds phone-sized JPEGs (12 MP and 50 MP by default, EXIF orientation 6) by
+upscaling validation images, then compares two preprocessing modes:
+    - full:    cv2.imdecode at full resolution, detection on the full image.
+    - reduced: decode_image (reduced JPEG decode, EXIF orientation, capped at
+               OCR_MAX_SIDE), detection on a DETECTION_SIZE copy.
+
+Reports per-image decode (and detect, when the YOLO model is available)
+latency, and the peak RSS of each mode measured in a fresh subprocess.
+
+Usage:
+    python -m benchmarks.decode_detect [--megapixels 12 50] [--limit 5] [--model models/best.pt]
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import MODEL_PATH, VALID_IMAGES_DIR, list_images, peak_rss_mb, percentile
+from scr.image_processing import DETECTION_SIZE, OCR_MAX_SIDE, decode_image
+
+MODES = ["full", "reduced"]
+
+
+def exif_segment(orientation: int) -> bytes:
+    """Minimal APP1 EXIF segment holding only an orientation tag."""
+    tiff = b"MM\x00\x2a" + struct.pack(">I", 8)
+    tiff += struct.pack(">H", 1) + struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0)
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def make_photos(paths, megapixels, out_dir, orientation=6):
+    """Upscale images to the given sizes (4:3, stored sideways) and write them as JPEGs."""
+    photos = []
+    for mp in megapixels:
+        height = int((mp * 1e6 * 3 / 4) ** 0.5)
+        width = int(height * 4 / 3)
+        for path in paths:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            large = cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC)
+            ok, encoded = cv2.imencode(".jpg", large, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            data = encoded.tobytes()
+            out = os.path.join(out_dir, f"{mp}mp_{os.path.basename(path)}")
+            with open(out, "wb") as f:
+                f.write(data[:2] + exif_segment(orientation) + data[2:])
+            photos.append(out)
+    return photos
+
+
+def run_mode(mode, photos, model_path):
+    """Decode (and detect) every photo in one mode; return latencies and peak RSS."""
+    model = None
+    if model_path and os.path.exists(model_path):
+        from scr.helpers import load_yolo_model
+        from scr.text_extraction import detect_text_boxes
+        model = load_yolo_model(model_path)
+
+    base_mb = peak_rss_mb()
+    rows = []
+    for path in photos:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        start = time.perf_counter()
+        if mode == "full":
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        else:
+            image = decode_image(data, OCR_MAX_SIDE)
+        decode_ms = (time.perf_counter() - start) * 1000
+
+        detect_ms = None
+        if model is not None:
+            start = time.perf_counter()
+            detect_text_boxes(model, image, det_size=DETECTION_SIZE if mode == "reduced" else None)
+            detect_ms = (time.perf_counter() - start) * 1000
+        rows.append({"photo": os.path.basename(path), "shape": list(image.shape),
+                     "decode_ms": decode_ms, "detect_ms": detect_ms})
+
+    return {"mode": mode, "rows": rows, "base_rss_mb": base_mb, "peak_rss_mb": peak_rss_mb(),
+            "detector": model is not None}
+
+
+def report(result):
+    """Print the latency summary of one mode."""
+    by_size = {}
+    for row in result["rows"]:
+        by_size.setdefault(row["photo"].split("_")[0], []).append(row)
+    for size, rows in by_size.items():
+        decode = [r["decode_ms"] for r in rows]
+        line = (f"{result['mode']:<8} {size:>5}  decode p50 {percentile(decode, 50):7.1f} ms "
+                f"p95 {percentile(decode, 95):7.1f} ms  shape {tuple(rows[0]['shape'])}")
+        if result["detector"]:
+            detect = [r["detect_ms"] for r in rows]
+            line += f"  detect p50 {percentile(detect, 50):7.1f} ms"
+        print(line)
+    print(f"{result['mode']:<8} peak RSS {result['peak_rss_mb']:.0f} MiB "
+          f"(+{result['peak_rss_mb'] - result['base_rss_mb']:.0f} MiB over the loaded process)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=VALID_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=5, help="Validation images per size")
+    parser.add_argument("--megapixels", type=int, nargs="+", default=[12, 50])
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--photos", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.worker, args.photos, args.model)))
+        return
+
+    if not os.path.exists(args.model):
+        print(f"No detection model at {args.model}: reporting decode only")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        photos = make_photos(list_images(args.images, args.limit), args.megapixels, out_dir)
+        print(f"{len(photos)} photos, OCR_MAX_SIDE {OCR_MAX_SIDE}, DETECTION_SIZE {DETECTION_SIZE}")
+
+        # Each mode runs in a fresh interpreter so that its peak RSS is its own
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.decode_detect", "--worker", mode,
+                 "--model", args.model, "--photos", *photos],
+                check=True, capture_output=True, text=True
+            ).stdout
+            report(json.loads(output.strip().splitlines()[-1]))
+
+
+if __name__ == "__main__":
+    main()
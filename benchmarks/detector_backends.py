@@ -0,0 +1,93 @@
+"""
+Detector Backend Latency Report
+
+Runs detect_text_boxes over the validation images with each available
+detector backend (pytorch, onnx, onnx-int8; see scr/detector_export.py) and
+reports model load time and memory, per-image latency, and how many boxes
+agree with the PyTorch model (IoU >= 0.5). With --map it also runs the
+accuracy guard (mAP delta against PyTorch on a dataset split).
+
+Usage:
+    python -m benchmarks.detector_backends [--limit 100] [--threads 4] [--map]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+
+from benchmarks.common import MODEL_PATH, VALID_IMAGES_DIR, list_images, percentile, rss_mb
+from scr.detector import DETECTOR_BACKENDS, detector_path, load_detector
+from scr.image_processing import DETECTION_SIZE
+from scr.text_extraction import detect_text_boxes
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def agreement(reference, boxes) -> float:
+    """Share of reference boxes matched by a box with IoU >= 0.5."""
+    if not reference:
+        return 1.0 if not boxes else 0.0
+    return sum(any(iou(r, b) >= 0.5 for b in boxes) for r in reference) / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=VALID_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=0, help="Torch intra-op threads (0 keeps the default)")
+    parser.add_argument("--map", action="store_true", help="Also report mAP deltas on the validation split")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    images = [img for img in (cv2.imread(p, cv2.IMREAD_COLOR) for p in list_images(args.images, args.limit))
+              if img is not None]
+    backends = [b for b in DETECTOR_BACKENDS if os.path.exists(detector_path(args.model, b))]
+    print(f"{len(images)} images, backends: {', '.join(backends)}")
+
+    reference = None
+    for backend in backends:
+        before = rss_mb()
+        start = time.perf_counter()
+        model = load_detector(args.model, backend)
+        detect_text_boxes(model, images[0], args.conf, DETECTION_SIZE)  # warmup
+        load_s = time.perf_counter() - start
+        memory = rss_mb() - before
+
+        latencies, boxes = [], []
+        for image in images:
+            start = time.perf_counter()
+            boxes.append(detect_text_boxes(model, image, args.conf, DETECTION_SIZE))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        if reference is None:
+            reference = boxes
+        agree = sum(agreement(r, b) for r, b in zip(reference, boxes)) / len(images)
+        print(f"{backend:<10} load {load_s:5.2f} s, +{memory:6.1f} MiB  "
+              f"p50 {percentile(latencies, 50):6.1f} ms  p95 {percentile(latencies, 95):6.1f} ms  "
+              f"boxes agreeing with {backends[0]} {agree:.1%}")
+        del model
+
+    if args.map:
+        from scr.detector_export import accuracy_report
+        report = accuracy_report(args.model, [b for b in backends if b != "pytorch"])
+        for backend, m in report.items():
+            print(f"{backend:<10} mAP50 {m['map50']:.4f} ({m['delta_map50']:+.4f})  "
+                  f"mAP50-95 {m['map50_95']:.4f} ({m['delta_map50_95']:+.4f})")
+
+
+if __name__ == "__main__":
+    main()
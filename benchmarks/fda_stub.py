@@ -0,0 +1,153 @@
+"""
+openFDA Stub Server and Client Check
+
+A local HTTP server that stands in for FDA_API_URL: it answers drug label
+searches from the local catalog (404 for unknown names), with configurable
+latency and failure rate. With --check it also runs FDAClient against the stub
+and reports sequential vs concurrent lookup time, the cache hit rate, and how
+the circuit breaker behaves when the stub fails.
+
+Usage:
+    python -m benchmarks.fda_stub [--port 8765] [--latency-ms 300] [--fail-rate 0]
+    python -m benchmarks.fda_stub --check [--latency-ms 300]
+
+To point the application at the stub, set FDA_API_URL before starting it:
+    FDA_API_URL=http://127.0.0.1:8765/drug/label.json streamlit run main.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import load_records
+
+
+def make_handler(records, latency_ms: float, fail_rate: float):
+    """Build a request handler class serving openFDA-like label results."""
+    by_name = {r["drug_name"].lower(): r for r in records}
+    rnd = random.Random(0)
+    state = {"fail_rate": fail_rate, "requests": 0}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_GET(self):
+            state["requests"] += 1
+            time.sleep(latency_ms / 1000.0)
+            if rnd.random() < state["fail_rate"]:
+                return self._send(503, {"error": {"code": "SERVICE_UNAVAILABLE"}})
+
+            search = parse_qs(urlparse(self.path).query).get("search", [""])[0]
+            name = re.sub(r"^generic_name:", "", search).strip('"').lower()
+            record = by_name.get(name)
+            if record is None:
+                return self._send(404, {"error": {"code": "NOT_FOUND", "message": "No matches found!"}})
+
+            self._send(200, {"results": [{
+                "openfda": {
+                    "brand_name": [record["drug_name"]],
+                    "generic_name": [record["substitutes"] or record["drug_name"]],
+                    "manufacturer_name": ["Stub Pharma"],
+                },
+                "purpose": [record["use"]],
+                "warnings": [record["warnings"]],
+                "dosage_and_administration": [f"{record['dosage']}, {record['frequency']}"],
+            }]})
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler, state
+
+
+def start_stub(port: int, latency_ms: float, fail_rate: float):
+    """Start the stub server in a daemon thread and return it with its mutable state."""
+    handler, state = make_handler(load_records(), latency_ms, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def check(port: int, latency_ms: float) -> None:
+    """Run FDAClient against the stub and print timings, cache and breaker behaviour."""
+    from scr.api_handler import CircuitBreaker, FDAClient
+
+    server, state = start_stub(port, latency_ms, 0.0)
+    url = f"http://127.0.0.1:{port}/drug/label.json"
+    names = [r["drug_name"] for r in load_records()[:5]] + ["notadrug"]
+    print(f"Stub at {url}, {latency_ms:.0f} ms latency, {len(names)} names")
+
+    client = FDAClient(base_url=url, cache_ttl=60, negative_cache_ttl=60)
+    start = time.perf_counter()
+    for name in names:
+        client.get_drug_info(name)
+    print(f"sequential (cold):  {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    client.clear_cache()
+    start = time.perf_counter()
+    results = client.get_many(names)
+    print(f"concurrent (cold):  {(time.perf_counter() - start) * 1000:8.1f} ms "
+          f"({sum(r is not None for r in results)} found, 1 expected not found)")
+
+    start = time.perf_counter()
+    client.get_many(names)
+    print(f"concurrent (warm):  {(time.perf_counter() - start) * 1000:8.1f} ms "
+          f"(negative result cached too)")
+    print(f"client stats: {client.stats()}")
+
+    # Failing endpoint: the breaker opens and later calls return immediately
+    state["fail_rate"] = 1.0
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=1)
+    failing = FDAClient(base_url=url, breaker=breaker)
+    start = time.perf_counter()
+    failing.get_many([f"drug{i}" for i in range(20)])
+    print(f"failing endpoint, 20 names: {(time.perf_counter() - start) * 1000:8.1f} ms, "
+          f"breaker {breaker.state}, stats {failing.stats()}")
+
+    # After the cool-down a trial call closes the breaker again
+    state["fail_rate"] = 0.0
+    time.sleep(1.1)
+    failing.get_drug_info(names[0])
+    print(f"after recovery: breaker {breaker.state}")
+
+    client.close()
+    failing.close()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--check", action="store_true", help="Run the client against the stub and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check(args.port, args.latency_ms)
+        return
+
+    server, _ = start_stub(args.port, args.latency_ms, args.fail_rate)
+    print(f"openFDA stub listening on http://127.0.0.1:{args.port}/drug/label.json")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
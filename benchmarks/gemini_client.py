@@ -0,0 +1,66 @@
+"""
+Gemini Client Check
+
+Runs AsyncGenerativeClient against the local fake backend and reports, for a
+burst of concurrent requests:
+    - how many backend calls identical requests were merged into,
+    - the peak number of simultaneous backend calls (concurrency limit),
+    - how many requests were rejected once the wait queue was full,
+    - retries of transient failures, and cache hits on a repeated burst.
+
+Usage:
+    python -m benchmarks.gemini_client [--latency-ms 300] [--requests 64] [--distinct 8]
+"""
+
+import argparse
+import asyncio
+import time
+
+from scr.generative_client import AsyncGenerativeClient, FakeGenerativeBackend
+from scr.inference_pool import QueueFullError
+from scr.result_cache import ResultCache
+
+
+async def burst(client, images, prompt):
+    """Send every image concurrently; return (elapsed ms, results, rejected count)."""
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(client.generate_json(image, prompt) for image in images), return_exceptions=True
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    rejected = sum(isinstance(o, QueueFullError) for o in outcomes)
+    errors = [o for o in outcomes if isinstance(o, Exception) and not isinstance(o, QueueFullError)]
+    return elapsed, rejected, errors
+
+
+async def run(args):
+    prompt = "Return the medicine details as JSON."
+    images = [f"image-{i % args.distinct}".encode() for i in range(args.requests)]
+
+    backend = FakeGenerativeBackend(latency_ms=args.latency_ms, failure_rate=args.failure_rate)
+    client = AsyncGenerativeClient(backend, max_concurrency=args.concurrency, max_queue=args.queue,
+                                   backoff_base=0.05, cache=ResultCache())
+
+    elapsed, rejected, errors = await burst(client, images, prompt)
+    print(f"cold burst: {args.requests} requests ({args.distinct} distinct images) in {elapsed:.0f} ms")
+    print(f"  backend calls {backend.calls}, peak concurrent {backend.max_concurrent} "
+          f"(limit {args.concurrency}), rejected {rejected}, errors {len(errors)}")
+
+    elapsed, rejected, errors = await burst(client, images, prompt)
+    print(f"warm burst: {elapsed:.1f} ms, {backend.calls} backend calls in total")
+    print(f"client stats: {client.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=16)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+OCR Mode Latency Report
+
+Runs extract_text_with_yolo over the validation images in both OCR modes:
+    - detect:    EasyOCR readtext on every YOLO crop (CRAFT detection + recognition).
+    - recognize: all YOLO boxes of an image recognized in one call, no detector network.
+
+Reports reader load time and memory, per-image latency, and how often the two
+modes produce the same cleaned texts.
+
+Usage:
+    python -m benchmarks.ocr_modes [--images dataset/valid/images] [--limit 50] [--model models/best.pt]
+"""
+
+import argparse
+import time
+
+import cv2
+
+from benchmarks.common import MODEL_PATH, VALID_IMAGES_DIR, list_images, percentile, rss_mb
+from config import OCR_LANGUAGES
+from scr.helpers import load_ocr_reader, load_yolo_model
+from scr.text_extraction import clean_extracted_texts, extract_text_with_yolo
+
+
+def load_reader(detector):
+    """Load a reader and return it with its load time (s) and RSS growth (MiB)."""
+    before = rss_mb()
+    start = time.perf_counter()
+    reader = load_ocr_reader(OCR_LANGUAGES, detector=detector)
+    return reader, time.perf_counter() - start, rss_mb() - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-image latency of the OCR modes")
+    parser.add_argument("--images", default=VALID_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--conf", type=float, default=0.5)
+    args = parser.parse_args()
+
+    model = load_yolo_model(args.model)
+    paths = list_images(args.images, args.limit)
+
+    # Load the lighter reader first so its RSS growth is not hidden by the other one
+    readers = {}
+    readers["recognize"] = load_reader(detector=False)
+    readers["detect"] = load_reader(detector=True)
+    for mode, (_, load_s, mem) in readers.items():
+        print(f"{mode:<10} reader load {load_s:6.2f} s, +{mem:7.1f} MiB RSS")
+
+    latencies = {mode: [] for mode in readers}
+    outputs = {mode: [] for mode in readers}
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        for mode, (reader, _, _) in readers.items():
+            start = time.perf_counter()
+            texts = extract_text_with_yolo(model, reader, image, conf_threshold=args.conf,
+                                           recognize_only=mode == "recognize")
+            latencies[mode].append((time.perf_counter() - start) * 1000)
+            outputs[mode].append(sorted(clean_extracted_texts(texts)))
+
+    print(f"\n{len(latencies['detect'])} images from {args.images}")
+    print(f"{'mode':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, values in latencies.items():
+        mean = sum(values) / len(values) if values else 0.0
+        print(f"{mode:<10} {mean:>9.1f} {percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f}")
+
+    same = sum(a == b for a, b in zip(outputs["detect"], outputs["recognize"]))
+    print(f"\nIdentical cleaned texts on {same} of {len(outputs['detect'])} images")
+
+
+if __name__ == "__main__":
+    main()
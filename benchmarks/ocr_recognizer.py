@@ -0,0 +1,117 @@
+"""
+OCR Recognizer Regression Harness
+
+Compares the optimized recognizer modes (see scr/ocr_recognizer.py) with the
+FP32 reader on the validation images. Text regions come from the ground-truth
+boxes in dataset/valid/labels, so the comparison does not depend on the
+detector. For every mode it reports:
+    - per-image OCR latency,
+    - images whose recognized text is identical to FP32, and the mean similarity,
+    - images whose final drug matches are identical to FP32,
+    - the largest recognizer logit difference on a sample batch.
+
+Exits with status 1 when a mode's drug-match agreement is below
+--min-agreement.
+
+Usage:
+    python -m benchmarks.ocr_recognizer [--modes int8 onnx onnx-int8] [--limit 50] [--path readtext]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from rapidfuzz import fuzz
+
+from benchmarks.common import ROOT_DIR, VALID_IMAGES_DIR, label_boxes, list_images, load_records, percentile
+from config import MATCH_THRESHOLD, OCR_LANGUAGES
+from scr.drug_index import DrugIndex
+from scr.ocr_recognizer import RECOGNIZER_IMG_HEIGHT, create_reader, max_logit_error
+from scr.text_extraction import clean_extracted_texts, ocr_boxes
+
+ONNX_PATH = os.path.join(ROOT_DIR, "models", "ocr_recognizer.onnx")
+
+
+def run_ocr(reader, image, boxes, path):
+    """OCR of the boxes of one image, as extract_text_with_yolo does it."""
+    return ocr_boxes(reader, image, boxes, recognize_only=(path == "recognize"))
+
+
+def sample_batch(samples, count=8):
+    """A recognizer input batch (N, 1, H, W) built from the first crops."""
+    crops = []
+    for image, boxes in samples:
+        for x1, y1, x2, y2 in boxes:
+            gray = cv2.cvtColor(image[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+            crops.append(cv2.resize(gray, (256, RECOGNIZER_IMG_HEIGHT)))
+            if len(crops) == count:
+                break
+        if len(crops) == count:
+            break
+    if not crops:
+        return None
+    return (np.stack(crops)[:, None].astype(np.float32) / 255.0 - 0.5) / 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=VALID_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--modes", nargs="+", default=["int8", "onnx", "onnx-int8"])
+    parser.add_argument("--onnx-path", default=ONNX_PATH)
+    parser.add_argument("--path", choices=["readtext", "recognize"], default="readtext",
+                        help="OCR path: readtext per crop, or recognize all boxes of an image")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Lowest accepted share of images with FP32-identical drug matches")
+    args = parser.parse_args()
+
+    index = DrugIndex(load_records())
+    samples = []
+    for image_path in list_images(args.images, args.limit):
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is not None:
+            samples.append((image, label_boxes(image_path, image.shape)))
+    batch = sample_batch(samples)
+    print(f"{len(samples)} images, {sum(len(b) for _, b in samples)} boxes, path {args.path}")
+
+    detector = args.path == "readtext"
+    results = {}
+    readers = {}
+    for mode in ["fp32"] + args.modes:
+        start = time.perf_counter()
+        readers[mode] = create_reader(OCR_LANGUAGES, detector=detector, mode=mode, onnx_path=args.onnx_path)
+        load_s = time.perf_counter() - start
+
+        latencies, texts = [], []
+        for image, boxes in samples:
+            start = time.perf_counter()
+            texts.append(run_ocr(readers[mode], image, boxes, args.path))
+            latencies.append((time.perf_counter() - start) * 1000)
+        matches = [sorted(m["matched_name"] for m in index.match(clean_extracted_texts(t), MATCH_THRESHOLD))
+                   for t in texts]
+        results[mode] = (load_s, latencies, texts, matches)
+
+    _, _, ref_texts, ref_matches = results["fp32"]
+    failed = []
+    for mode, (load_s, latencies, texts, matches) in results.items():
+        pairs = [(" ".join(ref), " ".join(out)) for ref, out in zip(ref_texts, texts)]
+        same = sum(a == b for a, b in pairs) / len(pairs) if pairs else 1.0
+        similarity = sum(fuzz.ratio(a, b) for a, b in pairs) / len(pairs) if pairs else 100.0
+        agreement = sum(a == b for a, b in zip(ref_matches, matches)) / len(samples) if samples else 1.0
+        error = max_logit_error(readers["fp32"], readers[mode], batch) if batch is not None else 0.0
+        print(f"{mode:<10} load {load_s:5.2f} s  p50 {percentile(latencies, 50):6.1f} ms  "
+              f"p95 {percentile(latencies, 95):6.1f} ms  text {same:6.1%} (similarity {similarity:5.1f})  "
+              f"drug matches {agreement:6.1%}  max logit diff {error:.4f}")
+        if agreement < args.min_agreement:
+            failed.append(mode)
+
+    if failed:
+        print(f"Drug matches differ from fp32 beyond --min-agreement {args.min_agreement}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
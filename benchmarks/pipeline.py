@@ -0,0 +1,309 @@
+"""
+End-to-End Pipeline Benchmark
+
+Runs the full pipeline over the labelled images of dataset/valid and
+dataset/test, stage by stage as the API runs it:
+    decode  - decode_image on the file bytes (reduced decode, EXIF, cap)
+    detect  - detect_text_boxes (YOLO)
+    ocr     - ocr_boxes on the detected boxes (second half of extract_text_with_yolo)
+    clean   - clean_extracted_texts / clean_arabic_texts
+    match   - match_drug_names against the drug CSV
+
+For each split it reports per-stage p50/p95/p99 latency, images/s, peak RSS,
+and detection precision/recall against the YOLO labels (IoU >= 0.5). Results
+are written to a JSON file; the compare command flags regressions between two
+result files and exits with status 1 when it finds any.
+
+Usage:
+    python -m benchmarks.pipeline run [--splits valid test] [--limit 0] [--output bench.json]
+    python -m benchmarks.pipeline compare BASELINE.json CANDIDATE.json [--tolerance 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.common import (MODEL_PATH, ROOT_DIR, label_boxes, list_images, load_records,
+                               peak_rss_mb, percentile)
+
+STAGES = ["decode", "detect", "ocr", "clean", "match", "total"]
+
+# Detection boxes overlapping a label by at least this IoU are true positives
+IOU_THRESHOLD = 0.5
+
+# Regression thresholds of the compare command
+TOLERANCE = 0.10  # relative increase of stage p50/p95 and peak RSS, or decrease of images/s
+ACCURACY_TOLERANCE = 0.01  # absolute decrease of precision/recall
+MIN_LATENCY_DELTA_MS = 1.0  # smaller latency changes are noise, whatever their ratio
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def match_boxes(predicted, labels, threshold: float = IOU_THRESHOLD):
+    """
+    Greedily match predicted boxes to labels by IoU.
+
+    Args:
+        predicted (list[tuple]): Detected boxes.
+        labels (list[tuple]): Ground-truth boxes.
+        threshold (float, optional): Minimum IoU of a match. Defaults to IOU_THRESHOLD.
+
+    Returns:
+        tuple[int, int, int]: True positives, false positives, false negatives.
+    """
+    pairs = sorted(((iou(p, l), i, j) for i, p in enumerate(predicted) for j, l in enumerate(labels)),
+                   reverse=True)
+    used_p, used_l = set(), set()
+    for score, i, j in pairs:
+        if score < threshold:
+            break
+        if i not in used_p and j not in used_l:
+            used_p.add(i)
+            used_l.add(j)
+    tp = len(used_p)
+    return tp, len(predicted) - tp, len(labels) - tp
+
+
+def summarize(values) -> dict:
+    """Latency summary in milliseconds."""
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else 0.0,
+    }
+
+
+def run_split(paths, model, reader, index, args) -> dict:
+    """Run the pipeline over one split and return its measurements."""
+    from scr.drug_matching import match_drug_names
+    from scr.image_processing import decode_image
+    from scr.text_extraction import (clean_arabic_texts, clean_extracted_texts, detect_text_boxes,
+                                     ocr_boxes)
+
+    timings = {stage: [] for stage in STAGES}
+    tp = fp = fn = 0
+    matched = 0
+
+    start_split = time.perf_counter()
+    for path in paths:
+        stamps = [time.perf_counter()]
+        with open(path, "rb") as f:
+            image = decode_image(f.read(), args.max_side)
+        if image is None:
+            continue
+        stamps.append(time.perf_counter())
+
+        boxes = detect_text_boxes(model, image, args.conf, args.det_size)
+        stamps.append(time.perf_counter())
+
+        texts = ocr_boxes(reader, image, boxes, args.recognize_only)
+        stamps.append(time.perf_counter())
+
+        cleaned = clean_extracted_texts(texts)
+        arabic = clean_arabic_texts(texts)
+        stamps.append(time.perf_counter())
+
+        matches = match_drug_names(cleaned, dictionary=index, arabic_texts=arabic)
+        stamps.append(time.perf_counter())
+
+        for stage, begin, end in zip(STAGES, stamps, stamps[1:]):
+            timings[stage].append((end - begin) * 1000)
+        timings["total"].append((stamps[-1] - stamps[0]) * 1000)
+
+        t, f, n = match_boxes(boxes, label_boxes(path, image.shape))
+        tp, fp, fn = tp + t, fp + f, fn + n
+        matched += len(matches)
+    elapsed = time.perf_counter() - start_split
+
+    count = len(timings["total"])
+    return {
+        "images": count,
+        "images_per_s": count / elapsed if elapsed else 0.0,
+        "stages_ms": {stage: summarize(values) for stage, values in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "detection": {
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "recall": tp / (tp + fn) if tp + fn else 0.0,
+            "tp": tp, "fp": fp, "fn": fn,
+        },
+        "matches_per_image": matched / count if count else 0.0,
+    }
+
+
+def git_revision() -> str:
+    """Short commit hash of the working tree ("unknown" outside git)."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> None:
+    """Benchmark the pipeline on the requested splits and write the JSON results."""
+    from config import OCR_LANGUAGES
+    from scr.detector import load_detector
+    from scr.drug_index import DrugIndex
+    from scr.helpers import load_ocr_reader
+
+    model = load_detector(args.model, args.backend)
+    reader = load_ocr_reader(OCR_LANGUAGES, detector=not args.recognize_only, recognizer=args.recognizer,
+                             onnx_path=args.onnx_path, routing=args.routing)
+    index = DrugIndex(load_records())
+
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("func", "output", "splits")},
+        },
+        "splits": {},
+    }
+
+    for split in args.splits:
+        paths = list_images(os.path.join(ROOT_DIR, "dataset", split, "images"), args.limit)
+        if not paths:
+            print(f"{split}: no images")
+            continue
+
+        # Warm up lazy framework initialization outside the measurements
+        run_split(paths[:args.warmup], model, reader, index, args)
+        split_result = run_split(paths, model, reader, index, args)
+        results["splits"][split] = split_result
+
+        stages = split_result["stages_ms"]
+        det = split_result["detection"]
+        print(f"{split}: {split_result['images']} images, {split_result['images_per_s']:.2f} images/s, "
+              f"peak RSS {split_result['peak_rss_mb']:.0f} MiB, "
+              f"detection P {det['precision']:.3f} R {det['recall']:.3f}")
+        for stage in STAGES:
+            s = stages[stage]
+            print(f"  {stage:<7} p50 {s['p50']:8.1f} ms  p95 {s['p95']:8.1f} ms  p99 {s['p99']:8.1f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def find_regressions(baseline: dict, candidate: dict, tolerance: float = TOLERANCE,
+                     accuracy_tolerance: float = ACCURACY_TOLERANCE) -> list:
+    """
+    Compare two result files.
+
+    Args:
+        baseline (dict): Reference results.
+        candidate (dict): New results.
+        tolerance (float, optional): Relative latency/throughput/memory change allowed.
+        accuracy_tolerance (float, optional): Absolute precision/recall drop allowed.
+
+    Returns:
+        list[str]: Description of each regression (empty when there is none).
+    """
+    regressions = []
+    for split, base in baseline["splits"].items():
+        new = candidate["splits"].get(split)
+        if new is None:
+            regressions.append(f"{split}: missing from candidate")
+            continue
+
+        for stage in STAGES:
+            for q in ("p50", "p95"):
+                old, cur = base["stages_ms"][stage][q], new["stages_ms"][stage][q]
+                if old > 0 and cur > old * (1 + tolerance) and cur - old >= MIN_LATENCY_DELTA_MS:
+                    regressions.append(f"{split} {stage} {q}: {old:.1f} -> {cur:.1f} ms ({cur / old - 1:+.0%})")
+
+        old, cur = base["images_per_s"], new["images_per_s"]
+        if old > 0 and cur < old * (1 - tolerance):
+            regressions.append(f"{split} images/s: {old:.2f} -> {cur:.2f} ({cur / old - 1:+.0%})")
+
+        old, cur = base["peak_rss_mb"], new["peak_rss_mb"]
+        if old > 0 and cur > old * (1 + tolerance):
+            regressions.append(f"{split} peak RSS: {old:.0f} -> {cur:.0f} MiB ({cur / old - 1:+.0%})")
+
+        for metric in ("precision", "recall"):
+            old, cur = base["detection"][metric], new["detection"][metric]
+            if cur < old - accuracy_tolerance:
+                regressions.append(f"{split} detection {metric}: {old:.3f} -> {cur:.3f}")
+    return regressions
+
+
+def compare(args) -> None:
+    """Print the differences between two result files and exit 1 on regressions."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    for split, base in baseline["splits"].items():
+        new = candidate["splits"].get(split)
+        if new is None:
+            continue
+        print(f"{split}: images/s {base['images_per_s']:.2f} -> {new['images_per_s']:.2f}, "
+              f"peak RSS {base['peak_rss_mb']:.0f} -> {new['peak_rss_mb']:.0f} MiB")
+        for stage in STAGES:
+            old, cur = base["stages_ms"][stage]["p50"], new["stages_ms"][stage]["p50"]
+            change = f"{cur / old - 1:+.0%}" if old > 0 else "n/a"
+            print(f"  {stage:<7} p50 {old:8.1f} -> {cur:8.1f} ms ({change})")
+
+    regressions = find_regressions(baseline, candidate, args.tolerance, args.accuracy_tolerance)
+    if regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No regressions")
+
+
+def main():
+    from scr.detector import DETECTOR_BACKENDS
+    from scr.image_processing import DETECTION_SIZE, OCR_MAX_SIDE
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark the pipeline")
+    run_parser.add_argument("--splits", nargs="+", default=["valid", "test"])
+    run_parser.add_argument("--limit", type=int, default=0, help="Only use the first N images of each split")
+    run_parser.add_argument("--warmup", type=int, default=3, help="Images run before measuring")
+    run_parser.add_argument("--output", default="bench.json")
+    run_parser.add_argument("--model", default=MODEL_PATH)
+    run_parser.add_argument("--backend", choices=list(DETECTOR_BACKENDS), default="pytorch")
+    run_parser.add_argument("--recognizer", default="int8", help="fp32, int8, onnx or onnx-int8")
+    run_parser.add_argument("--onnx-path", default=os.path.join(ROOT_DIR, "models", "ocr_recognizer.onnx"))
+    run_parser.add_argument("--routing", action="store_true", help="Route crops by script")
+    run_parser.add_argument("--recognize-only", action="store_true", help="Recognition-only OCR")
+    run_parser.add_argument("--conf", type=float, default=0.5)
+    run_parser.add_argument("--det-size", type=int, default=DETECTION_SIZE)
+    run_parser.add_argument("--max-side", type=int, default=OCR_MAX_SIDE)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                                help="Relative latency/throughput/memory change allowed")
+    compare_parser.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE,
+                                help="Absolute precision/recall drop allowed")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Prefilter Recall Check
+
+Measures how often the trigram prefilter drops the true best match compared
+with brute-force scoring, for both token matching (token_sort_ratio over names
+and substitutes) and name lookup (ratio over primary names), and times both.
+
+Only tokens for which brute force finds a match at or above the threshold
+are counted. For those, the check reports how often the prefiltered search
+returns the same choice, the same best score (ties may resolve to another
+name), and any match at all.
+
+Usage:
+    python -m benchmarks.prefilter_recall [--catalog-size 100000] [--k 500] [--tokens 500]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import load_records, ocr_tokens, synthetic_records
+from scr.drug_index import DrugIndex
+
+
+def recall(brute, filtered, threshold):
+    """
+    Compare per-query best results of brute-force and prefiltered search.
+
+    Args:
+        brute (list): Brute-force (id, score) results.
+        filtered (list): Prefiltered (id, score) results (None when no candidate).
+        threshold (float): Minimum score for a result to count as a match.
+
+    Returns:
+        dict: Number of relevant queries (brute-force match at or above the threshold) and,
+            among them, how many kept the same choice, the same best score, and any match.
+    """
+    counts = {"relevant": 0, "same_choice": 0, "same_score": 0, "matched": 0}
+    for b, f in zip(brute, filtered):
+        if b is None or b[1] < threshold:
+            continue
+        counts["relevant"] += 1
+        if f is None:
+            continue
+        counts["same_choice"] += f[0] == b[0] and f[1] == b[1]
+        counts["same_score"] += f[1] == b[1]
+        counts["matched"] += f[1] >= threshold
+    return counts
+
+
+def name_results(index, queries):
+    """Best (record id, score) of lookup_name for each query, ignoring the threshold."""
+    out = []
+    for query in queries:
+        result = index.lookup_name(query, 0)
+        out.append(None if result is None else (id(result[0]), result[1]))
+    return out
+
+
+def report(label, counts, brute_s, filtered_s, count):
+    relevant = counts["relevant"] or 1
+    print(f"{label}: {counts['relevant']} brute-force matches, "
+          f"brute {1000 * brute_s / count:.2f} ms/token, prefilter {1000 * filtered_s / count:.2f} ms/token")
+    for key, title in (("same_choice", "same best choice"), ("same_score", "same best score"),
+                       ("matched", "still matched")):
+        print(f"  {title:<17} {100.0 * counts[key] / relevant:6.2f}%  "
+              f"({counts['relevant'] - counts[key]} dropped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall of the trigram prefilter vs brute force")
+    parser.add_argument("--catalog-size", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=500, help="Candidates shortlisted per token")
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=60)
+    args = parser.parse_args()
+
+    records = synthetic_records(load_records(), args.catalog_size)
+    start = time.perf_counter()
+    brute = DrugIndex(records)
+    print(f"Catalog: {len(records)} records, {len(brute.choices)} choices "
+          f"(index built in {time.perf_counter() - start:.1f} s)")
+    start = time.perf_counter()
+    filtered = DrugIndex(records, prefilter_k=args.k)
+    print(f"Prefilter index built in {time.perf_counter() - start:.1f} s, k={args.k}")
+
+    queries = ocr_tokens(records, args.tokens, seed=1)
+
+    start = time.perf_counter()
+    brute_best = brute._best_choices(queries)
+    brute_s = time.perf_counter() - start
+    start = time.perf_counter()
+    filtered_best = filtered._best_choices(queries)
+    filtered_s = time.perf_counter() - start
+    report("token match", recall(brute_best, filtered_best, args.threshold), brute_s, filtered_s, len(queries))
+
+    start = time.perf_counter()
+    brute_names = name_results(brute, queries)
+    brute_s = time.perf_counter() - start
+    start = time.perf_counter()
+    filtered_names = name_results(filtered, queries)
+    filtered_s = time.perf_counter() - start
+    report("name lookup", recall(brute_names, filtered_names, args.threshold), brute_s, filtered_s, len(queries))
+
+
+if __name__ == "__main__":
+    main()
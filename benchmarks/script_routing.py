@@ -0,0 +1,76 @@
+"""
+Script Routing Report
+
+Compares OCR of the validation images (ground-truth boxes from
+dataset/valid/labels) with the English+Arabic reader alone and with the
+ScriptRouter (one detection pass, English recognizer first, English+Arabic
+only for unsure text regions). Reports per-image latency, the share of
+regions kept by the English reader, and images whose final drug matches (Latin and transliterated Arabic) are
+identical between the two.
+
+Usage:
+    python -m benchmarks.script_routing [--limit 50] [--min-confidence 0.5] [--path readtext]
+"""
+
+import argparse
+import time
+
+import cv2
+
+from benchmarks.common import VALID_IMAGES_DIR, label_boxes, list_images, load_records, percentile
+from benchmarks.ocr_recognizer import run_ocr
+from config import MATCH_THRESHOLD, OCR_LANGUAGES
+from scr.drug_index import DrugIndex
+from scr.ocr_recognizer import create_reader
+from scr.script_routing import ScriptRouter
+from scr.text_extraction import clean_arabic_texts, clean_extracted_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=VALID_IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N images")
+    parser.add_argument("--min-confidence", type=float, default=0.5)
+    parser.add_argument("--path", choices=["readtext", "recognize"], default="readtext")
+    args = parser.parse_args()
+
+    index = DrugIndex(load_records())
+    samples = []
+    for path in list_images(args.images, args.limit):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            samples.append((image, label_boxes(path, image.shape)))
+
+    detector = args.path == "readtext"
+    full = create_reader(OCR_LANGUAGES, detector=detector)
+    readers = {
+        "en+ar": full,
+        "routed": ScriptRouter(create_reader(["en"], detector=False), full, args.min_confidence),
+    }
+
+    outputs = {}
+    for name, reader in readers.items():
+        run_ocr(reader, *samples[0], args.path)  # warmup
+        if name == "routed":
+            warmup = reader.stats()
+        latencies, matches = [], []
+        for image, boxes in samples:
+            start = time.perf_counter()
+            texts = run_ocr(reader, image, boxes, args.path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = index.match(clean_extracted_texts(texts), MATCH_THRESHOLD,
+                                arabic_tokens=clean_arabic_texts(texts))
+            matches.append(sorted(m["matched_name"] for m in found))
+        outputs[name] = matches
+        print(f"{name:<7} p50 {percentile(latencies, 50):6.1f} ms  p95 {percentile(latencies, 95):6.1f} ms  "
+              f"total {sum(latencies) / 1000:6.1f} s  matches {sum(map(len, matches))}")
+
+    routing = {k: v - warmup[k] for k, v in readers["routed"].stats().items()}
+    total = max(1, routing["latin"] + routing["fallback"])
+    same = sum(a == b for a, b in zip(outputs["en+ar"], outputs["routed"]))
+    print(f"English reader kept {routing['latin'] / total:.1%} of text regions; "
+          f"identical drug matches on {same}/{len(samples)} images")
+
+
+if __name__ == "__main__":
+    main()
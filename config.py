@@ -3,39 +3,93 @@ Application Configuration Settings
 """
 
 import os
-import pandas as pd
-from rapidfuzz import process, fuzz
+from scr.catalog_manager import CatalogManager
+from scr.match_memo import MatchMemo
 
 # ===== Base Directory =====
 BASE_DIR = "/mnt/c/Users/Mohamed Mahmoud/Dawak_vect"
 
 # ===== Model Path =====
 MODEL_PATH = os.path.join(BASE_DIR, "models", "best.pt")
+DETECTOR_BACKEND = "pytorch"  # "pytorch", "onnx" or "onnx-int8" (export with python -m scr.detector_export)
 
 # ===== OCR Settings =====
 OCR_LANGUAGES = ['en', 'ar']  # Supported OCR languages
+OCR_RECOGNIZE_ONLY = False  # Recognize YOLO boxes directly (batched, no EasyOCR detector network)
+OCR_RECOGNIZER = "int8"  # Recognizer backend: "fp32", "int8" (EasyOCR default), "onnx" or "onnx-int8"
+OCR_RECOGNIZER_ONNX_PATH = os.path.join(BASE_DIR, "models", "ocr_recognizer.onnx")  # Exported on first use
+OCR_SCRIPT_ROUTING = False  # Recognize with the English reader first, English+Arabic only when unsure (check with benchmarks.script_routing)
+OCR_ROUTING_MIN_CONFIDENCE = 0.5  # English reading confidence needed to skip the English+Arabic reader
+
+# ===== Video Scan Settings =====
+VIDEO_SOURCE = 0  # Webcam index, or the path of a video file for testing
+VIDEO_CPU_BUDGET = 0.5  # Share of wall time detection + OCR of sampled frames may use
+VIDEO_MOTION_THRESHOLD = 6.0  # Mean thumbnail difference (0-255) that triggers processing a frame
+VIDEO_MAX_INTERVAL_SECONDS = 2.0  # Process a frame at least this often, even without motion
 
 # ===== Matching Settings =====
 MATCH_THRESHOLD = 70  # Minimum score threshold for text matching
+MATCH_BATCHED = True  # Score all OCR tokens in one vectorized call instead of a per-token loop
+MATCH_WORKERS = -1  # Worker threads for batched scoring (-1 uses all CPU cores)
+MATCH_CASCADE = True  # Drop packaging words and resolve exact/phonetic names before fuzzy scoring (same matches)
+MATCH_PREFILTER_K = 500  # Trigram candidates shortlisted per token before exact scoring
+MATCH_PREFILTER_MIN_SIZE = 20000  # Catalog size (searchable names) from which the prefilter is used
+# Token -> match memo shared by the processes using this file (None disables); cleared per catalog version.
+# Set MATCH_MEMO_PATH (empty disables); defaults to dataset/ of this repository when it exists.
+_REPO_DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset")
+MATCH_MEMO_PATH = os.environ.get(
+    "MATCH_MEMO_PATH",
+    os.path.join(_REPO_DATASET_DIR, "match_memo.sqlite") if os.path.isdir(_REPO_DATASET_DIR) else ""
+) or None
+MATCH_MEMO_MAX_ENTRIES = 100000  # Shared memo entries kept (least recently used are dropped)
 
 # ===== CSV File Path =====
 CSV_DRUG_PATH = os.path.join(BASE_DIR, "dataset", "durg.csv")  # Path to the drug dataset CSV
-
-# ===== Load Drug Dictionary =====
-DRUG_DICTIONARY = []
-
-try:
-    # Read CSV file into a DataFrame
-    data = pd.read_csv(CSV_DRUG_PATH, low_memory=False)
-
-    # Clean drug names (main column: drug_name)
-    data['drug_name_lower'] = data['drug_name'].astype(str).str.lower().str.strip()
-
-    # Convert all rows into a list of dictionaries
-    DRUG_DICTIONARY = data.fillna(value=pd.NA).to_dict(orient="records")
-    print(f"Loaded {len(DRUG_DICTIONARY)} drugs from CSV.")
-except Exception as e:
-    print(f"Error reading CSV file: {e}")
+# Compiled, memory-mapped catalog (python -m scr.drug_catalog CSV OUTPUT); used instead of the CSV when up to date
+CATALOG_DRUG_PATH = os.path.join(BASE_DIR, "dataset", "durg.catalog")
+
+# ===== openFDA API =====
+FDA_API_URL = os.environ.get("FDA_API_URL", "https://api.fda.gov/drug/label.json")  # Override to use a local stub server
+FDA_CONNECT_TIMEOUT_SECONDS = 2  # Connection timeout of each request
+FDA_READ_TIMEOUT_SECONDS = 3  # Read timeout of each request
+FDA_MAX_WORKERS = 8  # Concurrent lookups (and pooled keep-alive connections)
+FDA_CACHE_TTL_SECONDS = 24 * 3600  # Lifetime of cached drug details
+FDA_NEGATIVE_CACHE_TTL_SECONDS = 3600  # Lifetime of cached "not found" answers
+FDA_CACHE_MAX_ENTRIES = 4096  # Maximum cached drug names
+FDA_BREAKER_FAILURES = 3  # Consecutive failures that stop calls to the API
+FDA_BREAKER_RESET_SECONDS = 30  # Cool-down before a trial call once the breaker is open
+# Precomputed openFDA details of the catalog (python -m scr.fda_enrichment), served without network calls
+FDA_DETAILS_PATH = os.path.join(BASE_DIR, "dataset", "durg.fda.json")
+FDA_LIVE_LOOKUPS = True  # Query openFDA for names missing from FDA_DETAILS_PATH
+
+# ===== Catalog Reload Settings =====
+CATALOG_RELOAD_POLL_SECONDS = 30  # Reload the catalog when the CSV changes (checked this often; 0 disables)
+CATALOG_INCREMENTAL_MAX_CHANGED = 0.05  # Fraction of changed rows up to which the index is updated incrementally
+
+# ===== Drug Catalog (loaded on first use, reloaded when the CSV changes) =====
+DRUG_CATALOG = CatalogManager(
+    CSV_DRUG_PATH,
+    CATALOG_DRUG_PATH,
+    prefilter_k=MATCH_PREFILTER_K,
+    prefilter_min_size=MATCH_PREFILTER_MIN_SIZE,
+    poll_seconds=CATALOG_RELOAD_POLL_SECONDS,
+    incremental_max_changed=CATALOG_INCREMENTAL_MAX_CHANGED
+)
+
+# ===== Match Memo (opened on first use) =====
+MATCH_MEMO = MatchMemo(MATCH_MEMO_PATH, MATCH_MEMO_MAX_ENTRIES) if MATCH_MEMO_PATH else None
+
+
+def __getattr__(name):
+    """
+    Resolve DRUG_DICTIONARY and DRUG_INDEX from the current catalog version, so that
+    importing this module does not read the CSV and reloads are picked up.
+    """
+    if name == "DRUG_DICTIONARY":
+        return DRUG_CATALOG.get().records
+    if name == "DRUG_INDEX":
+        return DRUG_CATALOG.get().index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ===== Function to Get Drug Info Using RapidFuzz =====
@@ -49,21 +103,10 @@ def get_drug_info(name: str):
     Returns:
         dict | None: Dictionary with drug details and match score, or None if not found.
     """
-    if not DRUG_DICTIONARY:
-        return None
-
-    # Normalize input name
-    name_clean = name.lower().strip()
-    drug_names = [d['drug_name_lower'] for d in DRUG_DICTIONARY]
-
-    # Perform fuzzy matching
-    result = process.extractOne(name_clean, drug_names, scorer=fuzz.ratio)
+    # Perform fuzzy matching against the prebuilt name list
+    result = DRUG_CATALOG.get().index.lookup_name(name, MATCH_THRESHOLD)
     if result:
-        match_name, score, _ = result
-        if score >= MATCH_THRESHOLD:
-            # Retrieve the full record for the matched drug
-            drug_info = next((d for d in DRUG_DICTIONARY if d['drug_name_lower'] == match_name), None)
-            if drug_info:
-                # Include the score in the returned dictionary
-                return {"score": score, **drug_info}
+        drug_info, score = result
+        # Include the score in the returned dictionary
+        return {"score": score, **drug_info}
     return None
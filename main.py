@@ -13,14 +13,60 @@ import cv2
 import numpy as np
 
 # Import config (outside scr) and modules from scr folder
-from config import MODEL_PATH, OCR_LANGUAGES
+from config import (MODEL_PATH, DETECTOR_BACKEND, OCR_LANGUAGES, OCR_RECOGNIZE_ONLY,
+                    OCR_RECOGNIZER, OCR_RECOGNIZER_ONNX_PATH, OCR_SCRIPT_ROUTING,
+                    OCR_ROUTING_MIN_CONFIDENCE, VIDEO_SOURCE, VIDEO_CPU_BUDGET, VIDEO_MOTION_THRESHOLD,
+                    VIDEO_MAX_INTERVAL_SECONDS)
 from scr.image_processing import capture_image_from_camera, upload_image
-from scr.text_extraction import extract_text_with_yolo, clean_extracted_texts
+from scr.video_scan import FrameSampler, VideoScanner, draw_tracks, iter_frames
+from scr.text_extraction import extract_text_with_yolo, clean_extracted_texts, clean_arabic_texts
 from scr.drug_matching import match_drug_names
-from scr.api_handler import get_drug_info_from_api
+from scr.api_handler import get_drugs_info_from_api
 from scr.helpers import load_yolo_model, load_ocr_reader, display_drug_info
 
 
+def video_scan(model, reader):
+    """
+    Continuous scan of a webcam or video file: frames are sampled within a CPU
+    budget, YOLO boxes are tracked across frames, and only new or changed boxes
+    are read by OCR. The merged matches are shown when the scan stops.
+
+    Args:
+        model: YOLO object detection model instance.
+        reader (easyocr.Reader): Initialized OCR reader.
+    """
+    source = st.text_input("مصدر الفيديو (رقم الكاميرا أو مسار ملف فيديو):", str(VIDEO_SOURCE))
+    run = st.checkbox("بدء المسح")
+    frame_view = st.empty()
+    status_view = st.empty()
+
+    if run:
+        scanner = VideoScanner(model, reader, recognize_only=OCR_RECOGNIZE_ONLY,
+                               sampler=FrameSampler(VIDEO_CPU_BUDGET, VIDEO_MOTION_THRESHOLD,
+                                                    VIDEO_MAX_INTERVAL_SECONDS))
+        st.session_state["video_scanner"] = scanner
+        try:
+            # Unticking the checkbox reruns the script, which ends this loop
+            for result in scanner.scan(iter_frames(source)):
+                frame = draw_tracks(scanner.last_frame, scanner.tracker.tracks)
+                frame_view.image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), use_column_width=True)
+                names = [m["matched_name"] for m in scanner.matches()]
+                status_view.write(f"الأدوية المكتشفة: {', '.join(names) if names else '-'}")
+        except ValueError as e:
+            st.error(f"تعذر فتح مصدر الفيديو: {str(e)}")
+
+    # Show the merged matches of the last scan
+    scanner = st.session_state.get("video_scanner")
+    if scanner is not None and scanner.matches():
+        st.success("تم التعرف على الأدوية التالية:")
+        matched_drugs = scanner.matches()
+        drug_infos = get_drugs_info_from_api([m["matched_name"] for m in matched_drugs])
+        for m, drug_info in zip(matched_drugs, drug_infos):
+            word, match, score = m["extracted_word"], m["matched_name"], m["score"]
+            st.write(f"**{match}** (مطابقة بنسبة {score}% للنص: '{word}')")
+            display_drug_info(match, drug_info)
+
+
 def main():
     """
     Main application function.
@@ -31,17 +77,21 @@ def main():
     st.write("التقط صورة لعلبة الدواء أو ارفع صورة موجودة")
     
     # Load YOLO detection model and OCR reader
-    model = load_yolo_model(MODEL_PATH)
-    reader = load_ocr_reader(OCR_LANGUAGES)
+    model = load_yolo_model(MODEL_PATH, DETECTOR_BACKEND)
+    reader = load_ocr_reader(OCR_LANGUAGES, detector=not OCR_RECOGNIZE_ONLY,
+                             recognizer=OCR_RECOGNIZER, onnx_path=OCR_RECOGNIZER_ONNX_PATH,
+                             routing=OCR_SCRIPT_ROUTING, min_confidence=OCR_ROUTING_MIN_CONFIDENCE)
     
     # Choose input option (camera or upload)
-    option = st.radio("اختر طريقة الإدخال:", ("الكاميرا", "رفع صورة"))
+    option = st.radio("اختر طريقة الإدخال:", ("الكاميرا", "رفع صورة", "مسح مباشر بالفيديو"))
     
     image = None
     if option == "الكاميرا":
         image = capture_image_from_camera()
-    else:
+    elif option == "رفع صورة":
         image = upload_image()
+    else:
+        video_scan(model, reader)
     
     if image is not None:
         # Display the selected image
@@ -51,30 +101,32 @@ def main():
         with st.spinner("جاري معالجة الصورة..."):
             try:
                 # Step 1: Extract texts using YOLO detection + OCR
-                texts = extract_text_with_yolo(model, reader, image)
+                texts = extract_text_with_yolo(model, reader, image, recognize_only=OCR_RECOGNIZE_ONLY)
                 
                 # Step 2: Clean extracted texts for normalization
                 cleaned_texts = clean_extracted_texts(texts)
+                arabic_texts = clean_arabic_texts(texts)
                 
-                # Step 3: Match extracted texts with drug dictionary
-                matched_drugs = match_drug_names(cleaned_texts)
+                # Step 3: Match extracted texts with drug dictionary (Arabic through transliteration)
+                matched_drugs = match_drug_names(cleaned_texts, arabic_texts=arabic_texts)
                 
                 # Step 4: Display results
                 if matched_drugs:
                     st.success("تم التعرف على الأدوية التالية:")
                     
-                    for word, match, score in matched_drugs:
+                    # Fetch drug details of all matches from the external API concurrently
+                    drug_infos = get_drugs_info_from_api([m["matched_name"] for m in matched_drugs])
+                    
+                    for m, drug_info in zip(matched_drugs, drug_infos):
+                        word, match, score = m["extracted_word"], m["matched_name"], m["score"]
                         st.write(f"**{match}** (مطابقة بنسبة {score}% للنص: '{word}')")
-                        
-                        # Fetch drug details from external API
-                        drug_info = get_drug_info_from_api(match)
                         display_drug_info(match, drug_info)
                 else:
                     st.error("لم يتم التعرف على أي دواء في الصورة")
                     
                     # Show extracted texts for debugging purposes
-                    if cleaned_texts:
-                        st.write("النصوص المستخرجة:", ", ".join(cleaned_texts))
+                    if cleaned_texts or arabic_texts:
+                        st.write("النصوص المستخرجة:", ", ".join(cleaned_texts + arabic_texts))
             
             except Exception as e:
                 st.error(f"حدث خطأ أثناء معالجة الصورة: {str(e)}")
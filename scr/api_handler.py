@@ -3,19 +3,339 @@ API Handler Module
 ------------------
 This module is responsible for interacting with external APIs, specifically
 the openFDA API, to fetch structured drug information.
+
+Requests go through a shared client that keeps pooled keep-alive connections,
+looks up several drugs concurrently, caches responses (including "not found")
+for a while, and stops calling the API for a cool-down period after repeated
+failures (circuit breaker), so a slow endpoint cannot stall the UI. Drugs
+precomputed by the offline enrichment job (scr/fda_enrichment.py) are served
+from the local details file without any network call.
 """
 
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import quote
+
 import requests
-from config import FDA_API_URL
+from requests.adapters import HTTPAdapter
 
+from config import (
+    FDA_API_URL, FDA_CONNECT_TIMEOUT_SECONDS, FDA_READ_TIMEOUT_SECONDS, FDA_MAX_WORKERS,
+    FDA_CACHE_TTL_SECONDS, FDA_NEGATIVE_CACHE_TTL_SECONDS, FDA_CACHE_MAX_ENTRIES,
+    FDA_BREAKER_FAILURES, FDA_BREAKER_RESET_SECONDS, FDA_DETAILS_PATH, FDA_LIVE_LOOKUPS
+)
+from scr.fda_store import FDADetailsStore
 
-def get_drug_info_from_api(drug_name: str):
+
+def is_outage(error: Exception) -> bool:
     """
-    Query the openFDA API for information about a specific drug.
+    Whether a failed call shows the endpoint down, and so counts toward the breaker.
+
+    Args:
+        error (Exception): Exception raised by the call.
+
+    Returns:
+        bool: True for connection errors, timeouts and 5xx answers.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code >= 500
+
+
+def search_query(drug_name: str) -> str:
+    """
+    Build the encoded openFDA query string of a generic name search.
+
+    openFDA reads "+" as the space between terms, so the name's words are
+    percent-encoded one by one and joined with a literal "+"; a name of several
+    words is searched as a quoted phrase. "+" in the name ("amoxicillin +
+    clavulanic acid") only separates words.
 
     Args:
         drug_name (str): The generic name of the drug to search for.
 
+    Returns:
+        str: Query string with the search and limit parameters.
+    """
+    terms = "+".join(quote(word, safe="") for word in re.split(r"[\s+]+", drug_name.strip()) if word)
+    if "+" in terms:
+        terms = f'"{terms}"'
+    return f"search=generic_name:{terms}&limit=1"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    are refused for ``reset_seconds``; then a single trial call is let through
+    (half-open), which closes the circuit on success or reopens it on failure.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_seconds (float): Time the circuit stays open before a trial call.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """"closed", "open" or "half_open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now.
+
+        Returns:
+            bool: True when closed, or for the single trial call once the cool-down is over.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening (or reopening) the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class FDAClient:
+    """
+    Pooled, concurrent and cached client for the openFDA drug label endpoint.
+
+    Attributes:
+        base_url (str): Endpoint URL (point it at a local stub server for testing).
+        breaker (CircuitBreaker): Breaker guarding the endpoint.
+        store (FDADetailsStore | None): Precomputed details consulted before the API.
+        live_lookups (bool): Whether names missing from the store are queried live.
+    """
+
+    def __init__(self, base_url: str = FDA_API_URL,
+                 connect_timeout: float = FDA_CONNECT_TIMEOUT_SECONDS,
+                 read_timeout: float = FDA_READ_TIMEOUT_SECONDS,
+                 max_workers: int = FDA_MAX_WORKERS,
+                 cache_ttl: float = FDA_CACHE_TTL_SECONDS,
+                 negative_cache_ttl: float = FDA_NEGATIVE_CACHE_TTL_SECONDS,
+                 cache_max_entries: int = FDA_CACHE_MAX_ENTRIES,
+                 breaker: Optional[CircuitBreaker] = None,
+                 store: Optional[FDADetailsStore] = None,
+                 live_lookups: bool = True):
+        """
+        Create the client.
+
+        Args:
+            base_url (str, optional): Endpoint URL. Defaults to FDA_API_URL.
+            connect_timeout (float, optional): Connection timeout in seconds.
+            read_timeout (float, optional): Read timeout in seconds.
+            max_workers (int, optional): Concurrent requests (and pooled connections).
+            cache_ttl (float, optional): Lifetime of cached drug details in seconds.
+            negative_cache_ttl (float, optional): Lifetime of cached "not found" answers.
+            cache_max_entries (int, optional): Maximum cached drug names (LRU).
+            breaker (CircuitBreaker, optional): Circuit breaker. Defaults to one built
+                from FDA_BREAKER_FAILURES and FDA_BREAKER_RESET_SECONDS.
+            store (FDADetailsStore, optional): Precomputed details. Defaults to None.
+            live_lookups (bool, optional): Query the API for names missing from the
+                store. Defaults to True.
+        """
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache_ttl = cache_ttl
+        self.negative_cache_ttl = negative_cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.breaker = breaker or CircuitBreaker(FDA_BREAKER_FAILURES, FDA_BREAKER_RESET_SECONDS)
+        self.store = store
+        self.live_lookups = live_lookups
+
+        # Keep-alive connections shared by all lookups (no automatic retries:
+        # failures go to the circuit breaker instead)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fda")
+
+        # drug name -> (expires_at, drug info or None)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "store_hits": 0, "hits": 0, "misses": 0, "requests": 0, "errors": 0, "short_circuited": 0
+        }
+
+    def get_drug_info(self, drug_name: str) -> Optional[dict]:
+        """
+        Look up one drug.
+
+        Args:
+            drug_name (str): The generic name of the drug to search for.
+
+        Returns:
+            dict | None: Drug details (see parse_drug_info), or None if the drug was not
+                found, the request failed, or the circuit is open.
+        """
+        if self.store is not None:
+            found, value = self.store.get(drug_name)
+            if found:
+                self._count("store_hits")
+                return value
+        if not self.live_lookups:
+            return None
+
+        key = drug_name.strip().lower()
+        found, value = self._cache_get(key)
+        if found:
+            return value
+
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            return None
+
+        try:
+            value = self.fetch(drug_name)
+        except Exception as e:
+            # Failed calls are not cached; only an endpoint that is down trips the breaker
+            self._count("errors")
+            if is_outage(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            print(f"Error fetching drug info: {e}")
+            return None
+
+        self.breaker.record_success()
+        self._cache_put(key, value)
+        return value
+
+    def fetch(self, drug_name: str) -> Optional[dict]:
+        """
+        Query the API directly (no store, cache or circuit breaker).
+
+        Args:
+            drug_name (str): The generic name of the drug to search for.
+
+        Returns:
+            dict | None: Drug details, or None if openFDA has no entry for the drug or
+                its answer cannot be parsed.
+
+        Raises:
+            requests.RequestException: On timeouts, connection errors and error answers
+                other than "not found".
+        """
+        self._count("requests")
+        # Passed pre-encoded, so requests does not percent-encode the "+" separators
+        response = self.session.get(self.base_url, params=search_query(drug_name), timeout=self.timeout)
+        # openFDA answers 404 when nothing matches the search
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        try:
+            return parse_drug_info(response.json())
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            # A malformed answer is cached like "not found" rather than retried
+            print(f"Error parsing drug info for {drug_name!r}: {e}")
+            return None
+
+    def get_many(self, drug_names: List[str]) -> List[Optional[dict]]:
+        """
+        Look up several drugs concurrently.
+
+        Args:
+            drug_names (list[str]): Drug names (duplicates are fetched once).
+
+        Returns:
+            list[dict | None]: Details of each drug, in input order.
+        """
+        unique = list(dict.fromkeys(drug_names))
+        results = dict(zip(unique, self._executor.map(self.get_drug_info, unique)))
+        return [results[name] for name in drug_names]
+
+    def stats(self) -> dict:
+        """
+        Cache and request counters.
+
+        Returns:
+            dict: Store hits, cache hits/misses, requests, errors, short-circuited calls,
+                cached entries and the breaker state.
+        """
+        with self._lock:
+            counters = dict(self._counters, entries=len(self._cache))
+        counters["breaker"] = self.breaker.state
+        return counters
+
+    def clear_cache(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        """Close the pooled connections and the worker threads."""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def _cache_get(self, key: str):
+        """Return (found, value) for a live cache entry."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self._counters["hits"] += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._cache[key]
+            self._counters["misses"] += 1
+            return False, None
+
+    def _cache_put(self, key: str, value: Optional[dict]) -> None:
+        """Cache a response; "not found" answers get the shorter negative TTL."""
+        ttl = self.cache_ttl if value is not None else self.negative_cache_ttl
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+def parse_drug_info(data: dict) -> Optional[dict]:
+    """
+    Extract the displayed fields from an openFDA drug label response.
+
+    Args:
+        data (dict): Decoded JSON response.
+
     Returns:
         dict | None: A dictionary containing drug details if found, otherwise None.
             The dictionary includes:
@@ -26,26 +346,48 @@ def get_drug_info_from_api(drug_name: str):
                 - warnings (str): Associated warnings.
                 - dosage (str): Dosage and administration instructions.
     """
-    try:
-        # Build the API request URL with search query and limit
-        url = f"{FDA_API_URL}?search=generic_name:{drug_name}&limit=1"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-
-        # Verify that results are returned and extract the first entry
-        if "results" in data:
-            drug_info = data["results"][0]
-            return {
-                "brand_name": drug_info.get("openfda", {}).get("brand_name", ["Not Available"])[0],
-                "generic_name": drug_info.get("openfda", {}).get("generic_name", ["Not Available"])[0],
-                "manufacturer": drug_info.get("openfda", {}).get("manufacturer_name", ["Not Available"])[0],
-                "purpose": drug_info.get("purpose", ["Not Available"])[0],
-                "warnings": drug_info.get("warnings", ["Not Available"])[0],
-                "dosage": drug_info.get("dosage_and_administration", ["Not Available"])[0],
-            }
-
-    except Exception as e:
-        # Log error to console; can be replaced with logging in production
-        print(f"Error fetching drug info: {e}")
-
-    return None
+    # Verify that results are returned and extract the first entry
+    if not data.get("results"):
+        return None
+
+    drug_info = data["results"][0]
+    return {
+        "brand_name": drug_info.get("openfda", {}).get("brand_name", ["Not Available"])[0],
+        "generic_name": drug_info.get("openfda", {}).get("generic_name", ["Not Available"])[0],
+        "manufacturer": drug_info.get("openfda", {}).get("manufacturer_name", ["Not Available"])[0],
+        "purpose": drug_info.get("purpose", ["Not Available"])[0],
+        "warnings": drug_info.get("warnings", ["Not Available"])[0],
+        "dosage": drug_info.get("dosage_and_administration", ["Not Available"])[0],
+    }
+
+
+# Shared client: one connection pool, cache and breaker per process, backed by
+# the precomputed details file
+fda_client = FDAClient(store=FDADetailsStore(FDA_DETAILS_PATH), live_lookups=FDA_LIVE_LOOKUPS)
+
+
+def get_drug_info_from_api(drug_name: str):
+    """
+    Query the openFDA API for information about a specific drug.
+
+    Args:
+        drug_name (str): The generic name of the drug to search for.
+
+    Returns:
+        dict | None: A dictionary containing drug details if found, otherwise None
+            (see parse_drug_info for the fields).
+    """
+    return fda_client.get_drug_info(drug_name)
+
+
+def get_drugs_info_from_api(drug_names: List[str]) -> List[Optional[dict]]:
+    """
+    Query the openFDA API for several drugs concurrently.
+
+    Args:
+        drug_names (list[str]): Generic names of the drugs to search for.
+
+    Returns:
+        list[dict | None]: Drug details (or None) for each name, in input order.
+    """
+    return fda_client.get_many(drug_names)
@@ -0,0 +1,314 @@
+"""
+Catalog Manager Module
+
+This module keeps the drug catalog and its matching index hot-reloadable.
+Each loaded version is an immutable snapshot; a reload builds the next
+snapshot in the background and swaps it in with a single reference
+assignment, so requests that already hold the old snapshot finish on it.
+
+Reloads are triggered by a change of the CSV (mtime watcher) or explicitly
+(e.g. an admin endpoint). When only a few rows changed, the new index reuses
+the n-gram postings of the old one instead of being rebuilt from scratch.
+"""
+
+import os
+import threading
+import time
+import traceback
+from array import array
+from collections import Counter
+from typing import Callable, Optional
+
+from scr.drug_catalog import DrugCatalog, file_version, load_catalog
+from scr.drug_index import DrugIndex
+
+
+def row_hashes(records) -> array:
+    """
+    Hash every row of a catalog, one column at a time.
+
+    Args:
+        records (DrugCatalog | list[dict]): Drug records.
+
+    Returns:
+        array: One hash per row (only comparable within this process).
+    """
+    if isinstance(records, DrugCatalog):
+        hashes = [0] * len(records)
+        for column in records.columns:
+            hashes = list(map(hash, zip(hashes, records.column(column))))
+        return array("q", hashes)
+    return array("q", (hash(tuple(record.values())) for record in records))
+
+
+def count_changed_rows(old: array, new: array) -> int:
+    """
+    Number of rows that differ between two versions, compared by content.
+
+    Rows are matched by hash wherever they are, so inserting or removing a row
+    does not count the rows after it as changed.
+
+    Args:
+        old (array): Row hashes of the previous version.
+        new (array): Row hashes of the new version.
+
+    Returns:
+        int: Rows added or removed; a modified row counts once.
+    """
+    old_counts, new_counts = Counter(old), Counter(new)
+    added = sum((new_counts - old_counts).values())
+    removed = sum((old_counts - new_counts).values())
+    return max(added, removed)
+
+
+class CatalogSnapshot:
+    """
+    One immutable version of the catalog and its matching index.
+
+    Attributes:
+        version (str): Content version of the source file.
+        records (DrugCatalog | list): Drug records.
+        index (DrugIndex): Matching index over the records.
+        loaded_at (float): Unix time the snapshot was swapped in.
+        source_mtime (float): Modification time of the CSV it was loaded from.
+        row_hashes (array): Per-row hashes used to diff the next version.
+    """
+
+    def __init__(self, version: str, records, index: DrugIndex, source_mtime: float, hashes: array):
+        self.version = version
+        self.records = records
+        self.index = index
+        self.loaded_at = time.time()
+        self.source_mtime = source_mtime
+        self.row_hashes = hashes
+
+
+class CatalogManager:
+    """
+    Owns the current catalog snapshot and replaces it when the catalog changes.
+
+    Attributes:
+        csv_path (str): Drug CSV (the source of truth).
+        compiled_path (str | None): Compiled catalog, used when up to date and
+            rewritten after a reload from the CSV.
+        poll_seconds (float): Interval of the mtime watcher (0 disables it).
+        incremental_max_changed (float): Largest fraction of changed rows for which
+            the n-gram prefilter of the index is updated incrementally instead of
+            rebuilt (only indexes large enough to have a prefilter).
+        last_reload (dict | None): Outcome of the most recent reload.
+        error (str | None): Error of the most recent failed reload, if any.
+    """
+
+    def __init__(self, csv_path: str, compiled_path: Optional[str] = None,
+                 prefilter_k: int = 0, prefilter_min_size: int = 0,
+                 poll_seconds: float = 0, incremental_max_changed: float = 0.05):
+        """
+        Create the manager (nothing is loaded until get or reload is called).
+
+        Args:
+            csv_path (str): Drug CSV.
+            compiled_path (str, optional): Compiled catalog file. Defaults to None.
+            prefilter_k (int, optional): N-gram prefilter size of the index. Defaults to 0.
+            prefilter_min_size (int, optional): Catalog size from which the prefilter is
+                used. Defaults to 0.
+            poll_seconds (float, optional): Check the CSV for changes this often once the
+                catalog is loaded; 0 disables the watcher. Defaults to 0.
+            incremental_max_changed (float, optional): Fraction of changed rows up to which
+                reloads update the index incrementally. Defaults to 0.05.
+        """
+        self.csv_path = csv_path
+        self.compiled_path = compiled_path
+        self.prefilter_k = prefilter_k
+        self.prefilter_min_size = prefilter_min_size
+        self.poll_seconds = poll_seconds
+        self.incremental_max_changed = incremental_max_changed
+        self.last_reload = None
+        self.error = None
+
+        self._snapshot = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._watcher = None
+        self._seen_mtime = None
+        self._stop = threading.Event()
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        """The snapshot serving new requests (None before the first load)."""
+        return self._snapshot
+
+    def get(self) -> CatalogSnapshot:
+        """
+        Return the current snapshot, loading the catalog first if needed.
+
+        Callers should read the snapshot once per request and use it throughout,
+        so a concurrent swap cannot mix two versions in one response.
+
+        Returns:
+            CatalogSnapshot: The current snapshot.
+        """
+        if self._snapshot is None:
+            self.reload()
+            if self.poll_seconds > 0:
+                self.start_watcher()
+        if self._snapshot is None:
+            raise RuntimeError(f"Drug catalog could not be loaded: {self.error}")
+        return self._snapshot
+
+    def add_listener(self, callback: Callable[[CatalogSnapshot], None]) -> None:
+        """
+        Register a function called with each newly swapped-in snapshot.
+
+        Args:
+            callback (Callable[[CatalogSnapshot], None]): Swap listener.
+        """
+        self._listeners.append(callback)
+
+    def reload(self, force: bool = False) -> dict:
+        """
+        Load the catalog again if it changed, and swap the new snapshot in.
+
+        Args:
+            force (bool, optional): Rebuild even when the content version is unchanged.
+                Defaults to False.
+
+        Returns:
+            dict: Reload outcome: status ("loaded", "unchanged", "busy" or "failed"),
+                version, and for loads the mode ("full" or "incremental"), row
+                counts and duration.
+        """
+        if not self._reload_lock.acquire(blocking=self._snapshot is None):
+            return {"status": "busy", "version": self._snapshot.version}
+        return self._reload_locked(force)
+
+    def reload_in_background(self, force: bool = False) -> bool:
+        """
+        Start a reload in a daemon thread.
+
+        Args:
+            force (bool, optional): See reload. Defaults to False.
+
+        Returns:
+            bool: False if a reload is already running.
+        """
+        # Take the lock here, so two callers cannot both start a reload thread
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._reload_locked, args=(force,), name="catalog-reload", daemon=True).start()
+        return True
+
+    def _reload_locked(self, force: bool) -> dict:
+        """Run a reload with the reload lock already acquired, and release it."""
+        self._reloading = True
+        try:
+            result = self._reload(force)
+        except Exception as e:
+            self.error = str(e)
+            traceback.print_exc()
+            result = {"status": "failed", "error": self.error,
+                      "version": self._snapshot.version if self._snapshot else None}
+        finally:
+            self._reloading = False
+            self._reload_lock.release()
+
+        self.last_reload = dict(result, at=time.time())
+        return result
+
+    def start_watcher(self) -> None:
+        """Start polling the CSV modification time (idempotent)."""
+        if self._watcher is None and self.poll_seconds > 0:
+            self._watcher = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self) -> None:
+        """Stop the mtime watcher."""
+        self._stop.set()
+
+    def status(self) -> dict:
+        """
+        Current version and reload state.
+
+        Returns:
+            dict: Version, row count, load time, whether a reload is running,
+                the last reload outcome and the last error.
+        """
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "rows": len(snapshot.records) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reloading": self._reloading,
+            "watching": self._watcher is not None,
+            "last_reload": self.last_reload,
+            "error": self.error,
+        }
+
+    def _reload(self, force: bool) -> dict:
+        """Reload sequence, with the reload lock held (see reload)."""
+        start = time.perf_counter()
+        source_path = self.csv_path if os.path.exists(self.csv_path) else self.compiled_path
+        mtime = os.path.getmtime(source_path)
+        # Remembered even if loading fails, so the watcher waits for the next change
+        self._seen_mtime = mtime
+        version = file_version(source_path)
+
+        old = self._snapshot
+        if old is not None and version == old.version and not force:
+            return {"status": "unchanged", "version": version}
+
+        # The compiled file is only used when it was built from this CSV version
+        csv_version = version if source_path == self.csv_path else None
+        records = load_catalog(self.csv_path, self.compiled_path, csv_version=csv_version)
+        if self.compiled_path and not records.memory_mapped:
+            # Compile once so the other workers can map the new version. Best effort:
+            # the in-memory records serve this process either way.
+            try:
+                records.save(self.compiled_path, source_version=version)
+            except OSError as e:
+                print(f"Could not write the compiled catalog {self.compiled_path}: {e}")
+        hashes = row_hashes(records)
+
+        # Few changed rows: reuse the n-gram postings of the current index. Indexes
+        # below prefilter_min_size have no postings, so they are always rebuilt.
+        changed = count_changed_rows(old.row_hashes, hashes) if old is not None else len(hashes)
+        reuse = (old is not None and old.index.prefilter_k > 0
+                 and changed <= self.incremental_max_changed * max(len(hashes), 1))
+        index = DrugIndex(
+            records,
+            prefilter_k=self.prefilter_k,
+            prefilter_min_size=self.prefilter_min_size,
+            previous=old.index if reuse else None,
+            version=version
+        )
+        incremental = reuse and index.prefilter_k > 0
+
+        # Atomic swap: requests holding the old snapshot keep using it
+        snapshot = CatalogSnapshot(version, records, index, mtime, hashes)
+        self._snapshot = snapshot
+        self.error = None
+        for callback in self._listeners:
+            callback(snapshot)
+
+        seconds = time.perf_counter() - start
+        print(f"Catalog version {version} loaded ({len(records)} rows, "
+              f"{'incremental' if incremental else 'full'} build, {changed} rows changed) in {seconds:.2f} s")
+        return {
+            "status": "loaded",
+            "version": version,
+            "previous_version": old.version if old is not None else None,
+            "mode": "incremental" if incremental else "full",
+            "rows": len(records),
+            "changed_rows": changed,
+            "seconds": seconds,
+        }
+
+    def _watch(self) -> None:
+        """Reload whenever the CSV modification time changes."""
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                mtime = os.path.getmtime(self.csv_path)
+            except OSError:
+                continue
+            if mtime != self._seen_mtime:
+                self.reload()
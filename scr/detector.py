@@ -0,0 +1,66 @@
+"""
+Detector Backend Module
+
+This module loads the YOLO text-region detector with a selectable inference
+backend. All backends are wrapped by ultralytics, so the loaded model keeps
+the same ``predict`` interface used by scr/text_extraction:
+    - pytorch:   models/best.pt in PyTorch eager mode.
+    - onnx:      models/best.onnx (FP32) on ONNX Runtime.
+    - onnx-int8: models/best.int8.onnx (static INT8, QDQ) on ONNX Runtime.
+
+The ONNX files are produced by scr/detector_export.py.
+"""
+
+import os
+
+# Backend name -> suffix replacing ".pt" in the model path
+DETECTOR_BACKENDS = {
+    "pytorch": ".pt",
+    "onnx": ".onnx",
+    "onnx-int8": ".int8.onnx",
+}
+
+
+def detector_path(model_path: str, backend: str) -> str:
+    """
+    Path of the model file used by a backend.
+
+    Args:
+        model_path (str): Path to the PyTorch model (.pt file).
+        backend (str): One of DETECTOR_BACKENDS.
+
+    Returns:
+        str: Path of the backend's model file.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend!r}, expected one of {list(DETECTOR_BACKENDS)}")
+    return os.path.splitext(model_path)[0] + DETECTOR_BACKENDS[backend]
+
+
+def load_detector(model_path: str, backend: str = "pytorch"):
+    """
+    Load the YOLO detector with the given backend.
+
+    When the exported file of the backend does not exist yet, the PyTorch model
+    is loaded instead (with a message), so a missing export does not stop the app.
+
+    Args:
+        model_path (str): Path to the PyTorch model (.pt file).
+        backend (str, optional): One of DETECTOR_BACKENDS. Defaults to "pytorch".
+
+    Returns:
+        YOLO: An initialized YOLO model ready for inference.
+    """
+    from ultralytics import YOLO
+
+    path = detector_path(model_path, backend)
+    if backend != "pytorch" and not os.path.exists(path):
+        print(f"Detector backend {backend!r}: {path} not found, using {model_path} "
+              f"(run python -m scr.detector_export to create it)")
+        return YOLO(model_path)
+
+    # Exported files do not record their task, so it is given explicitly
+    return YOLO(path, task="detect")
@@ -0,0 +1,351 @@
+"""
+Detector Export Module
+
+This module exports the YOLO detector (models/best.pt) for CPU inference with
+ONNX Runtime:
+    - FP32 ONNX (dynamic batch and image size), via ultralytics.
+    - INT8 ONNX, statically quantized (QDQ, per-channel weights) with
+      activation ranges calibrated on dataset/valid/images. The detection head
+      (box decoding and DFL) stays in FP32, since quantizing box coordinates
+      costs most of the accuracy.
+
+After exporting, an accuracy guard validates every backend on a dataset split
+and compares its mAP with the PyTorch model. The command fails when the INT8
+model loses more than --max-map-drop mAP50-95.
+
+Usage:
+    python -m scr.detector_export [--model models/best.pt] [--calib-size 200] [--split val]
+    python -m scr.detector_export --check-only
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from scr.detector import detector_path
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ROOT_DIR, "models", "best.pt")
+DATA_YAML = os.path.join(ROOT_DIR, "dataset", "data.yaml")
+CALIBRATION_DIR = os.path.join(ROOT_DIR, "dataset", "valid", "images")
+
+# Detector input size the models are exported and validated at
+EXPORT_IMGSZ = 640
+
+# Largest accepted mAP50-95 loss of the INT8 model against PyTorch (absolute)
+MAX_MAP_DROP = 0.01
+
+
+def letterbox(image: np.ndarray, size: int) -> np.ndarray:
+    """
+    Prepare an image like the ultralytics predictor: resize with padding, RGB, CHW, [0, 1].
+
+    Args:
+        image (np.ndarray): Image in OpenCV BGR format.
+        size (int): Square input size.
+
+    Returns:
+        np.ndarray: float32 tensor of shape (1, 3, size, size).
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - new_h) // 2, (size - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor)
+
+
+class ImageCalibrationReader:
+    """
+    Calibration data for onnxruntime.quantization.quantize_static.
+
+    Attributes:
+        paths (list[str]): Calibration images.
+        input_name (str): Name of the model input.
+        size (int): Input size.
+    """
+
+    def __init__(self, paths: List[str], input_name: str, size: int):
+        self.paths = paths
+        self.input_name = input_name
+        self.size = size
+        self._next = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        """Input feed of the next readable image, or None when all were used."""
+        while self._next < len(self.paths):
+            image = cv2.imread(self.paths[self._next], cv2.IMREAD_COLOR)
+            self._next += 1
+            if image is not None:
+                return {self.input_name: letterbox(image, self.size)}
+        return None
+
+    def rewind(self) -> None:
+        """Start again from the first image."""
+        self._next = 0
+
+
+def calibration_images(images_dir: str, limit: int) -> List[str]:
+    """
+    Pick calibration images evenly spread over a directory.
+
+    Args:
+        images_dir (str): Directory of images.
+        limit (int): Maximum number of images (0 keeps all).
+
+    Returns:
+        list[str]: Image paths.
+    """
+    paths = sorted(
+        p for p in glob.glob(os.path.join(images_dir, "*"))
+        if p.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    if limit and len(paths) > limit:
+        step = len(paths) / limit
+        paths = [paths[int(i * step)] for i in range(limit)]
+    return paths
+
+
+def export_onnx(model_path: str, imgsz: int = EXPORT_IMGSZ) -> str:
+    """
+    Export the PyTorch model to FP32 ONNX next to it.
+
+    Args:
+        model_path (str): Path to the PyTorch model (.pt file).
+        imgsz (int, optional): Input size. Defaults to EXPORT_IMGSZ.
+
+    Returns:
+        str: Path of the ONNX file.
+    """
+    from ultralytics import YOLO
+
+    # Dynamic axes, so batched predict calls (extract_texts_batch) keep working
+    exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    target = detector_path(model_path, "onnx")
+    if os.path.abspath(exported) != os.path.abspath(target):
+        os.replace(exported, target)
+    return target
+
+
+def head_nodes(onnx_path: str) -> List[str]:
+    """
+    Names of the nodes of the last model module (the YOLO Detect head).
+
+    Args:
+        onnx_path (str): ONNX model exported by ultralytics.
+
+    Returns:
+        list[str]: Node names under "/model.<last>/".
+    """
+    import onnx
+
+    nodes = onnx.load(onnx_path, load_external_data=False).graph.node
+    modules = {}
+    for node in nodes:
+        found = re.match(r"^/model\.(\d+)/", node.name)
+        if found:
+            modules.setdefault(int(found.group(1)), []).append(node.name)
+    return modules[max(modules)] if modules else []
+
+
+def quantize_int8(fp32_path: str, int8_path: str, calibration: List[str], imgsz: int = EXPORT_IMGSZ,
+                  method: str = "minmax", exclude_head: bool = True) -> str:
+    """
+    Statically quantize an ONNX detector to INT8.
+
+    Args:
+        fp32_path (str): FP32 ONNX model.
+        int8_path (str): Output path.
+        calibration (list[str]): Calibration images.
+        imgsz (int, optional): Input size. Defaults to EXPORT_IMGSZ.
+        method (str, optional): Calibration method: "minmax", "entropy" or "percentile".
+        exclude_head (bool, optional): Keep the detection head in FP32. Defaults to True.
+
+    Returns:
+        str: Path of the INT8 model.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    methods = {
+        "minmax": CalibrationMethod.MinMax,
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+    }
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Shape inference and graph cleanup recommended before quantization
+        prepared = os.path.join(tmp_dir, "prepared.onnx")
+        quant_pre_process(fp32_path, prepared)
+
+        quantize_static(
+            prepared,
+            int8_path,
+            ImageCalibrationReader(calibration, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            calibrate_method=methods[method],
+            nodes_to_exclude=head_nodes(fp32_path) if exclude_head else [],
+        )
+    return int8_path
+
+
+def resolved_data_yaml(data_yaml: str, out_dir: str) -> str:
+    """
+    Copy a Roboflow data.yaml with absolute split paths, so ultralytics finds the images.
+
+    Args:
+        data_yaml (str): Dataset description (splits as "../<split>/images").
+        out_dir (str): Directory for the resolved copy.
+
+    Returns:
+        str: Path of the resolved yaml.
+    """
+    import yaml
+
+    dataset_dir = os.path.dirname(os.path.abspath(data_yaml))
+    with open(data_yaml, encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    for split in ("train", "val", "test"):
+        if isinstance(data.get(split), str):
+            relative = data[split].replace("../", "", 1) if data[split].startswith("../") else data[split]
+            data[split] = os.path.join(dataset_dir, relative)
+    data.pop("path", None)
+
+    path = os.path.join(out_dir, "data.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f)
+    return path
+
+
+def evaluate(model_path: str, backend: str, data_yaml: str, imgsz: int = EXPORT_IMGSZ,
+             split: str = "val") -> Dict[str, float]:
+    """
+    Validate one backend on a dataset split.
+
+    The backend's own model file is loaded, without load_detector's fallback to
+    the PyTorch model, so a missing export cannot pass as a zero-loss backend.
+
+    Args:
+        model_path (str): Path to the PyTorch model (.pt file).
+        backend (str): Detector backend.
+        data_yaml (str): Resolved dataset description.
+        imgsz (int, optional): Input size. Defaults to EXPORT_IMGSZ.
+        split (str, optional): Dataset split. Defaults to "val".
+
+    Returns:
+        dict[str, float]: mAP50 and mAP50-95.
+
+    Raises:
+        FileNotFoundError: If the backend's model file does not exist.
+    """
+    from ultralytics import YOLO
+
+    path = detector_path(model_path, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Detector backend {backend!r}: {path} not found")
+    model = YOLO(path, task="detect")
+    metrics = model.val(data=data_yaml, imgsz=imgsz, batch=1, split=split, device="cpu",
+                        plots=False, verbose=False)
+    return {"map50": float(metrics.box.map50), "map50_95": float(metrics.box.map)}
+
+
+def accuracy_report(model_path: str, backends: List[str], data_yaml: str = DATA_YAML,
+                    imgsz: int = EXPORT_IMGSZ, split: str = "val") -> Dict[str, dict]:
+    """
+    mAP of each backend and its difference with the PyTorch model.
+
+    Args:
+        model_path (str): Path to the PyTorch model (.pt file).
+        backends (list[str]): Backends to validate (exported files must exist).
+        data_yaml (str, optional): Dataset description. Defaults to DATA_YAML.
+        imgsz (int, optional): Input size. Defaults to EXPORT_IMGSZ.
+        split (str, optional): Dataset split. Defaults to "val".
+
+    Returns:
+        dict[str, dict]: Backend -> map50, map50_95, delta_map50, delta_map50_95.
+
+    Raises:
+        FileNotFoundError: If the model file of a backend does not exist.
+    """
+    # Fail before the (slow) validation runs when an export is missing
+    missing = [detector_path(model_path, b) for b in ["pytorch"] + backends
+               if not os.path.exists(detector_path(model_path, b))]
+    if missing:
+        raise FileNotFoundError(f"Missing detector model files: {', '.join(missing)}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = resolved_data_yaml(data_yaml, tmp_dir)
+        report = {b: evaluate(model_path, b, data, imgsz, split) for b in ["pytorch"] + backends}
+
+    reference = report["pytorch"]
+    for metrics in report.values():
+        metrics["delta_map50"] = metrics["map50"] - reference["map50"]
+        metrics["delta_map50_95"] = metrics["map50_95"] - reference["map50_95"]
+    return report
+
+
+def main() -> None:
+    """Export the detector, then check the accuracy of the exported backends."""
+    parser = argparse.ArgumentParser(description="Export the YOLO detector to FP32/INT8 ONNX.")
+    parser.add_argument("--model", default=MODEL_PATH, help="PyTorch model (.pt)")
+    parser.add_argument("--imgsz", type=int, default=EXPORT_IMGSZ, help="Input size")
+    parser.add_argument("--calib-images", default=CALIBRATION_DIR, help="Calibration images")
+    parser.add_argument("--calib-size", type=int, default=200, help="Number of calibration images (0 = all)")
+    parser.add_argument("--calib-method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--quantize-head", action="store_true", help="Also quantize the detection head")
+    parser.add_argument("--data", default=DATA_YAML, help="Dataset used by the accuracy guard")
+    parser.add_argument("--split", default="val", help="Dataset split used by the accuracy guard")
+    parser.add_argument("--max-map-drop", type=float, default=MAX_MAP_DROP,
+                        help="Largest accepted INT8 mAP50-95 loss")
+    parser.add_argument("--check-only", action="store_true", help="Only run the accuracy guard")
+    parser.add_argument("--skip-check", action="store_true", help="Do not run the accuracy guard")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        fp32_path = export_onnx(args.model, args.imgsz)
+        print(f"FP32 ONNX: {fp32_path}")
+
+        calibration = calibration_images(args.calib_images, args.calib_size)
+        int8_path = quantize_int8(fp32_path, detector_path(args.model, "onnx-int8"), calibration,
+                                  args.imgsz, args.calib_method, exclude_head=not args.quantize_head)
+        print(f"INT8 ONNX: {int8_path} (calibrated on {len(calibration)} images)")
+
+    if args.skip_check:
+        return
+
+    try:
+        report = accuracy_report(args.model, ["onnx", "onnx-int8"], args.data, args.imgsz, args.split)
+    except FileNotFoundError as e:
+        print(f"Accuracy guard failed: {e} (run without --check-only to export)")
+        sys.exit(1)
+    for backend, m in report.items():
+        print(f"{backend:<10} mAP50 {m['map50']:.4f} ({m['delta_map50']:+.4f})  "
+              f"mAP50-95 {m['map50_95']:.4f} ({m['delta_map50_95']:+.4f})")
+
+    drop = -report["onnx-int8"]["delta_map50_95"]
+    if drop > args.max_map_drop:
+        print(f"INT8 model loses {drop:.4f} mAP50-95 (limit {args.max_map_drop}): "
+              f"try --calib-method percentile or more calibration images")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
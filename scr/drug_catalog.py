@@ -0,0 +1,420 @@
+"""
+Drug Catalog Module
+
+This module provides a compact, column-oriented store for the drug dataset,
+replacing the pandas ``to_dict(orient="records")`` list (one dict per row,
+repeating every column name). Each column is kept as a single UTF-8 blob plus
+an array of cell offsets, and rows are exposed as lightweight read-only
+mappings.
+
+The catalog can be compiled once into a binary file that loads by
+memory-mapping: startup skips CSV parsing, and every worker process mapping
+the same file shares its pages through the OS page cache. The compiled file
+records the hash of the CSV it was built from and is only used for that CSV.
+
+Build the binary file from the CSV with:
+    python -m scr.drug_catalog dataset/durg.csv dataset/durg.catalog
+"""
+
+import argparse
+import csv
+import gc
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+# File signature and header layout of the compiled catalog
+CATALOG_MAGIC = b"DWKCAT01"
+HEADER_FORMAT = "<8sI"  # magic, length of the JSON header that follows
+
+# Offsets and blobs start on 8-byte boundaries
+ALIGNMENT = 8
+
+# Offsets are stored as uint32 unless a column blob reaches 4 GiB
+OFFSET_TYPECODES = {4: "I", 8: "Q"}
+
+# Values of columns stored as booleans (the same spellings pandas recognizes)
+BOOL_VALUES = {"true": True, "false": False}
+
+# Files are hashed in chunks of this size to compute their version
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_version(path: str) -> str:
+    """
+    Content version of a file.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 of the file, so every worker
+            loading the same file reports the same version.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def compiled_source_version(path: str) -> Optional[str]:
+    """
+    Version of the CSV a compiled catalog was built from, read from its header.
+
+    Args:
+        path (str): Compiled catalog file.
+
+    Returns:
+        str | None: The CSV version, or None when the file is not a compiled catalog
+            or does not record it.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(struct.calcsize(HEADER_FORMAT))
+        if len(prefix) < struct.calcsize(HEADER_FORMAT):
+            return None
+        magic, header_size = struct.unpack(HEADER_FORMAT, prefix)
+        if magic != CATALOG_MAGIC:
+            return None
+        header = json.loads(f.read(header_size).decode("utf-8"))
+    return header.get("source_version")
+
+
+class DrugRecord(Mapping):
+    """
+    Read-only view of one catalog row, usable wherever a record dict was.
+
+    Cells are decoded on access; empty cells read as empty strings.
+    """
+
+    __slots__ = ("_catalog", "_row")
+
+    def __init__(self, catalog: "DrugCatalog", row: int):
+        self._catalog = catalog
+        self._row = row
+
+    def __getitem__(self, column: str):
+        return self._catalog.value(self._row, column)
+
+    def __iter__(self):
+        return iter(self._catalog.columns)
+
+    def __len__(self) -> int:
+        return len(self._catalog.columns)
+
+    def __repr__(self) -> str:
+        return f"DrugRecord({dict(self)!r})"
+
+
+class DrugCatalog(Sequence):
+    """
+    Column-oriented drug catalog backed by in-memory or memory-mapped buffers.
+
+    Attributes:
+        columns (list[str]): Column names, in CSV order.
+        kinds (dict[str, str]): Column name → value kind ("str" or "bool").
+        source_version (str | None): Version of the CSV a compiled catalog was built from.
+    """
+
+    def __init__(self, columns: List[str], kinds: Dict[str, str], rows: int,
+                 offsets: list, blobs: list, source=None, source_version: Optional[str] = None):
+        """
+        Wrap prebuilt column buffers (use from_csv or load to create a catalog).
+
+        Args:
+            columns (list[str]): Column names.
+            kinds (dict[str, str]): Value kind of each column.
+            rows (int): Number of rows.
+            offsets (list): Per column, rows + 1 byte offsets into its blob (array or
+                memoryview of unsigned integers).
+            blobs (list): Per column, the concatenated UTF-8 cell values (bytes or memoryview).
+            source (mmap.mmap, optional): Mapping that backs the buffers, kept open.
+            source_version (str, optional): Version of the source CSV. Defaults to None.
+        """
+        self.columns = list(columns)
+        self.kinds = dict(kinds)
+        self.source_version = source_version
+        self._rows = rows
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._offsets = offsets
+        self._blobs = blobs
+        self._source = source
+
+    # ----- Construction -----
+
+    @classmethod
+    def from_columns(cls, columns: List[str], cells: List[List[str]]) -> "DrugCatalog":
+        """
+        Build a catalog from per-column lists of string cells.
+
+        Args:
+            columns (list[str]): Column names.
+            cells (list[list[str]]): Values of each column, all of the same length.
+
+        Returns:
+            DrugCatalog: The catalog.
+        """
+        offsets, blobs, kinds = [], [], {}
+        for name, values in zip(columns, cells):
+            text = "".join(values)
+            blob = text.encode("utf-8")
+            # Byte lengths equal character lengths for ASCII-only columns
+            lengths = map(len, values) if text.isascii() else (len(v.encode("utf-8")) for v in values)
+            column_offsets = array(OFFSET_TYPECODES[4 if len(blob) < 2 ** 32 else 8], [0])
+            column_offsets.extend(accumulate(lengths))
+            offsets.append(column_offsets)
+            blobs.append(blob)
+
+            # A column is boolean when every non-empty cell is true/false
+            distinct = set(values)
+            if len(distinct) <= 16:
+                distinct = {value.strip().lower() for value in distinct} - {""}
+            kinds[name] = "bool" if distinct and distinct <= BOOL_VALUES.keys() else "str"
+        return cls(columns, kinds, len(cells[0]) if cells else 0, offsets, blobs)
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> "DrugCatalog":
+        """
+        Parse the drug CSV (malformed rows are skipped).
+
+        Args:
+            csv_path (str): Path to the drug CSV.
+
+        Returns:
+            DrugCatalog: The catalog.
+        """
+        # Millions of short-lived row lists only trigger useless GC passes
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(csv_path, encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                columns = next(reader, [])
+                rows = []
+                for row in reader:
+                    if len(row) == len(columns):
+                        rows.append(row)
+                    elif len(row) < len(columns) and any(row):
+                        rows.append(row + [""] * (len(columns) - len(row)))
+                    # Longer rows are malformed and skipped (as with on_bad_lines='skip')
+
+            cells = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+            del rows
+            return cls.from_columns(columns, cells)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    @classmethod
+    def load(cls, path: str) -> "DrugCatalog":
+        """
+        Memory-map a compiled catalog file.
+
+        Args:
+            path (str): Path written by save.
+
+        Returns:
+            DrugCatalog: Catalog whose columns point into the mapped file.
+
+        Raises:
+            ValueError: If the file is not a compiled catalog, or was built on a machine
+                with a different byte order.
+        """
+        with open(path, "rb") as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = struct.unpack_from(HEADER_FORMAT, source, 0)
+        if magic != CATALOG_MAGIC:
+            source.close()
+            raise ValueError(f"{path} is not a compiled drug catalog")
+        start = struct.calcsize(HEADER_FORMAT)
+        header = json.loads(bytes(source[start:start + header_size]).decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            source.close()
+            raise ValueError(f"{path} was compiled on a {header['byteorder']}-endian machine; rebuild it")
+
+        rows = header["rows"]
+        offsets, blobs = [], []
+        view = memoryview(source)
+        for column in header["layout"]:
+            end = column["offsets"] + column["itemsize"] * (rows + 1)
+            offsets.append(view[column["offsets"]:end].cast(OFFSET_TYPECODES[column["itemsize"]]))
+            blobs.append(view[column["data"]:column["data"] + column["size"]])
+        return cls(header["columns"], header["kinds"], rows, offsets, blobs, source=source,
+                   source_version=header.get("source_version"))
+
+    def save(self, path: str, source_version: Optional[str] = None) -> None:
+        """
+        Write the catalog in the compiled (memory-mappable) format.
+
+        Layout: magic, JSON header size, JSON header (columns, kinds, row count,
+        source CSV version and the position of each column), then for every column its offsets
+        (native-endian uint32 or uint64) followed by its UTF-8 blob, each
+        8-byte aligned.
+
+        Args:
+            path (str): Output file path.
+            source_version (str, optional): Version (file_version) of the CSV the catalog
+                was parsed from; load_catalog only uses the file for that CSV.
+                Defaults to the catalog's own source_version.
+        """
+        # Reserve room for the header with placeholder positions at least as wide
+        # as the real ones, then lay the columns out after it
+        layout = [
+            {"offsets": 10 ** 15, "itemsize": o.itemsize, "data": 10 ** 15, "size": len(b)}
+            for o, b in zip(self._offsets, self._blobs)
+        ]
+        header = {
+            "rows": self._rows, "columns": self.columns, "kinds": self.kinds,
+            "byteorder": sys.byteorder, "source_version": source_version or self.source_version,
+            "layout": layout
+        }
+        start = _align(struct.calcsize(HEADER_FORMAT) + len(json.dumps(header).encode("utf-8")))
+
+        position = start
+        for column in layout:
+            column["offsets"] = position
+            position = _align(position + column["itemsize"] * (self._rows + 1))
+            column["data"] = position
+            position = _align(position + column["size"])
+
+        encoded = json.dumps(header).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, CATALOG_MAGIC, len(encoded)))
+            f.write(encoded)
+            for column, column_offsets, blob in zip(layout, self._offsets, self._blobs):
+                f.write(b"\0" * (column["offsets"] - f.tell()))
+                f.write(column_offsets)
+                f.write(b"\0" * (column["data"] - f.tell()))
+                f.write(blob)
+        # Replace atomically so running workers never map a half-written file
+        os.replace(tmp_path, path)
+
+    # ----- Access -----
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [DrugRecord(self, i) for i in range(*row.indices(self._rows))]
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError("catalog row out of range")
+        return DrugRecord(self, row)
+
+    def value(self, row: int, column: str):
+        """
+        Decode one cell.
+
+        Args:
+            row (int): Row number.
+            column (str): Column name.
+
+        Returns:
+            str | bool: The cell value (booleans for "bool" columns; empty cells are "").
+
+        Raises:
+            KeyError: If the column does not exist.
+        """
+        i = self._positions[column]
+        offsets = self._offsets[i]
+        text = str(self._blobs[i][offsets[row]:offsets[row + 1]], "utf-8")
+        if self.kinds[column] == "bool" and text:
+            return BOOL_VALUES.get(text.strip().lower(), text)
+        return text
+
+    def column(self, name: str) -> List:
+        """
+        Decode a whole column.
+
+        Args:
+            name (str): Column name.
+
+        Returns:
+            list: Values of the column, one per row.
+        """
+        i = self._positions[name]
+        blob, offsets = self._blobs[i], self._offsets[i]
+        if self.kinds[name] == "str":
+            text = str(blob, "utf-8")
+            if len(text) == len(blob):
+                # ASCII only: byte offsets are character offsets, so slice the decoded blob
+                return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        return [self.value(row, name) for row in range(self._rows)]
+
+    def nbytes(self) -> int:
+        """
+        Size of the column buffers (offsets and blobs).
+
+        Returns:
+            int: Bytes held by the catalog data, in memory or mapped.
+        """
+        return sum(len(o) * o.itemsize + len(b) for o, b in zip(self._offsets, self._blobs))
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether the columns point into a memory-mapped file."""
+        return self._source is not None
+
+
+def load_catalog(csv_path: str, compiled_path: Optional[str] = None,
+                 csv_version: Optional[str] = None) -> DrugCatalog:
+    """
+    Load the drug catalog, preferring the compiled file when it is up to date.
+
+    The compiled file is up to date when it was built from the current CSV
+    content (its recorded source version equals the CSV's hash); mtimes are
+    not trusted, as copying a file can preserve an older one.
+
+    Args:
+        csv_path (str): Path to the drug CSV.
+        compiled_path (str, optional): Path to the compiled catalog. It is used when
+            it was built from this CSV, or when the CSV is missing. Defaults to None
+            (CSV only).
+        csv_version (str, optional): file_version of the CSV, when already computed.
+
+    Returns:
+        DrugCatalog: The catalog.
+    """
+    if compiled_path and os.path.exists(compiled_path):
+        if not os.path.exists(csv_path):
+            return DrugCatalog.load(compiled_path)
+        csv_version = csv_version or file_version(csv_path)
+        if compiled_source_version(compiled_path) == csv_version:
+            return DrugCatalog.load(compiled_path)
+        print(f"{compiled_path} was not built from the current {csv_path}; reading the CSV instead.")
+    return DrugCatalog.from_csv(csv_path)
+
+
+def main() -> None:
+    """Compile the drug CSV into the memory-mappable catalog format."""
+    parser = argparse.ArgumentParser(description="Compile the drug CSV into a memory-mappable catalog file.")
+    parser.add_argument("csv_path", help="Input drug CSV")
+    parser.add_argument("output_path", help="Output compiled catalog")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = DrugCatalog.from_csv(args.csv_path)
+    catalog.save(args.output_path, source_version=file_version(args.csv_path))
+    print(f"Compiled {len(catalog)} drugs ({len(catalog.columns)} columns) into "
+          f"{args.output_path} ({os.path.getsize(args.output_path) / 1024:.1f} KiB) "
+          f"in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
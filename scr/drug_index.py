@@ -0,0 +1,383 @@
+"""
+Drug Index Module
+
+This module provides a prebuilt, in-memory index over the drug dictionary.
+The index is built once when the catalog loads, so matching OCR tokens no
+longer walks every drug record (and splits every substitutes string) on each
+request.
+
+Fuzzy-scoring results can be memoized across requests and worker processes
+with a MatchMemo (see scr/match_memo.py), keyed by the index's catalog version.
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+from rapidfuzz import process, fuzz
+from scr.drug_catalog import DrugCatalog
+from scr.match_cascade import MatchCascade
+from scr.match_memo import MatchMemo
+from scr.ngram_index import NgramIndex
+from scr.transliteration import arabic_skeleton, latin_skeleton
+
+# Upper bound on the size of a token × catalog score matrix computed in one
+# cdist call (float64 cells); larger batches are scored in row chunks.
+MAX_BATCH_CELLS = 1 << 22
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a drug name or OCR token for lookup.
+
+    Args:
+        name (str): Raw name or token.
+
+    Returns:
+        str: Lowercased name with surrounding whitespace removed.
+    """
+    return str(name).lower().strip()
+
+
+class DrugIndex:
+    """
+    Prebuilt lookup structures for matching OCR tokens against drug records.
+
+    Attributes:
+        records (list[dict] | DrugCatalog): Drug records, indexed by record id.
+        choices (list[str]): Pre-normalized search strings (drug names and substitutes).
+        choice_ids (list[int]): Record id behind each entry of ``choices``.
+        names (list[str]): Normalized primary drug name of each record.
+        name_ids (dict[str, list[int]]): Normalized drug name → record ids.
+        aliases (dict[int, list[str]]): Record id → normalized substitute aliases.
+        prefilter_k (int): Candidates shortlisted per token by the n-gram prefilter
+            (0 when the prefilter is disabled).
+        memo_namespace (str | None): Key of this index's entries in a MatchMemo (catalog
+            version and prefilter setting), or None when the index has no version.
+    """
+
+    def __init__(self, records: List[dict], prefilter_k: int = 0, prefilter_min_size: int = 0,
+                 previous: Optional["DrugIndex"] = None, version: Optional[str] = None):
+        """
+        Build the index from a list of drug records.
+
+        Args:
+            records (list[dict] | DrugCatalog): Drug records (one mapping per CSV row).
+                A DrugCatalog is kept as is rather than copied into a list.
+            prefilter_k (int, optional): Shortlist the top-K trigram candidates per token
+                before exact scoring; 0 disables the prefilter. Defaults to 0.
+            prefilter_min_size (int, optional): Only enable the prefilter when the catalog
+                has at least this many searchable names. Defaults to 0.
+            previous (DrugIndex, optional): Index over an earlier version of the catalog;
+                its n-gram postings are reused for names that did not change.
+            version (str, optional): Catalog version; needed to memoize matches across
+                requests. Defaults to None.
+        """
+        self.records = records if isinstance(records, DrugCatalog) else list(records)
+        self.names = []
+        self.name_ids = {}
+        self.aliases = {}
+
+        # Each drug name and its substitutes map to a record id; as before, a
+        # later record overrides an earlier one that shares the same string.
+        lookup = {}
+        if isinstance(self.records, DrugCatalog):
+            # Decode only the two searchable columns, in bulk
+            columns = zip(*(
+                self.records.column(c) if c in self.records.columns else [None] * len(self.records)
+                for c in ("drug_name", "substitutes")
+            ))
+        else:
+            columns = ((drug.get("drug_name"), drug.get("substitutes")) for drug in self.records)
+
+        for record_id, (name, substitutes) in enumerate(columns):
+            if isinstance(name, str) and name:
+                lookup[name.lower()] = record_id
+
+            normalized = normalize_name(name)
+            self.names.append(normalized)
+            self.name_ids.setdefault(normalized, []).append(record_id)
+
+            # Include substitutes (if any). Some may be comma-separated.
+            if isinstance(substitutes, str) and substitutes:
+                for sub in substitutes.split(","):
+                    sub = sub.strip().lower()
+                    if sub:
+                        lookup[sub] = record_id
+                        self.aliases.setdefault(record_id, []).append(sub)
+
+        self.choices = list(lookup.keys())
+        self.choice_ids = list(lookup.values())
+
+        # Latin skeletons of the choices for Arabic tokens, and the tiered
+        # matcher, built on first use
+        self._skeletons = None
+        self._cascade = None
+
+        # Trigram prefilters over the choices and the distinct primary names
+        self.prefilter_k = 0
+        if prefilter_k > 0 and len(self.choices) >= prefilter_min_size:
+            self.prefilter_k = prefilter_k
+            reuse = previous is not None and previous.prefilter_k
+            self.choice_grams = NgramIndex(self.choices, previous=previous.choice_grams if reuse else None)
+            self.unique_names = list(self.name_ids.keys())
+            self.name_grams = NgramIndex(self.unique_names, previous=previous.name_grams if reuse else None)
+
+        # The prefilter shortlist changes the best choice, so it is part of the key
+        self.memo_namespace = f"{version}/k{self.prefilter_k}" if version else None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def match(self, tokens: List[str], threshold: float,
+              batched: bool = False, workers: int = 1,
+              arabic_tokens: Optional[List[str]] = None, cascade: bool = False,
+              memo: Optional[MatchMemo] = None) -> List[dict]:
+        """
+        Match OCR-extracted tokens against the indexed drug names and substitutes.
+
+        Arabic tokens are compared through transliteration (see scr/transliteration.py)
+        and only add drugs that no Latin token matched.
+
+        Args:
+            tokens (list[str]): OCR-extracted text tokens.
+            threshold (float): Minimum token_sort_ratio score required to accept a match.
+            batched (bool, optional): Score all tokens against the catalog in a single
+                vectorized call instead of one extractOne call per token. Defaults to False.
+            workers (int, optional): Worker threads for batched scoring (-1 uses all
+                CPU cores). Ignored when batched is False. Defaults to 1.
+            arabic_tokens (list[str], optional): Arabic OCR tokens. Defaults to None.
+            cascade (bool, optional): Resolve tokens through the noise, exact and phonetic
+                tiers first (see scr/match_cascade.py) and score only the rest; the
+                matches are the same. Defaults to False.
+            memo (MatchMemo, optional): Reuse and store the fuzzy-scoring results of
+                tokens (ignored when the index has no version). Defaults to None.
+
+        Returns:
+            list[dict]: Matches deduplicated by matched_name (first occurrence kept),
+                each with extracted_word, matched_name, score and details (the drug record).
+        """
+        matches = []
+        seen = set()
+        if not self.choices:
+            return matches
+
+        queries = [normalize_name(word) for word in tokens]
+        if cascade:
+            shortlist = self._shortlist if self.prefilter_k else None
+            best, pending = self.cascade().resolve(queries, threshold, shortlist, phonetic=not batched)
+        else:
+            best, pending = [None] * len(queries), list(range(len(queries)))
+
+        if memo is not None and self.memo_namespace and pending:
+            known = memo.get_many(self.memo_namespace, [queries[i] for i in pending], threshold)
+            for position in pending:
+                best[position] = known.get(queries[position])
+            pending = [i for i in pending if queries[i] not in known]
+
+        scored = self._score([queries[i] for i in pending], threshold, batched, workers)
+        for position, result in zip(pending, scored):
+            best[position] = result
+        if memo is not None and self.memo_namespace and pending:
+            memo.put_many(self.memo_namespace, {queries[i]: best[i] for i in pending}, threshold)
+
+        for word, result in zip(tokens, best):
+            if result is None:
+                continue
+
+            choice_id, score = result
+            match_name = self.choices[choice_id]
+            if score >= threshold and match_name not in seen:
+                seen.add(match_name)
+                matches.append({
+                    "extracted_word": word,
+                    "matched_name": match_name,
+                    "score": score,
+                    "details": self.records[self.choice_ids[choice_id]]
+                })
+
+        for word, (choice_id, score) in self._best_arabic_choices(arabic_tokens or [], threshold):
+            match_name = self.choices[choice_id]
+            if match_name not in seen:
+                seen.add(match_name)
+                matches.append({
+                    "extracted_word": word,
+                    "matched_name": match_name,
+                    "score": score,
+                    "details": self.records[self.choice_ids[choice_id]]
+                })
+
+        return matches
+
+    def cascade(self) -> MatchCascade:
+        """
+        Tiered matcher over the choices, built on first use.
+
+        Returns:
+            MatchCascade: The matcher (its stats() reports per-tier hit counts).
+        """
+        if self._cascade is None:
+            self._cascade = MatchCascade(self.choices)
+        return self._cascade
+
+    def _score(self, queries: List[str], threshold: float, batched: bool,
+               workers: int) -> List[Optional[Tuple[int, float]]]:
+        """Full fuzzy scoring of queries, per token or batched."""
+        if batched:
+            return self._best_choices_batched(queries, threshold, workers)
+        return self._best_choices(queries)
+
+    def _shortlist(self, query: str) -> np.ndarray:
+        """Ascending ids of the prefilter candidates of a query."""
+        return self.choice_grams.candidates(query, self.prefilter_k)
+
+    def _best_arabic_choices(self, tokens: List[str], threshold: float) -> List[Tuple[str, Tuple[int, float]]]:
+        """
+        Find the best choice for each Arabic token by comparing Latin skeletons.
+
+        Args:
+            tokens (list[str]): Arabic tokens.
+            threshold (float): Minimum token_sort_ratio score.
+
+        Returns:
+            list[tuple[str, tuple[int, float]]]: (token, (choice id, score)) of the tokens
+                with a choice at or above the threshold.
+        """
+        if not tokens:
+            return []
+        if self._skeletons is None:
+            self._skeletons = [latin_skeleton(choice) for choice in self.choices]
+
+        best = []
+        for word in tokens:
+            query = arabic_skeleton(word)
+            if len(query) < 3:
+                continue
+            result = process.extractOne(query, self._skeletons, scorer=fuzz.token_sort_ratio,
+                                        score_cutoff=threshold)
+            if result is not None:
+                _, score, position = result
+                best.append((word, (position, score)))
+        return best
+
+    def _best_choices(self, queries: List[str]) -> List[Optional[Tuple[int, float]]]:
+        """
+        Find the best choice for each query with one extractOne call per query.
+
+        Args:
+            queries (list[str]): Normalized tokens.
+
+        Returns:
+            list[tuple[int, float] | None]: (choice id, score) for each query, or None
+                when the prefilter found no candidate.
+        """
+        best = []
+        for query in queries:
+            if self.prefilter_k:
+                ids = self.choice_grams.candidates(query, self.prefilter_k)
+                if len(ids) == 0:
+                    best.append(None)
+                    continue
+                shortlist = [self.choices[i] for i in ids]
+            else:
+                ids = None
+                shortlist = self.choices
+
+            # Use token_sort_ratio to handle spacing and word order variations
+            _, score, position = process.extractOne(query, shortlist, scorer=fuzz.token_sort_ratio)
+            best.append((position if ids is None else int(ids[position]), score))
+        return best
+
+    def _best_choices_batched(self, queries: List[str], threshold: float,
+                              workers: int) -> List[Optional[Tuple[int, float]]]:
+        """
+        Find the best choice for each query from a token × catalog score matrix.
+
+        Repeated queries are scored once. Scores below the threshold are zeroed
+        by cdist, and argmax keeps the first best choice, so ties resolve the
+        same way as extractOne. With the prefilter enabled, the columns are the
+        union of all shortlists and each row only considers its own shortlist.
+
+        Args:
+            queries (list[str]): Normalized tokens.
+            threshold (float): Score cutoff passed to cdist.
+            workers (int): Worker threads used by cdist.
+
+        Returns:
+            list[tuple[int, float] | None]: (choice id, score) for each query, or None
+                when the prefilter found no candidate.
+        """
+        unique = list(dict.fromkeys(queries))
+        if not unique:
+            return []
+
+        shortlists = None
+        columns = None
+        choices = self.choices
+        if self.prefilter_k:
+            shortlists = [self.choice_grams.candidates(q, self.prefilter_k) for q in unique]
+            columns = np.unique(np.concatenate(shortlists))
+            choices = [self.choices[i] for i in columns]
+            if not choices:
+                return [None] * len(queries)
+
+        best_ids = np.empty(len(unique), dtype=np.intp)
+        best_scores = np.empty(len(unique), dtype=np.float64)
+        rows = max(1, MAX_BATCH_CELLS // len(choices))
+        for start in range(0, len(unique), rows):
+            scores = process.cdist(
+                unique[start:start + rows], choices,
+                scorer=fuzz.token_sort_ratio, score_cutoff=threshold,
+                dtype=np.float64, workers=workers
+            )
+            if shortlists is not None:
+                # Hide the columns outside each row's own shortlist
+                allowed = np.zeros(scores.shape, dtype=bool)
+                for row, ids in enumerate(shortlists[start:start + rows]):
+                    allowed[row, np.searchsorted(columns, ids)] = True
+                scores[~allowed] = -1
+
+            ids = scores.argmax(axis=1)
+            best_ids[start:start + rows] = ids
+            best_scores[start:start + rows] = scores[np.arange(len(ids)), ids]
+
+        if columns is not None:
+            best_ids = columns[best_ids]
+
+        best = {
+            query: (int(choice_id), float(score)) if score >= 0 else None
+            for query, choice_id, score in zip(unique, best_ids, best_scores)
+        }
+        return [best[query] for query in queries]
+
+    def lookup_name(self, name: str, threshold: float) -> Optional[Tuple[dict, float]]:
+        """
+        Find the record whose primary drug name is closest to ``name``.
+
+        Args:
+            name (str): Drug name to search for.
+            threshold (float): Minimum ratio score required to accept a match.
+
+        Returns:
+            tuple[dict, float] | None: The matched record and its score, or None.
+        """
+        if not self.names:
+            return None
+
+        query = normalize_name(name)
+        if self.prefilter_k:
+            # Score the shortlisted distinct names; each maps to its first record
+            ids = self.name_grams.candidates(query, self.prefilter_k)
+            if len(ids) == 0:
+                return None
+            shortlist = [self.unique_names[i] for i in ids]
+            result = process.extractOne(query, shortlist, scorer=fuzz.ratio)
+            if result:
+                match_name, score, _ = result
+                result = (match_name, score, self.name_ids[match_name][0])
+        else:
+            result = process.extractOne(query, self.names, scorer=fuzz.ratio)
+
+        if result:
+            _, score, record_id = result
+            if score >= threshold:
+                return self.records[record_id], score
+        return None
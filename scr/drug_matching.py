@@ -1,20 +1,38 @@
-from rapidfuzz import process, fuzz
-from config import DRUG_DICTIONARY, MATCH_THRESHOLD
+import config
+from config import MATCH_THRESHOLD, MATCH_BATCHED, MATCH_WORKERS, MATCH_CASCADE, MATCH_MEMO
+from scr.drug_index import DrugIndex
+from scr.metrics import MATCHES_PER_IMAGE, span
 
 
-def match_drug_names(cleaned_texts, dictionary=DRUG_DICTIONARY, threshold=MATCH_THRESHOLD):
+def match_drug_names(cleaned_texts, dictionary=None, threshold=MATCH_THRESHOLD,
+                     batched=MATCH_BATCHED, workers=MATCH_WORKERS, arabic_texts=None, cascade=MATCH_CASCADE,
+                     memo=MATCH_MEMO):
     """
     Match OCR-extracted text tokens against a drug dictionary.
 
     This function attempts to find approximate string matches between words
     extracted via OCR and a reference drug dictionary (loaded from a CSV file).
+    The default dictionary is served from the prebuilt DRUG_INDEX (loaded on
+    first use), so the cost of a call depends on the number of tokens rather
+    than the catalog size.
 
     Args:
         cleaned_texts (list[str]): List of OCR-extracted text tokens to match.
-        dictionary (list[dict], optional): Drug dictionary, where each entry is a dict
-            representing a drug and its details. Defaults to DRUG_DICTIONARY.
+        dictionary (list[dict] | DrugIndex, optional): Drug dictionary, where each entry is a dict
+            representing a drug and its details, or a prebuilt DrugIndex. Defaults to the
+            catalog loaded from config (DRUG_DICTIONARY).
         threshold (int, optional): Minimum similarity score required to accept a match.
             Defaults to MATCH_THRESHOLD.
+        batched (bool, optional): Score all tokens against the dictionary in one vectorized
+            call instead of a per-token loop. Defaults to MATCH_BATCHED.
+        workers (int, optional): Worker threads for batched scoring. Defaults to MATCH_WORKERS.
+        arabic_texts (list[str], optional): Arabic OCR texts, matched through
+            transliteration after the Latin tokens. Defaults to None.
+        cascade (bool, optional): Resolve packaging words and exact (or, per token,
+            phonetic) names before fuzzy scoring; the matches are the same.
+            Defaults to MATCH_CASCADE.
+        memo (MatchMemo, optional): Memo of scored tokens shared with other processes;
+            only used for the versioned catalog index. Defaults to MATCH_MEMO.
 
     Returns:
         list[dict]: A list of match results, where each element contains:
@@ -23,51 +41,22 @@ def match_drug_names(cleaned_texts, dictionary=DRUG_DICTIONARY, threshold=MATCH_
             - score (float): The similarity score between extracted word and matched name.
             - details (dict): Full drug row (all details) from the dictionary.
     """
-    if not dictionary:
+    # --- Step 1: Resolve the lookup index for searchable names ---
+    # Custom dictionaries are indexed on the fly; the shared catalog is prebuilt
+    if dictionary is None:
+        index = config.DRUG_INDEX
+    elif isinstance(dictionary, DrugIndex):
+        index = dictionary
+    else:
+        index = DrugIndex(dictionary)
+
+    if not index:
         return []
 
-    # --- Step 1: Build a lookup table for searchable names ---
-    # Each drug name and its substitutes are mapped (in lowercase) to the original drug row
-    drug_lookup = {}
-    for drug in dictionary:
-        if "drug_name" in drug and drug["drug_name"]:
-            drug_lookup[drug["drug_name"].lower()] = drug
+    # --- Step 2: Match and deduplicate OCR-extracted words by matched_name ---
+    with span("match"):
+        matches = index.match(cleaned_texts, threshold, batched=batched, workers=workers,
+                              arabic_tokens=arabic_texts, cascade=cascade, memo=memo)
 
-        # Include substitutes (if any). Some may be comma-separated.
-        substitutes = drug.get("substitutes")
-        if substitutes:
-            for sub in str(substitutes).split(","):
-                sub = sub.strip().lower()
-                if sub:
-                    drug_lookup[sub] = drug
-
-    search_space = list(drug_lookup.keys())
-
-    # --- Step 2: Match OCR-extracted words against the search space ---
-    matches = []
-    for word in cleaned_texts:
-        word_lower = word.lower().strip()
-
-        # Use token_sort_ratio to handle spacing and word order variations
-        result = process.extractOne(word_lower, search_space, scorer=fuzz.token_sort_ratio)
-
-        if result:
-            match_name, score, _ = result
-            if score >= threshold:
-                drug_info = drug_lookup[match_name]
-                matches.append({
-                    "extracted_word": word,
-                    "matched_name": match_name,
-                    "score": score,
-                    "details": drug_info
-                })
-
-    # --- Step 3: Deduplicate results by matched_name ---
-    unique_matches = []
-    seen = set()
-    for match in matches:
-        if match["matched_name"] not in seen:
-            unique_matches.append(match)
-            seen.add(match["matched_name"])
-
-    return unique_matches
+    MATCHES_PER_IMAGE.observe(len(matches))
+    return matches
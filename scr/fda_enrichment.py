@@ -0,0 +1,140 @@
+"""
+FDA Enrichment Job
+
+This module resolves every drug name and substitute of the catalog against
+openFDA ahead of time and stores the details (brand/generic name,
+manufacturer, purpose, warnings, dosage) with their lookup time in the
+details file next to the catalog. The request path then serves them without
+network calls.
+
+Runs are incremental: only names that are missing or older than the maximum
+age are fetched again ("not found" answers expire sooner). Lookups run with
+bounded concurrency, progress is saved regularly, and the client's circuit
+breaker stops the run from hammering an unavailable API.
+
+Usage:
+    python -m scr.fda_enrichment [--concurrency 4] [--max-age-days 30] [--force]
+"""
+
+import argparse
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+from config import CSV_DRUG_PATH, CATALOG_DRUG_PATH, FDA_API_URL, FDA_DETAILS_PATH
+from scr.api_handler import FDAClient, is_outage
+from scr.drug_catalog import load_catalog
+from scr.fda_store import FDADetailsStore, normalize_key
+
+# Names are written to disk after this many lookups
+SAVE_EVERY = 100
+
+
+def catalog_names(records) -> List[str]:
+    """
+    Collect every drug name and substitute of the catalog.
+
+    Args:
+        records (DrugCatalog | list[dict]): Drug records.
+
+    Returns:
+        list[str]: Distinct normalized names, in catalog order.
+    """
+    names = {}
+    for record in records:
+        name = record.get("drug_name")
+        if isinstance(name, str) and name.strip():
+            names[normalize_key(name)] = None
+
+        # Substitutes are separated by ";" (and sometimes ",")
+        substitutes = record.get("substitutes")
+        if isinstance(substitutes, str):
+            for sub in re.split(r"[;,]", substitutes):
+                if sub.strip():
+                    names[normalize_key(sub)] = None
+    return list(names)
+
+
+def enrich(store: FDADetailsStore, client: FDAClient, names: List[str], concurrency: int = 4,
+           max_age: float = 30 * 86400, negative_max_age: float = 7 * 86400, force: bool = False) -> dict:
+    """
+    Fetch the details of missing or stale names into the store.
+
+    Args:
+        store (FDADetailsStore): Details store (saved as the run progresses).
+        client (FDAClient): openFDA client.
+        names (list[str]): Names to resolve.
+        concurrency (int, optional): Simultaneous API requests. Defaults to 4.
+        max_age (float, optional): Refresh "found" entries older than this (seconds).
+        negative_max_age (float, optional): Refresh "not_found" entries older than this (seconds).
+        force (bool, optional): Refresh every name. Defaults to False.
+
+    Returns:
+        dict: Counts of names: total, fresh (skipped), found, not_found, errors and
+            skipped while the circuit breaker was open.
+    """
+    stale = [n for n in names if force or store.is_stale(n, max_age, negative_max_age)]
+    counts = {"total": len(names), "fresh": len(names) - len(stale),
+              "found": 0, "not_found": 0, "errors": 0, "skipped": 0}
+
+    def lookup(name):
+        if not client.breaker.allow():
+            return "skipped", None
+        try:
+            info = client.fetch(name)
+        except Exception as e:
+            if is_outage(e):
+                client.breaker.record_failure()
+            else:
+                client.breaker.record_success()
+            print(f"Error fetching {name!r}: {e}")
+            return "errors", None
+        client.breaker.record_success()
+        return ("found" if info is not None else "not_found"), info
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(lookup, name): name for name in stale}
+        for done, future in enumerate(as_completed(futures), start=1):
+            outcome, info = future.result()
+            counts[outcome] += 1
+            if outcome in ("found", "not_found"):
+                store.put(futures[future], info)
+            if done % SAVE_EVERY == 0:
+                store.save()
+                print(f"{done}/{len(stale)} names looked up")
+
+    store.save()
+    return counts
+
+
+def main() -> None:
+    """Resolve the catalog names against openFDA into the details file."""
+    parser = argparse.ArgumentParser(description="Precompute openFDA details of the drug catalog.")
+    parser.add_argument("--csv", default=CSV_DRUG_PATH, help="Drug CSV")
+    parser.add_argument("--compiled", default=CATALOG_DRUG_PATH, help="Compiled catalog (used when up to date)")
+    parser.add_argument("--output", default=FDA_DETAILS_PATH, help="Details file to create or update")
+    parser.add_argument("--api-url", default=FDA_API_URL, help="openFDA drug label endpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="Simultaneous API requests")
+    parser.add_argument("--max-age-days", type=float, default=30, help="Refresh found entries older than this")
+    parser.add_argument("--negative-max-age-days", type=float, default=7,
+                        help="Refresh not-found entries older than this")
+    parser.add_argument("--force", action="store_true", help="Refresh every name")
+    args = parser.parse_args()
+
+    store = FDADetailsStore(args.output)
+    store.load()
+    names = catalog_names(load_catalog(args.csv, args.compiled))
+    client = FDAClient(base_url=args.api_url, max_workers=args.concurrency)
+
+    start = time.perf_counter()
+    counts = enrich(store, client, names, concurrency=args.concurrency,
+                    max_age=args.max_age_days * 86400,
+                    negative_max_age=args.negative_max_age_days * 86400,
+                    force=args.force)
+    client.close()
+    print(f"Enriched {args.output} in {time.perf_counter() - start:.1f} s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+FDA Details Store Module
+
+This module reads and writes the precomputed openFDA details of the catalog
+drugs, kept in a JSON file next to the drug CSV. The file is produced offline
+by the enrichment job (scr/fda_enrichment.py), so that the request path can
+answer drug detail lookups from disk without calling the API.
+
+File layout:
+    {
+        "updated_at": <unix time>,
+        "entries": {
+            "<lowercased drug name>": {
+                "status": "found" | "not_found",
+                "fetched_at": <unix time>,
+                "info": {brand_name, generic_name, manufacturer, purpose, warnings, dosage} | null
+            }
+        }
+    }
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+
+def normalize_key(drug_name: str) -> str:
+    """
+    Store key of a drug name.
+
+    Args:
+        drug_name (str): Drug name as matched or queried.
+
+    Returns:
+        str: Lowercased name with surrounding whitespace removed.
+    """
+    return drug_name.strip().lower()
+
+
+class FDADetailsStore:
+    """
+    Precomputed openFDA details, reloaded when the file changes on disk.
+
+    Attributes:
+        path (str): JSON file path.
+        entries (dict[str, dict]): Drug name → entry (status, fetched_at, info).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): JSON file path (it does not need to exist yet).
+        """
+        self.path = path
+        self.entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self, drug_name: str) -> Tuple[bool, Optional[dict]]:
+        """
+        Look up a drug.
+
+        Names that combine several substitutes (e.g. "voltaren;diclofenac potassium")
+        fall back to the first of their parts found in the store.
+
+        Args:
+            drug_name (str): Drug name.
+
+        Returns:
+            tuple[bool, dict | None]: Whether the store has an answer for the name, and
+                the details (None for drugs known to be absent from openFDA).
+        """
+        self._refresh()
+        entries = self.entries
+        key = normalize_key(drug_name)
+        entry = entries.get(key)
+        if entry is None and ";" in key:
+            entry = next((entries[part] for part in map(normalize_key, key.split(";")) if part in entries), None)
+        if entry is None:
+            return False, None
+        return True, entry["info"]
+
+    def put(self, drug_name: str, info: Optional[dict], fetched_at: Optional[float] = None) -> None:
+        """
+        Record the answer for a drug (call save to write it).
+
+        Args:
+            drug_name (str): Drug name.
+            info (dict | None): Details, or None when openFDA has no entry for it.
+            fetched_at (float, optional): Unix time of the lookup. Defaults to now.
+        """
+        with self._lock:
+            self.entries[normalize_key(drug_name)] = {
+                "status": "found" if info is not None else "not_found",
+                "fetched_at": fetched_at if fetched_at is not None else time.time(),
+                "info": info,
+            }
+
+    def is_stale(self, drug_name: str, max_age: float, negative_max_age: float) -> bool:
+        """
+        Whether a drug is missing or due for a refresh.
+
+        Args:
+            drug_name (str): Drug name.
+            max_age (float): Maximum age in seconds of "found" entries.
+            negative_max_age (float): Maximum age in seconds of "not_found" entries.
+
+        Returns:
+            bool: True if the entry is missing or older than its maximum age.
+        """
+        entry = self.entries.get(normalize_key(drug_name))
+        if entry is None:
+            return True
+        limit = max_age if entry["status"] == "found" else negative_max_age
+        return time.time() - entry["fetched_at"] > limit
+
+    def load(self) -> None:
+        """Read the file (a missing file gives an empty store)."""
+        with self._lock:
+            self._load()
+
+    def save(self) -> None:
+        """Write the file atomically, so readers never see a partial file."""
+        with self._lock:
+            data = {"updated_at": time.time(), "entries": self.entries}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+
+    def _refresh(self) -> None:
+        """Reload the file if it changed since it was last read."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load()
+
+    def _load(self) -> None:
+        """Read the file (lock held)."""
+        try:
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            print(f"Error reading FDA details file {self.path}: {e}")
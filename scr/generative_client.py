@@ -0,0 +1,273 @@
+"""
+Generative Client Module
+
+This module provides an async client layer in front of a generative model
+backend (Gemini, or a local fake for testing). It:
+    - merges identical in-flight requests (same image and prompt) into one call,
+    - limits concurrent provider calls with a semaphore and a bounded wait queue,
+    - retries transient provider errors with jittered exponential backoff,
+    - caches parsed JSON responses by image hash.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+from scr.inference_pool import QueueFullError
+from scr.result_cache import ResultCache, bytes_hash
+
+# Provider errors worth retrying, by exception class name (google.api_core and
+# HTTP client errors are matched without importing them)
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "BadGateway",
+}
+
+
+class InvalidModelResponse(Exception):
+    """Raised when the model answer is not valid JSON."""
+
+    def __init__(self, raw_response: str):
+        super().__init__("Invalid JSON returned from model")
+        self.raw_response = raw_response
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a backend error is transient (rate limiting, timeouts, 5xx).
+
+    Args:
+        error (Exception): Error raised by the backend.
+
+    Returns:
+        bool: True if the call should be retried.
+    """
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def parse_model_json(raw: str):
+    """
+    Parse a model answer that should be a JSON object.
+
+    Args:
+        raw (str): Model output, possibly wrapped in a markdown code block.
+
+    Returns:
+        Any: The parsed JSON.
+
+    Raises:
+        InvalidModelResponse: If the answer is not valid JSON.
+    """
+    # Clean response if wrapped with code block markers
+    cleaned = raw.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:].strip()
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        raise InvalidModelResponse(raw)
+
+
+class AsyncGenerativeClient:
+    """
+    Coalescing, rate-limited, retrying and caching client for a generative backend.
+
+    Attributes:
+        max_concurrency (int): Maximum simultaneous backend calls.
+        max_queue (int): Requests allowed to wait for a backend slot before new ones
+            are rejected with QueueFullError.
+        max_attempts (int): Attempts per request (1 disables retries).
+    """
+
+    def __init__(self, backend: Callable[[bytes, str, str], Awaitable[str]],
+                 max_concurrency: int = 4, max_queue: int = 16, retry_after: int = 2,
+                 max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 cache: Optional[ResultCache] = None):
+        """
+        Create the client.
+
+        Args:
+            backend (Callable): Async function (image_bytes, prompt, mime_type) -> response text.
+            max_concurrency (int, optional): Simultaneous backend calls. Defaults to 4.
+            max_queue (int, optional): Requests waiting for a slot. Defaults to 16.
+            retry_after (int, optional): Retry-After hint (seconds) for rejected requests.
+            max_attempts (int, optional): Attempts per request. Defaults to 3.
+            backoff_base (float, optional): Base of the exponential backoff in seconds.
+            backoff_max (float, optional): Cap of a single backoff in seconds.
+            cache (ResultCache, optional): Cache of parsed responses. Defaults to None.
+        """
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+
+        self._semaphore = None
+        self._in_flight = {}
+        self._waiting = 0
+        self._running = 0
+        self._counters = {"requests": 0, "cache_hits": 0, "coalesced": 0, "backend_calls": 0,
+                          "retries": 0, "failures": 0, "rejected": 0}
+
+    async def generate_json(self, image_bytes: bytes, prompt: str, mime_type: str = "image/jpeg"):
+        """
+        Get the parsed JSON answer of the model for an image and prompt.
+
+        Args:
+            image_bytes (bytes): Encoded image.
+            prompt (str): Instructional text for the model.
+            mime_type (str, optional): MIME type of the image. Defaults to "image/jpeg".
+
+        Returns:
+            Any: The parsed JSON answer.
+
+        Raises:
+            QueueFullError: If the wait queue for backend slots is full.
+            InvalidModelResponse: If the model answer is not valid JSON.
+            Exception: The last backend error once retries are exhausted.
+        """
+        self._counters["requests"] += 1
+        key = self._key(image_bytes, prompt, mime_type)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._counters["cache_hits"] += 1
+                return cached
+
+        # Join an identical request already in flight instead of calling again
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._generate(key, image_bytes, prompt, mime_type))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded, so a disconnecting caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """
+        Client counters and current load.
+
+        Returns:
+            dict: Request, cache-hit, coalesced, backend-call, retry, failure and
+                rejection counters, plus running, waiting and in-flight requests.
+        """
+        return dict(self._counters, running=self._running, waiting=self._waiting,
+                    in_flight=len(self._in_flight), max_concurrency=self.max_concurrency,
+                    max_queue=self.max_queue)
+
+    async def _generate(self, key: str, image_bytes: bytes, prompt: str, mime_type: str):
+        """Call the backend (with retries), parse and cache the answer."""
+        raw = await self._call_with_retries(image_bytes, prompt, mime_type)
+        parsed = parse_model_json(raw)
+        if self.cache is not None:
+            self.cache.put(key, parsed)
+        return parsed
+
+    async def _call_with_retries(self, image_bytes: bytes, prompt: str, mime_type: str) -> str:
+        """Call the backend, retrying transient errors with full-jitter backoff."""
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._call(image_bytes, prompt, mime_type)
+            except QueueFullError:
+                raise
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    self._counters["failures"] += 1
+                    raise
+                self._counters["retries"] += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                await asyncio.sleep(delay)
+
+    async def _call(self, image_bytes: bytes, prompt: str, mime_type: str) -> str:
+        """One backend call, holding a concurrency slot (rejects if the queue is full)."""
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise QueueFullError(self.retry_after)
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        self._counters["backend_calls"] += 1
+        try:
+            return await self.backend(image_bytes, prompt, mime_type)
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+    @staticmethod
+    def _key(image_bytes: bytes, prompt: str, mime_type: str) -> str:
+        """Cache and coalescing key: image hash plus a hash of the prompt."""
+        prompt_hash = hashlib.sha256(f"{mime_type}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+        return f"{bytes_hash(image_bytes)}:{prompt_hash}"
+
+
+class FakeGenerativeBackend:
+    """
+    Local stand-in for the generative model, with configurable latency and failures.
+
+    Attributes:
+        latency_ms (float): Time each call takes.
+        failure_rate (float): Probability that a call raises a transient error.
+        calls (int): Number of calls received.
+        max_concurrent (int): Highest number of simultaneous calls seen.
+    """
+
+    def __init__(self, latency_ms: float = 500, failure_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            latency_ms (float, optional): Latency of each call. Defaults to 500.
+            failure_rate (float, optional): Probability of a transient error. Defaults to 0.
+            seed (int, optional): Random seed of the failures. Defaults to 0.
+        """
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._random = random.Random(seed)
+
+    async def __call__(self, image_bytes: bytes, prompt: str, mime_type: str) -> str:
+        self.calls += 1
+        self._concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self._concurrent)
+        try:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+            if self._random.random() < self.failure_rate:
+                raise TimeoutError("Fake backend timed out")
+            return json.dumps({
+                "drug_name": "Panadol",
+                "dosage": "500 mg",
+                "frequency": "Every 6 hours",
+                "instructions": None,
+                "contraindications": [],
+                "side_effects": [],
+                "substitutes": [],
+                "therapeutic_class": "Analgesic",
+                "chemical_class": None,
+                "habit_forming": "No",
+                "warnings": [],
+                "image_sha256": bytes_hash(image_bytes),
+                "generated_at": time.time(),
+            })
+        finally:
+            self._concurrent -= 1
@@ -6,31 +6,53 @@ import easyocr
 from ultralytics import YOLO
 import streamlit as st
 
+from scr.detector import load_detector
+from scr.ocr_recognizer import create_reader
+from scr.script_routing import ROUTING_MIN_CONFIDENCE, create_routed_reader
 
-def load_yolo_model(model_path: str) -> YOLO:
+
+def load_yolo_model(model_path: str, backend: str = "pytorch") -> YOLO:
     """
     Load a YOLO model from the specified file path.
 
     Args:
         model_path (str): Path to the YOLO model (.pt file).
+        backend (str, optional): Inference backend ("pytorch", "onnx" or "onnx-int8").
+            Defaults to "pytorch".
 
     Returns:
         YOLO: An initialized YOLO model ready for inference.
     """
-    return YOLO(model_path)
+    return load_detector(model_path, backend)
 
 
-def load_ocr_reader(languages: list[str]) -> easyocr.Reader:
+def load_ocr_reader(languages: list[str], detector: bool = True, recognizer: str = "int8",
+                    onnx_path: str | None = None, routing: bool = False,
+                    min_confidence: float = ROUTING_MIN_CONFIDENCE) -> easyocr.Reader:
     """
     Initialize an EasyOCR reader for the given languages.
 
     Args:
         languages (list[str]): List of language codes (e.g., ["en", "ar"]).
+        detector (bool, optional): Load the CRAFT text detector. Recognition-only
+            readers skip it and use less memory. Defaults to True.
+        recognizer (str, optional): Recognizer backend ("fp32", "int8", "onnx" or
+            "onnx-int8"). Defaults to "int8".
+        onnx_path (str | None, optional): ONNX recognizer path for the ONNX backends.
+        routing (bool, optional): Read each crop with an English-only reader first and
+            only use the reader for all languages when unsure (see scr/script_routing.py).
+            Defaults to False.
+        min_confidence (float, optional): English reading confidence needed to skip
+            the reader for all languages. Defaults to ROUTING_MIN_CONFIDENCE.
 
     Returns:
-        easyocr.Reader: An OCR reader instance that can extract text from images.
+        easyocr.Reader: An OCR reader instance (or a ScriptRouter with the same
+            readtext/recognize interface) that can extract text from images.
     """
-    return easyocr.Reader(languages)
+    if routing:
+        return create_routed_reader(languages, detector=detector, mode=recognizer,
+                                    onnx_path=onnx_path, min_confidence=min_confidence)
+    return create_reader(languages, detector=detector, mode=recognizer, onnx_path=onnx_path)
 
 
 def display_drug_info(drug_name: str, drug_info: dict | None) -> None:
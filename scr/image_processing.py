@@ -3,13 +3,37 @@ Image Processing Module
 
 This module provides utility functions for capturing, uploading, saving,
 and preprocessing images for OCR and computer vision tasks.
+
+Uploaded photos (often 12-50 MP) are decoded at reduced resolution when the
+format allows it (JPEG DCT scaling), rotated according to their EXIF
+orientation, and capped at OCR_MAX_SIDE pixels. Detection then runs on a copy
+scaled to the model input size, and its boxes are mapped back onto the capped
+image for OCR crops.
 """
 
 import cv2
 import numpy as np
+import struct
 import tempfile
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
+
+# Longest side of the decoded image kept for OCR crops
+OCR_MAX_SIDE = 2048
+
+# Input size of the YOLO detector (longest side)
+DETECTION_SIZE = 640
+
+# A reduced JPEG decode may land this much below the requested size (e.g. 2000
+# px for a 4000 px photo and OCR_MAX_SIDE 2048) instead of decoding at full size
+REDUCED_DECODE_TOLERANCE = 0.9
+
+# Reduced JPEG decode factors supported by OpenCV
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
 
 
 def capture_image_from_camera() -> Optional[np.ndarray]:
@@ -24,11 +48,8 @@ def capture_image_from_camera() -> Optional[np.ndarray]:
     img_file_buffer = st.camera_input(" Capture a photo of the medicine package")
 
     if img_file_buffer is not None:
-        # Convert image buffer to OpenCV format
-        bytes_data = img_file_buffer.getvalue()
-        img_array = np.frombuffer(bytes_data, np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        return img
+        # Convert image buffer to OpenCV format (reduced, upright and capped)
+        return decode_image(img_file_buffer.getvalue())
 
     return None
 
@@ -45,14 +66,199 @@ def upload_image() -> Optional[np.ndarray]:
     uploaded_file = st.file_uploader(" Upload an image", type=['jpg', 'jpeg', 'png'])
 
     if uploaded_file is not None:
-        # Convert uploaded file to OpenCV format
-        file_bytes = np.asarray(bytearray(uploaded_file.read()), dtype=np.uint8)
-        image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-        return image
+        # Convert uploaded file to OpenCV format (reduced, upright and capped)
+        return decode_image(uploaded_file.read())
+
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read the pixel size of a JPEG or PNG from its header, without decoding it.
+
+    Args:
+        data (bytes): Encoded image.
+
+    Returns:
+        Optional[Tuple[int, int]]: (width, height), or None for other or malformed formats.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    if data[:2] != b"\xff\xd8":
+        return None
 
+    # Walk the JPEG segments up to the start-of-frame marker
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
     return None
 
 
+def exif_orientation(data: bytes) -> int:
+    """
+    Read the EXIF orientation tag of a JPEG.
+
+    Args:
+        data (bytes): Encoded image.
+
+    Returns:
+        int: Orientation (1-8); 1 (upright) when absent or unreadable.
+    """
+    if data[:2] != b"\xff\xd8":
+        return 1
+
+    pos = 2
+    while pos + 4 < len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker == 0xDA:  # Start of scan: no more metadata
+            break
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\x00\x00":
+            tiff = data[pos + 10:pos + 2 + length]
+            endian = "<" if tiff[:2] == b"II" else ">"
+            try:
+                ifd = struct.unpack(endian + "I", tiff[4:8])[0]
+                count = struct.unpack(endian + "H", tiff[ifd:ifd + 2])[0]
+                for i in range(count):
+                    entry = ifd + 2 + 12 * i
+                    tag, _, _, value = struct.unpack(endian + "HHIH", tiff[entry:entry + 10])
+                    if tag == 0x0112:
+                        return value if 1 <= value <= 8 else 1
+            except struct.error:
+                return 1
+            return 1
+        pos += 2 + length
+    return 1
+
+
+def apply_orientation(image: np.ndarray, orientation: int) -> np.ndarray:
+    """
+    Rotate/flip an image so that it is upright, according to its EXIF orientation.
+
+    Args:
+        image (np.ndarray): Decoded image (as stored, ignoring orientation).
+        orientation (int): EXIF orientation (1-8).
+
+    Returns:
+        np.ndarray: Upright image.
+    """
+    # Mirrored orientations are flipped first, then rotated like their plain counterpart
+    if orientation in (2, 4, 5, 7):
+        image = cv2.flip(image, 1)
+    if orientation in (3, 4):
+        image = cv2.rotate(image, cv2.ROTATE_180)
+    elif orientation in (6, 7):
+        image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    elif orientation in (5, 8):
+        image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
+
+def decode_image(data: bytes, max_side: int = OCR_MAX_SIDE) -> Optional[np.ndarray]:
+    """
+    Decode an uploaded image for the pipeline: reduced, upright and capped.
+
+    When the image is much larger than ``max_side``, JPEGs are decoded directly
+    at 1/2, 1/4 or 1/8 scale (at most REDUCED_DECODE_TOLERANCE below
+    ``max_side``), which is several times faster and smaller than a full decode.
+    The result is downscaled so that its longest side is at most ``max_side``,
+    and the EXIF orientation is applied.
+
+    Args:
+        data (bytes): Encoded image.
+        max_side (int, optional): Longest side of the returned image. Defaults to OCR_MAX_SIDE.
+
+    Returns:
+        Optional[np.ndarray]: BGR image, or None if the data is empty or cannot be decoded.
+    """
+    if not data:
+        return None
+    buffer = np.frombuffer(data, np.uint8)
+    size = image_size(data)
+
+    flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    if size is not None and data[:2] == b"\xff\xd8":
+        longest = max(size)
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if longest // factor >= max_side * REDUCED_DECODE_TOLERANCE:
+                flags = reduced_flag | cv2.IMREAD_IGNORE_ORIENTATION
+                break
+
+    try:
+        image = cv2.imdecode(buffer, flags)
+    except cv2.error:
+        return None
+    if image is None:
+        return None
+
+    # Resize before rotating, so the rotation copies fewer pixels. After a reduced
+    # decode the remaining ratio is small and bilinear is much faster than area.
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1:
+        interpolation = cv2.INTER_AREA if scale <= 0.5 else cv2.INTER_LINEAR
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=interpolation)
+
+    return apply_orientation(image, exif_orientation(data))
+
+
+def resize_for_detection(image: np.ndarray, size: int = DETECTION_SIZE) -> Tuple[np.ndarray, float]:
+    """
+    Downscale an image so that its longest side matches the detector input size.
+
+    Args:
+        image (np.ndarray): BGR image.
+        size (int, optional): Detector input size. Defaults to DETECTION_SIZE.
+
+    Returns:
+        Tuple[np.ndarray, float]: The detection input and its scale relative to the
+            image (1.0 when the image is already small enough).
+    """
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1:
+        return image, 1.0
+    resized = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                         interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def scale_boxes(boxes: List[Tuple[int, int, int, int]], scale: float,
+                shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+    """
+    Map (x1, y1, x2, y2) boxes from a detection input back onto the source image.
+
+    Args:
+        boxes (List[Tuple[int, int, int, int]]): Boxes on the detection input.
+        scale (float): Scale of the detection input (see resize_for_detection).
+        shape (Tuple[int, ...]): Shape of the source image.
+
+    Returns:
+        List[Tuple[int, int, int, int]]: Boxes on the source image, clipped to its bounds.
+    """
+    if scale == 1.0:
+        return list(boxes)
+    height, width = shape[:2]
+    return [
+        (max(0, int(x1 / scale)), max(0, int(y1 / scale)),
+         min(width, int(round(x2 / scale))), min(height, int(round(y2 / scale))))
+        for x1, y1, x2, y2 in boxes
+    ]
+
+
 def save_image_temp(image: np.ndarray) -> str:
     """
     Save an image temporarily on disk for further processing.
@@ -0,0 +1,189 @@
+"""
+Inference Pool Module
+
+This module provides a bounded worker pool for running blocking inference
+(YOLO, EasyOCR, fuzzy matching, generative model calls) off the asyncio event
+loop. Admission is bounded: once every worker is busy and the waiting queue is
+full, new work is rejected immediately so the service can answer with a fast
+"busy" response instead of letting requests pile up.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when an InferencePool cannot admit more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Thread or process pool with a bounded admission queue.
+
+    Attributes:
+        max_workers (int): Number of concurrent workers.
+        max_queue (int): Number of admitted jobs allowed to wait for a worker.
+        use_processes (bool): Whether the workers are processes (no iterate).
+        retry_after (int): Seconds clients should wait before retrying when rejected.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 8,
+                 use_processes: bool = False, retry_after: int = 1):
+        """
+        Create the pool.
+
+        Args:
+            max_workers (int, optional): Number of concurrent workers. Defaults to 1.
+            max_queue (int, optional): Waiting jobs allowed beyond the running ones. Defaults to 8.
+            use_processes (bool, optional): Use worker processes instead of threads. Jobs
+                must then be picklable module-level functions. Defaults to False.
+            retry_after (int, optional): Retry-After hint (seconds) for rejected work. Defaults to 1.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.retry_after = retry_after
+
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted jobs waiting for a free worker."""
+        return max(0, self._admitted - self.max_workers)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the pool state.
+
+        Returns:
+            dict: Worker count, running and queued jobs, queue capacity, and
+                completed / rejected job counters.
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": min(self._admitted, self.max_workers),
+                "queued": self.queue_depth,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run a blocking function in the pool without blocking the event loop.
+
+        Args:
+            fn (Callable): Function to run.
+            *args: Positional arguments for ``fn``.
+            **kwargs: Keyword arguments for ``fn``.
+
+        Returns:
+            Any: The return value of ``fn``.
+
+        Raises:
+            QueueFullError: If all workers are busy and the waiting queue is full.
+        """
+        return await asyncio.wrap_future(self._submit(fn, *args, **kwargs))
+
+    async def iterate(self, fn, *args, **kwargs):
+        """
+        Run a blocking generator function in the pool and yield its items as they come.
+
+        The whole iteration is one job (one admission slot). If the consumer stops
+        early (e.g. a streaming client disconnects), the worker stops after the
+        item it is producing. Thread pools only: the job is a closure.
+
+        Args:
+            fn (Callable): Generator function to run.
+            *args: Positional arguments for ``fn``.
+            **kwargs: Keyword arguments for ``fn``.
+
+        Yields:
+            Any: The items produced by ``fn``.
+
+        Raises:
+            RuntimeError: On the first iteration, if the pool uses worker processes.
+            QueueFullError: On the first iteration, if all workers are busy and the
+                waiting queue is full.
+            Exception: Any error raised by ``fn``, after the items produced before it.
+        """
+        if self.use_processes:
+            raise RuntimeError("InferencePool.iterate needs a thread pool: "
+                               "generator jobs cannot be sent to worker processes")
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stopped = threading.Event()
+        end = object()
+
+        def produce():
+            for item in fn(*args, **kwargs):
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+
+        def finish(future):
+            if not loop.is_closed():
+                error = None if future.cancelled() else future.exception()
+                loop.call_soon_threadsafe(queue.put_nowait, (end, error))
+
+        self._submit(produce).add_done_callback(finish)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    def _submit(self, fn, *args, **kwargs):
+        """
+        Admit a job and hand it to the executor.
+
+        Returns:
+            concurrent.futures.Future: Future of the job.
+
+        Raises:
+            QueueFullError: If all workers are busy and the waiting queue is full.
+        """
+        with self._lock:
+            if self._admitted >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(self.retry_after)
+            self._admitted += 1
+
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            # Never ran: free the slot without counting the job as completed
+            with self._lock:
+                self._admitted -= 1
+            raise
+
+        # The slot is freed when the job finishes, even if the caller stops waiting
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future) -> None:
+        """Free the admission slot of a finished job and count it as completed."""
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    def shutdown(self) -> None:
+        """Stop accepting work and release the workers."""
+        self._executor.shutdown(wait=False)
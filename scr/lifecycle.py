@@ -0,0 +1,145 @@
+"""
+Service Lifecycle Module
+
+This module defers heavy initialization (model weights, OCR readers, the drug
+catalog) from import time to application startup. Resources are created on
+first use or by a background startup thread, which then runs a warmup
+inference so the first real request is not slow. The lifecycle reports
+liveness, readiness and the import / load / warmup timings.
+"""
+
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+
+class LazyResource:
+    """
+    A resource created on first use, at most once, from any thread.
+
+    Attributes:
+        name (str): Resource name used in status reports.
+        load_seconds (float | None): Time taken to create the resource.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], object]):
+        """
+        Args:
+            name (str): Resource name used in status reports.
+            loader (Callable[[], object]): Function that creates the resource.
+        """
+        self.name = name
+        self.load_seconds = None
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the resource has been created."""
+        return self._loaded
+
+    def get(self):
+        """
+        Return the resource, creating it first if needed.
+
+        Returns:
+            Any: The resource.
+        """
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self._loader()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+
+class ServiceLifecycle:
+    """
+    Tracks the lazy resources of a service and brings them up at startup.
+
+    Attributes:
+        import_seconds (float | None): Time spent importing the service module.
+        warmup_seconds (float | None): Time spent in the warmup inference.
+        ready (bool): True once every resource is loaded and warmup has finished.
+        error (str | None): Startup failure, if any.
+    """
+
+    def __init__(self):
+        self.resources = []
+        self.import_seconds = None
+        self.warmup_seconds = None
+        self.ready = False
+        self.error = None
+        self._started_at = time.time()
+
+    def resource(self, name: str, loader: Callable[[], object]) -> LazyResource:
+        """
+        Register a lazily created resource.
+
+        Args:
+            name (str): Resource name used in status reports.
+            loader (Callable[[], object]): Function that creates the resource.
+
+        Returns:
+            LazyResource: The registered resource.
+        """
+        resource = LazyResource(name, loader)
+        self.resources.append(resource)
+        return resource
+
+    def start(self, warmup: Optional[Callable[[], None]] = None, background: bool = True) -> None:
+        """
+        Load every resource, then run the warmup, and mark the service ready.
+
+        Args:
+            warmup (Callable[[], None], optional): Synthetic inference run after loading.
+            background (bool, optional): Run in a daemon thread so the server can
+                answer liveness probes meanwhile. Defaults to True.
+        """
+        if background:
+            threading.Thread(target=self._start, args=(warmup,), name="service-startup", daemon=True).start()
+        else:
+            self._start(warmup)
+
+    def status(self) -> dict:
+        """
+        Readiness and timing report.
+
+        Returns:
+            dict: Ready flag, startup error, uptime, import and warmup timings, and the
+                load state and time of every resource.
+        """
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "uptime_seconds": time.time() - self._started_at,
+            "import_seconds": self.import_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "resources": {
+                r.name: {"loaded": r.loaded, "load_seconds": r.load_seconds}
+                for r in self.resources
+            },
+        }
+
+    def _start(self, warmup: Optional[Callable[[], None]]) -> None:
+        """Startup sequence (see start)."""
+        try:
+            for resource in self.resources:
+                resource.get()
+                print(f"Loaded {resource.name} in {resource.load_seconds:.2f} s")
+
+            if warmup is not None:
+                start = time.perf_counter()
+                warmup()
+                self.warmup_seconds = time.perf_counter() - start
+                print(f"Warmup finished in {self.warmup_seconds:.2f} s")
+
+            self.ready = True
+        except Exception as e:
+            self.error = str(e)
+            traceback.print_exc()
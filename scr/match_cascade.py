@@ -0,0 +1,236 @@
+"""
+Match Cascade Module
+
+This module resolves most OCR tokens without scoring them against the whole
+catalog. Tokens go through cheap tiers first and only the unresolved ones
+reach full fuzzy scoring:
+    1. noise:    packaging words ("tablets", "film coated", ...) known not to
+                 reach the threshold against any catalog name are dropped.
+    2. exact:    O(1) lookup of the token's sorted words among the names and
+                 substitutes (token_sort_ratio 100).
+    3. phonetic: names sharing the token's phonetic skeleton (or its prefix)
+                 give a candidate score; only names whose length allows an
+                 equal or higher score are then checked. Used with per-token
+                 scoring only: batched scoring shares one cdist call between
+                 the unresolved tokens, which is cheaper than this check.
+    4. fuzzy:    everything else, scored as before by DrugIndex.
+
+Every tier returns the choice full scoring would return (same score, same
+first-in-catalog tie-breaking), so the matches are unchanged. token_sort_ratio
+is an Indel ratio of the sorted strings, which bounds the score of any name
+by its length: 100 * 2 * min(a, b) / (a + b).
+"""
+
+import math
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from scr.metrics import counter
+from scr.transliteration import latin_skeleton
+
+# Words printed on medicine boxes that are not drug names
+PACKAGING_NOISE_WORDS = frozenset([
+    "tablets", "tablet", "tabs", "film", "coated", "capsules", "capsule", "caps", "syrup",
+    "suspension", "oral", "solution", "drops", "cream", "ointment", "gel", "spray", "injection",
+    "vial", "vials", "ampoule", "ampoules", "sachets", "sachet", "powder", "chewable",
+    "effervescent", "dispersible", "extended", "prolonged", "sustained", "modified", "release",
+    "use", "each", "contains", "store", "below", "keep", "children", "reach", "out", "the",
+    "and", "for", "with", "only", "pack", "box", "strip", "blister", "batch", "exp", "mfg",
+    "date", "price", "manufactured", "made", "egypt", "pharma", "pharmaceutical",
+    "pharmaceuticals", "industries", "company", "under", "licence", "license",
+])
+
+# Letters of the phonetic skeleton used as the prefix key
+PREFIX_LENGTH = 5
+
+# Prefix groups larger than this are too unspecific to give a candidate
+MAX_PREFIX_CANDIDATES = 64
+
+# Known noise tokens whose best score is remembered (per index)
+MAX_NOISE_ENTRIES = 4096
+
+TIERS = ("noise", "exact", "phonetic", "fuzzy")
+
+MATCH_TIER_TOKENS = counter("dawak_match_tier_tokens_total", "OCR tokens resolved by each matching tier.", ["tier"])
+
+
+def sorted_key(text: str) -> str:
+    """Words of a normalized string in sorted order, as token_sort_ratio compares them."""
+    return " ".join(sorted(text.split()))
+
+
+class MatchCascade:
+    """
+    Tiered resolution of OCR tokens over the choices of a DrugIndex.
+
+    Attributes:
+        choices (list[str]): Normalized choices of the index (names and substitutes).
+        exact (dict[str, int]): Sorted key → first choice id with that key.
+        phonetic (dict[str, np.ndarray]): Phonetic skeleton → choice ids.
+        prefixes (dict[str, np.ndarray]): Skeleton prefix → choice ids.
+        lengths (np.ndarray): Length of each choice's sorted key.
+    """
+
+    def __init__(self, choices: List[str]):
+        """
+        Build the lookup tables.
+
+        Args:
+            choices (list[str]): Normalized choices, in catalog order.
+        """
+        self.choices = choices
+        self.exact = {}
+        phonetic, prefixes = {}, {}
+        lengths = np.empty(len(choices), dtype=np.int32)
+
+        for choice_id, choice in enumerate(choices):
+            key = sorted_key(choice)
+            lengths[choice_id] = len(key)
+            self.exact.setdefault(key, choice_id)
+
+            skeleton = sorted_key(latin_skeleton(choice))
+            if skeleton:
+                phonetic.setdefault(skeleton, []).append(choice_id)
+                prefixes.setdefault(skeleton[:PREFIX_LENGTH], []).append(choice_id)
+
+        self.phonetic = {k: np.array(v, dtype=np.intp) for k, v in phonetic.items()}
+        self.prefixes = {k: np.array(v, dtype=np.intp) for k, v in prefixes.items() if len(v) <= MAX_PREFIX_CANDIDATES}
+        self.lengths = lengths
+        self._by_length = np.argsort(lengths, kind="stable")
+        self._sorted_lengths = lengths[self._by_length]
+        self._strings = np.array(choices, dtype=object)
+
+        self._lock = threading.Lock()
+        self._noise_scores = {}
+        self._counts = Counter()
+
+    def resolve(self, queries: List[str], threshold: float, shortlist=None,
+                phonetic: bool = True) -> Tuple[List[Optional[Tuple[int, float]]], List[int]]:
+        """
+        Resolve normalized tokens through the noise, exact and phonetic tiers.
+
+        Args:
+            queries (list[str]): Normalized tokens.
+            threshold (float): Minimum score of a match.
+            shortlist (Callable, optional): Query → ascending candidate ids, when the
+                index restricts scoring to an n-gram prefilter shortlist.
+            phonetic (bool, optional): Use the phonetic tier. Defaults to True.
+
+        Returns:
+            tuple: The (choice id, score) of each token (None when dropped, unresolved or
+                below the threshold), and the positions of the unresolved tokens, which
+                need full fuzzy scoring.
+        """
+        best = [None] * len(queries)
+        pending = []
+        tiers = Counter()
+        for position, query in enumerate(queries):
+            if self._is_noise(query, threshold):
+                tiers["noise"] += 1
+                continue
+
+            choice_id = self.exact.get(sorted_key(query))
+            if choice_id is not None:
+                tiers["exact"] += 1
+                best[position] = (choice_id, 100.0)
+                continue
+
+            result = self._phonetic(query, threshold, shortlist) if phonetic else None
+            if result is not None:
+                tiers["phonetic"] += 1
+                best[position] = result
+                continue
+
+            tiers["fuzzy"] += 1
+            pending.append(position)
+
+        with self._lock:
+            self._counts.update(tiers)
+        for tier, count in tiers.items():
+            MATCH_TIER_TOKENS.inc(count, tier=tier)
+        return best, pending
+
+    def stats(self) -> dict:
+        """
+        Tokens resolved by each tier so far.
+
+        Returns:
+            dict: Count and share of the tokens of each tier.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            tier: {"tokens": counts.get(tier, 0), "share": counts.get(tier, 0) / total if total else 0.0}
+            for tier in TIERS
+        }
+
+    def _is_noise(self, query: str, threshold: float) -> bool:
+        """Whether a token is made of packaging words that cannot reach the threshold."""
+        words = query.split()
+        if not words or not all(w in PACKAGING_NOISE_WORDS for w in words):
+            return False
+
+        with self._lock:
+            score = self._noise_scores.get(query)
+        if score is None:
+            # Best score over the whole catalog bounds the score over any shortlist
+            result = process.extractOne(query, self.choices, scorer=fuzz.token_sort_ratio)
+            score = result[1] if result else 0.0
+            with self._lock:
+                if len(self._noise_scores) < MAX_NOISE_ENTRIES:
+                    self._noise_scores[query] = score
+        return score < threshold
+
+    def _phonetic(self, query: str, threshold: float, shortlist) -> Optional[Tuple[int, float]]:
+        """
+        Resolve a token from the names sharing its phonetic skeleton or prefix.
+
+        The best candidate's score s is a lower bound of the token's best score, so
+        only the names whose length allows a score of at least s are checked.
+
+        Returns:
+            tuple[int, float] | None: (choice id, score) of the best choice, or None when
+                the tier cannot resolve the token.
+        """
+        skeleton = sorted_key(latin_skeleton(query))
+        ids = self.phonetic.get(skeleton)
+        if ids is None:
+            ids = self.prefixes.get(skeleton[:PREFIX_LENGTH]) if skeleton else None
+        if ids is None:
+            return None
+
+        candidate_id, score = self._best_of(query, ids, threshold)
+        if candidate_id is None:
+            return None
+
+        window = self._length_window(len(sorted_key(query)), score)
+        if shortlist is not None:
+            window = np.intersect1d(window, shortlist(query), assume_unique=True)
+        choice_id, best = self._best_of(query, window, score)
+        return None if choice_id is None else (choice_id, best)
+
+    def _best_of(self, query: str, ids: np.ndarray, cutoff: float) -> Tuple[Optional[int], float]:
+        """First best choice among ascending ids with a score of at least ``cutoff``."""
+        if len(ids) == 0:
+            return None, 0.0
+        scores = process.cdist([query], self._strings[ids].tolist(), scorer=fuzz.token_sort_ratio,
+                               score_cutoff=cutoff, dtype=np.float64)[0]
+        position = int(scores.argmax())
+        if scores[position] < cutoff or scores[position] == 0:
+            return None, 0.0
+        return int(ids[position]), float(scores[position])
+
+    def _length_window(self, length: int, score: float) -> np.ndarray:
+        """Ascending ids of the choices whose length allows a score of at least ``score``."""
+        if score >= 200:
+            return np.empty(0, dtype=np.intp)
+        low = math.ceil(score * length / (200 - score) - 1e-9)
+        high = math.floor(length * (200 - score) / score + 1e-9) if score > 0 else np.iinfo(np.int32).max
+        start = np.searchsorted(self._sorted_lengths, low, side="left")
+        end = np.searchsorted(self._sorted_lengths, high, side="right")
+        return np.sort(self._by_length[start:end])
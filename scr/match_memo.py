@@ -0,0 +1,318 @@
+"""
+Match Memo Module
+
+This module memoizes the fuzzy-scoring result of normalized OCR tokens, so
+that tokens seen in earlier requests ("panadol", "augmentin 1g", ...) are not
+scored against the catalog again, also by the other API worker processes.
+
+Results are kept in an SQLite file (WAL mode) shared by every process that
+opens the same path, with a small in-process LRU in front of it. Entries are
+keyed by the index namespace, which contains the catalog version, so a stale
+entry can never be read. When a process switches to a new catalog version it
+drops the entries of the version it replaces; versions no process uses any
+more are left to the trim. The shared table is bounded by max_entries and
+trimmed by least recent use.
+
+A memoized result is the (choice id, score) of the best choice when it reaches
+the threshold it was scored with, or a marker that no choice reaches that
+threshold (valid for that threshold and any higher one).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from scr.metrics import counter
+
+# Tokens per SELECT ... IN (...) query (SQLite's variable limit is 999 on old builds)
+LOOKUP_CHUNK = 500
+
+# Seconds after which a hit refreshes the entry's last-use time in the shared table
+TOUCH_SECONDS = 60
+
+# Seconds a process waits for another process's write lock
+BUSY_TIMEOUT_SECONDS = 2
+
+MATCH_MEMO_LOOKUPS = counter("dawak_match_memo_lookups_total",
+                             "Token lookups in the match memo by outcome.", ["result"])
+MATCH_MEMO_ERRORS = counter("dawak_match_memo_errors_total",
+                            "SQLite errors of the shared match memo (matching goes on without it).")
+
+# (choice id, score) of a match, or (None, threshold) when no choice reaches the threshold
+Entry = Tuple[Optional[int], float]
+
+
+def _recall(entry: Entry, threshold: float) -> Tuple[bool, Optional[Tuple[int, float]]]:
+    """Whether an entry answers a lookup at ``threshold``, and the result it gives."""
+    choice_id, score = entry
+    if choice_id is not None:
+        return True, (choice_id, score)
+    return threshold >= score, None
+
+
+class MatchMemo:
+    """
+    Bounded token → match memo shared by the processes using the same file.
+
+    SQLite is accessed through one connection per thread, outside the lock
+    that guards the in-process LRU and counters, so a thread waiting on disk
+    or on another process's write does not hold up the other threads. A
+    thread whose connection fails does not retry it, and only the first
+    error of the process is printed; the others are counted in the
+    dawak_match_memo_errors_total metric and in stats().
+
+    Attributes:
+        path (str): SQLite file shared by the worker processes.
+        max_entries (int): Maximum entries in the shared table.
+        local_entries (int): Maximum entries of the in-process LRU.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, local_entries: int = 4096):
+        """
+        Set up the memo; the file is opened on first use (in each thread).
+
+        Args:
+            path (str): SQLite file path.
+            max_entries (int, optional): Maximum shared entries. Defaults to 100_000.
+            local_entries (int, optional): Maximum in-process entries. Defaults to 4096.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.local_entries = local_entries
+        # Trim the shared table after this many writes of this process
+        self.trim_every = max(64, max_entries // 20)
+
+        # (namespace, token) -> entry
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = threading.local()
+        self._namespace = None
+        self._writes = 0
+        self._reported = False
+        self._counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "errors": 0}
+
+    def get_many(self, namespace: str, tokens: List[str],
+                 threshold: float) -> Dict[str, Optional[Tuple[int, float]]]:
+        """
+        Look up the memoized results of normalized tokens.
+
+        Args:
+            namespace (str): Index namespace (see DrugIndex.memo_namespace).
+            tokens (list[str]): Normalized tokens.
+            threshold (float): Minimum score of a match.
+
+        Returns:
+            dict[str, tuple[int, float] | None]: Result of each known token: its
+                (choice id, score), or None when no choice reaches the threshold.
+                Unknown tokens are left out.
+        """
+        found = {}
+        remote = []
+        with self._lock:
+            for token in dict.fromkeys(tokens):
+                entry = self._local.get((namespace, token))
+                known, result = _recall(entry, threshold) if entry is not None else (False, None)
+                if known:
+                    self._local.move_to_end((namespace, token))
+                    found[token] = result
+                else:
+                    remote.append(token)
+        local = len(found)
+
+        fetched = {}
+        stale = []
+        now = time.time()
+        for token, choice_id, score, used in self._select(namespace, remote) if remote else []:
+            entry = (choice_id, score)
+            known, result = _recall(entry, threshold)
+            if known:
+                found[token] = result
+                fetched[token] = entry
+                if now - used > TOUCH_SECONDS:
+                    stale.append((now, namespace, token))
+
+        with self._lock:
+            for token, entry in fetched.items():
+                self._remember(namespace, token, entry)
+            self._counters["local_hits"] += local
+            self._counters["shared_hits"] += len(fetched)
+            self._counters["misses"] += len(remote) - len(fetched)
+        if stale:
+            self._execute("UPDATE memo SET used = ? WHERE namespace = ? AND token = ?", stale)
+
+        MATCH_MEMO_LOOKUPS.inc(local, result="local")
+        MATCH_MEMO_LOOKUPS.inc(len(fetched), result="shared")
+        MATCH_MEMO_LOOKUPS.inc(len(remote) - len(fetched), result="miss")
+        return found
+
+    def put_many(self, namespace: str, results: Dict[str, Optional[Tuple[int, float]]],
+                 threshold: float) -> None:
+        """
+        Memoize freshly scored tokens.
+
+        Args:
+            namespace (str): Index namespace.
+            results (dict[str, tuple[int, float] | None]): Normalized token → best
+                (choice id, score), or None when the token has no candidate.
+            threshold (float): Threshold the tokens were scored with.
+        """
+        if not results:
+            return
+        now = time.time()
+        rows = []
+        for token, result in results.items():
+            if result is not None and result[1] >= threshold:
+                entry = (int(result[0]), float(result[1]))
+            else:
+                entry = (None, float(threshold))
+            rows.append((namespace, token, entry[0], entry[1], now))
+
+        with self._lock:
+            for _, token, choice_id, score, _ in rows:
+                self._remember(namespace, token, (choice_id, score))
+            self._writes += len(rows)
+            trim = self._writes >= self.trim_every
+            if trim:
+                self._writes = 0
+
+        self._execute("INSERT OR REPLACE INTO memo (namespace, token, choice_id, score, used) "
+                      "VALUES (?, ?, ?, ?, ?)", rows)
+        if trim:
+            self._trim()
+
+    def switch(self, namespace: Optional[str]) -> None:
+        """
+        Make a namespace the one this process matches with, dropping the entries
+        of the namespace it replaces.
+
+        Called when a catalog version is loaded. Only the replaced namespace is
+        dropped: other processes may still be on an older or newer version, and
+        their entries are left to the least-recently-used trim.
+
+        Args:
+            namespace (str | None): Index namespace of the loaded catalog version.
+        """
+        with self._lock:
+            previous, self._namespace = self._namespace, namespace
+            if previous is None or previous == namespace:
+                return
+            for key in [key for key in self._local if key[0] == previous]:
+                del self._local[key]
+        self._execute("DELETE FROM memo WHERE namespace = ?", [(previous,)])
+
+    def clear(self) -> None:
+        """Drop every entry (this process's LRU and the shared table)."""
+        with self._lock:
+            self._local.clear()
+        self._execute("DELETE FROM memo")
+
+    def stats(self) -> dict:
+        """
+        Lookup counters of this process.
+
+        Returns:
+            dict: Local/shared hits, misses, hit ratio, SQLite errors and local entries.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            counters["local_entries"] = len(self._local)
+        lookups = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+        counters["hit_ratio"] = (counters["local_hits"] + counters["shared_hits"]) / lookups if lookups else 0.0
+        return counters
+
+    def _remember(self, namespace: str, token: str, entry: Entry) -> None:
+        """Store an entry in the in-process LRU (lock held)."""
+        self._local[(namespace, token)] = entry
+        self._local.move_to_end((namespace, token))
+        while len(self._local) > self.local_entries:
+            self._local.popitem(last=False)
+
+    def _trim(self) -> None:
+        """Drop the least recently used entries beyond max_entries."""
+        db = self._connection()
+        if db is None:
+            return
+        try:
+            (count,) = db.execute("SELECT COUNT(*) FROM memo").fetchone()
+            if count > self.max_entries:
+                db.execute("DELETE FROM memo WHERE (namespace, token) IN ("
+                           "SELECT namespace, token FROM memo ORDER BY used LIMIT ?)",
+                           (count - self.max_entries,))
+                db.commit()
+        except sqlite3.Error as e:
+            self._failed(db, e)
+
+    def _select(self, namespace: str, tokens: List[str]) -> list:
+        """Shared rows (token, choice_id, score, used) of the given tokens."""
+        db = self._connection()
+        if db is None:
+            return []
+        rows = []
+        try:
+            for start in range(0, len(tokens), LOOKUP_CHUNK):
+                chunk = tokens[start:start + LOOKUP_CHUNK]
+                rows.extend(db.execute(
+                    "SELECT token, choice_id, score, used FROM memo "
+                    f"WHERE namespace = ? AND token IN ({', '.join('?' * len(chunk))})",
+                    [namespace, *chunk]
+                ).fetchall())
+        except sqlite3.Error as e:
+            self._failed(db, e)
+        return rows
+
+    def _execute(self, sql: str, params: list = None) -> None:
+        """Run a write statement (once per parameter tuple) and commit; errors only skip the write."""
+        db = self._connection()
+        if db is None:
+            return
+        try:
+            if params is None:
+                db.execute(sql)
+            else:
+                db.executemany(sql, params)
+            db.commit()
+        except sqlite3.Error as e:
+            self._failed(db, e)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite connection of the current thread (reopened after a fork), None if it failed."""
+        state = self._threads
+        if getattr(state, "pid", None) == os.getpid():
+            # Also remembers a failed connect: the thread goes on without the shared table
+            return state.db
+        # A connection inherited through fork must not be used by the child
+        state.pid = os.getpid()
+        state.db = None
+        try:
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS memo ("
+                "namespace TEXT, token TEXT, choice_id INTEGER, score REAL, used REAL, "
+                "PRIMARY KEY (namespace, token)) WITHOUT ROWID"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS memo_used ON memo (used)")
+            db.commit()
+        except sqlite3.Error as e:
+            self._failed(None, e)
+            return None
+        state.db = db
+        return db
+
+    def _failed(self, db: Optional[sqlite3.Connection], error: Exception) -> None:
+        """Count an SQLite error (printing the first one); matching goes on without the shared memo."""
+        if db is not None:
+            try:
+                db.rollback()
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            self._counters["errors"] += 1
+            first, self._reported = not self._reported, True
+        MATCH_MEMO_ERRORS.inc()
+        if first:
+            print(f"Match memo error ({self.path}): {error} (further errors are only counted)")
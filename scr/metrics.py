@@ -0,0 +1,333 @@
+"""
+Metrics Module
+
+This module provides lightweight, thread-safe metrics for the pipeline and
+renders them in the Prometheus text exposition format (served at /metrics):
+    - Histogram: latency and size distributions (e.g. seconds per stage).
+    - Counter: monotonically increasing totals.
+    - CallbackMetric: gauges/counters read from an existing ``stats()`` at
+      scrape time (result cache, inference pool, ...).
+
+``span(stage)`` times a block into the ``dawak_stage_seconds`` histogram.
+Inside ``collect()`` the same spans are also summed into a dict, which gives
+a per-request timing breakdown without passing timers around.
+
+Metrics live in the process that records them; stages run in an inference
+process pool are not visible to the API process.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence
+
+# Bucket upper bounds (seconds) of latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bucket upper bounds of per-image count histograms (boxes, tokens, matches)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _format_value(value: float) -> str:
+    """Prometheus representation of a sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    """Render a label set, e.g. {stage="ocr"} ("" without labels)."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Metric:
+    """
+    Base class of the registered metrics.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Description shown in the HELP line.
+        labels (tuple): Label names.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        """Label values in declaration order."""
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {list(self.labels)}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def render(self) -> List[str]:
+        """
+        Exposition lines of the metric.
+
+        Returns:
+            List[str]: HELP and TYPE lines followed by the samples.
+        """
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing total per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Add to the total.
+
+        Args:
+            amount (float, optional): Non-negative increment. Defaults to 1.
+            **labels: Value of every label.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram per label set.
+
+    Attributes:
+        buckets (tuple): Sorted bucket upper bounds (+Inf is implicit).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value.
+            **labels: Value of every label.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+
+        lines = []
+        names = self.labels + ("le",)
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    Gauge or counter whose value is read from a callback at scrape time.
+
+    The callback returns a number, a dict mapping label values (a string, or a
+    tuple for several labels) to numbers, or None to omit the metric.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable, labels: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        samples = self.samples()
+        if not samples:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + samples
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return []
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            return [f"{self.name} {_format_value(value)}"]
+        return [
+            f"{self.name}{_format_labels(self.labels, key if isinstance(key, tuple) else (key,))} {_format_value(v)}"
+            for key, v in value.items()
+        ]
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric, or return the one already registered under its name.
+
+        Args:
+            metric (Metric): Metric to add.
+
+        Returns:
+            Metric: The registered metric.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format (version 0.0.4).
+
+        Returns:
+            str: Exposition text.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    """Create (or get) a Counter in the default registry."""
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    """Create (or get) a Histogram in the default registry."""
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def callback(name: str, help: str, fn: Callable, labels: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+    """Create (or get) a CallbackMetric in the default registry."""
+    return REGISTRY.register(CallbackMetric(name, help, fn, labels, kind))
+
+
+def render() -> str:
+    """Render the default registry in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+# ===== Pipeline metrics =====
+STAGE_SECONDS = histogram("dawak_stage_seconds", "Time spent in each pipeline stage (per call).", ["stage"])
+BOXES_PER_IMAGE = histogram("dawak_boxes_per_image", "Text boxes detected per image.", buckets=COUNT_BUCKETS)
+TOKENS_PER_IMAGE = histogram("dawak_tokens_per_image", "Cleaned OCR texts per image, by script.",
+                             ["script"], buckets=COUNT_BUCKETS)
+MATCHES_PER_IMAGE = histogram("dawak_matches_per_image", "Drug matches returned per image.", buckets=COUNT_BUCKETS)
+
+# Breakdowns of the enclosing collect() blocks (innermost last)
+_collectors = contextvars.ContextVar("dawak_metrics_collectors", default=())
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Record the time of one stage observation measured by the caller.
+
+    Used when a stage is not one contiguous block, e.g. the OCR of a streamed
+    image, whose per-box work is interleaved with the consumer of each box.
+
+    Args:
+        stage (str): Stage name.
+        seconds (float): Elapsed time.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    for timings in _collectors.get():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a block as one observation of a pipeline stage.
+
+    The elapsed time is recorded in STAGE_SECONDS and added to the breakdown
+    of every enclosing ``collect()`` block, also when the block raises.
+
+    Args:
+        stage (str): Stage name (e.g. "decode", "detect", "ocr", "clean", "match").
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def collect() -> Iterator[Dict[str, float]]:
+    """
+    Collect the stage timings of the spans run inside the block (same thread).
+
+    Yields:
+        Dict[str, float]: Seconds per stage, summed over the spans of each stage.
+    """
+    timings = {}
+    token = _collectors.set(_collectors.get() + (timings,))
+    try:
+        yield timings
+    finally:
+        _collectors.reset(token)
+
+
+def timings_ms(timings: Dict[str, float], digits: int = 2) -> Dict[str, float]:
+    """
+    Convert a breakdown from seconds to rounded milliseconds.
+
+    Args:
+        timings (Dict[str, float]): Seconds per stage.
+        digits (int, optional): Decimal places. Defaults to 2.
+
+    Returns:
+        Dict[str, float]: Milliseconds per stage.
+    """
+    return {stage: round(seconds * 1000, digits) for stage, seconds in timings.items()}
+
@@ -0,0 +1,120 @@
+"""
+Micro-batching Module
+
+This module provides a dynamic micro-batching scheduler. Concurrent callers
+submit single items; the scheduler collects them for up to a short window (or
+until a maximum batch size is reached), runs them as one batch in an
+InferencePool, and hands every caller its own result. Clients keep sending one
+image per request while the models see batches under load.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Callable, List
+
+from scr.inference_pool import InferencePool
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submissions into batches for a batch processing function.
+
+    Attributes:
+        max_batch_size (int): Largest batch handed to the processing function.
+        max_wait_ms (float): How long the first item of a batch waits for company.
+        batch_sizes (Counter): Number of batches run for each batch size.
+    """
+
+    def __init__(self, process_batch: Callable[[list], list], pool: InferencePool,
+                 max_batch_size: int = 8, max_wait_ms: float = 10):
+        """
+        Create the scheduler.
+
+        Args:
+            process_batch (Callable[[list], list]): Blocking function mapping a list of items
+                to a list of results of the same length and order.
+            pool (InferencePool): Pool that runs the batches off the event loop.
+            max_batch_size (int, optional): Maximum items per batch. Defaults to 8.
+            max_wait_ms (float, optional): Collection window in milliseconds. Defaults to 10.
+        """
+        self.process_batch = process_batch
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes = Counter()
+
+        self._pending = []
+        self._timer = None
+        # Running batch tasks; the event loop only keeps weak references to tasks
+        self._tasks = set()
+
+    async def submit(self, item):
+        """
+        Submit one item and wait for its result.
+
+        Args:
+            item: Input for the batch processing function.
+
+        Returns:
+            Any: The result computed for this item.
+
+        Raises:
+            QueueFullError: If the pool rejected the batch containing this item.
+            Exception: Any error raised while processing the batch.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        return await future
+
+    def stats(self) -> dict:
+        """
+        Batch-size distribution achieved so far.
+
+        Returns:
+            dict: Window and size settings, number of batches and requests, mean
+                batch size, and the count of batches per size.
+        """
+        batches = sum(self.batch_sizes.values())
+        requests = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+    def _flush(self) -> None:
+        """Start processing everything collected so far as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batch_sizes[len(batch)] += 1
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]) -> None:
+        """Process one batch in the pool and resolve the callers' futures."""
+        try:
+            results = await self.pool.run(self.process_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
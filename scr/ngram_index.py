@@ -0,0 +1,137 @@
+"""
+N-gram Index Module
+
+This module provides a character trigram inverted index used to shortlist
+candidate names before exact fuzzy scoring. With a large catalog, scoring an
+OCR token against only its top-K trigram neighbours is much cheaper than
+scoring it against every name.
+"""
+
+import numpy as np
+from collections import defaultdict
+from typing import List, Optional, Set
+
+# Length of the character n-grams
+NGRAM_SIZE = 3
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """
+    Compute the set of padded character n-grams of a string.
+
+    Each whitespace-separated word is padded with ``$`` on both sides, so word
+    order does not matter (as with token_sort_ratio) and short words still
+    produce n-grams.
+
+    Args:
+        text (str): Normalized input string.
+        n (int, optional): N-gram length. Defaults to NGRAM_SIZE.
+
+    Returns:
+        set[str]: Distinct n-grams of the string.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"${word}$"
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return grams
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to the ids of the strings that contain them.
+
+    Attributes:
+        strings (list[str]): Indexed strings (ids are their positions).
+        size (int): Number of indexed strings.
+        postings (dict[str, np.ndarray]): N-gram → sorted ids of the strings containing it.
+        gram_counts (np.ndarray): Number of distinct n-grams of each indexed string.
+    """
+
+    def __init__(self, strings: List[str], n: int = NGRAM_SIZE, previous: Optional["NgramIndex"] = None):
+        """
+        Build the index over a list of normalized strings.
+
+        Args:
+            strings (list[str]): Strings to index; ids are their positions in the list.
+            n (int, optional): N-gram length. Defaults to NGRAM_SIZE.
+            previous (NgramIndex, optional): Index over an earlier version of the strings.
+                Postings of strings it already contains are remapped instead of
+                recomputed, so only new strings are split into n-grams. The result is
+                the same as a fresh build.
+        """
+        self.n = n
+        self.strings = strings
+        self.size = len(strings)
+        self.gram_counts = np.zeros(self.size, dtype=np.int32)
+
+        if previous is not None and previous.n == n:
+            self._update(previous)
+            return
+
+        postings = defaultdict(list)
+        for string_id, text in enumerate(strings):
+            grams = ngrams(text, n)
+            self.gram_counts[string_id] = len(grams)
+            for gram in grams:
+                postings[gram].append(string_id)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _update(self, previous: "NgramIndex") -> None:
+        """Build the postings by remapping those of an earlier index (see __init__)."""
+        old_ids = {text: i for i, text in enumerate(previous.strings)}
+        remap = np.full(previous.size, -1, dtype=np.int32)
+        added = defaultdict(list)
+        for string_id, text in enumerate(self.strings):
+            old_id = old_ids.get(text)
+            if old_id is not None:
+                remap[old_id] = string_id
+                self.gram_counts[string_id] = previous.gram_counts[old_id]
+                continue
+            grams = ngrams(text, self.n)
+            self.gram_counts[string_id] = len(grams)
+            for gram in grams:
+                added[gram].append(string_id)
+
+        self.postings = {}
+        for gram, ids in previous.postings.items():
+            ids = remap[ids]
+            ids = ids[ids >= 0]
+            extra = added.pop(gram, None)
+            if extra:
+                ids = np.concatenate([ids, np.array(extra, dtype=np.int32)])
+            if len(ids):
+                self.postings[gram] = np.sort(ids)
+        for gram, ids in added.items():
+            self.postings[gram] = np.array(ids, dtype=np.int32)
+
+    def candidates(self, query: str, k: int) -> np.ndarray:
+        """
+        Shortlist the ids of the ``k`` strings sharing the most n-grams with the query.
+
+        Candidates are ranked by the Dice coefficient of their n-gram sets, which
+        tracks edit-based similarity closely enough to act as a prefilter.
+
+        Args:
+            query (str): Normalized query string.
+            k (int): Maximum number of candidates to return.
+
+        Returns:
+            np.ndarray: Candidate ids in ascending order (the original catalog order,
+                so ties in the exact scoring resolve as they would without the prefilter).
+        """
+        query_grams = ngrams(query, self.n)
+        hits = [self.postings[g] for g in query_grams if g in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.int32)
+
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        if len(ids) > k:
+            dice = 2.0 * shared / (len(query_grams) + self.gram_counts[ids])
+            ids = np.sort(ids[np.argpartition(-dice, k - 1)[:k]])
+        return ids
@@ -0,0 +1,229 @@
+"""
+OCR Recognizer Module
+
+This module creates the EasyOCR reader with a selectable recognition backend.
+The recognizer network (feature extractor + BiLSTM + CTC head) is where most
+of the OCR CPU time goes; the modes trade exactness for speed:
+    - fp32:      PyTorch, full precision (reference).
+    - int8:      PyTorch with dynamic INT8 quantization of the LSTM and linear
+                 layers (EasyOCR's own CPU default).
+    - onnx:      recognizer exported to ONNX and run on ONNX Runtime (FP32).
+    - onnx-int8: the ONNX recognizer with dynamically quantized INT8 weights.
+
+The reader API is unchanged: ``readtext`` and ``recognize`` return the same
+structures in every mode. ONNX files are exported on first use from the FP32
+network and re-exported when the OCR languages change.
+"""
+
+import os
+from typing import List, Optional
+
+import easyocr
+import numpy as np
+
+RECOGNIZER_MODES = ("fp32", "int8", "onnx", "onnx-int8")
+
+# Height of the recognizer input (EasyOCR resizes every crop to it)
+RECOGNIZER_IMG_HEIGHT = 64
+
+
+class ONNXRecognizer:
+    """
+    Drop-in replacement for the EasyOCR recognizer module, backed by ONNX Runtime.
+
+    EasyOCR calls ``model.eval()`` and then ``model(images, text)`` and applies a
+    softmax to the returned tensor, which is all this class provides.
+
+    Attributes:
+        path (str): ONNX model path.
+    """
+
+    def __init__(self, path: str, threads: int = 0):
+        """
+        Args:
+            path (str): ONNX model path.
+            threads (int, optional): Intra-op threads (0 lets ONNX Runtime decide).
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, images, text=None):
+        import torch
+
+        outputs = self.session.run(None, {self._input_name: images.detach().cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+
+def onnx_languages(path: str) -> Optional[List[str]]:
+    """
+    Languages an exported recognizer was built for.
+
+    Args:
+        path (str): ONNX model path.
+
+    Returns:
+        Optional[List[str]]: Language codes, or None if the file is missing or unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        import onnxruntime as ort
+        meta = ort.InferenceSession(path, providers=["CPUExecutionProvider"]).get_modelmeta()
+        return meta.custom_metadata_map.get("languages", "").split(",")
+    except Exception as e:
+        print(f"Error reading recognizer {path}: {e}")
+        return None
+
+
+def export_recognizer(reader: easyocr.Reader, path: str, languages: List[str]) -> str:
+    """
+    Export the FP32 recognizer of a reader to ONNX (dynamic batch and width).
+
+    Args:
+        reader (easyocr.Reader): Reader created with quantize=False.
+        path (str): Output ONNX path.
+        languages (List[str]): OCR languages, recorded in the model metadata.
+
+    Returns:
+        str: Path of the ONNX file.
+    """
+    import onnx
+    import torch
+
+    class Recognizer(torch.nn.Module):
+        """The recognizer without its unused text argument."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, images):
+            return self.model(images, None)
+
+    model = Recognizer(reader.recognizer).eval()
+    dummy = torch.zeros(1, 1, RECOGNIZER_IMG_HEIGHT, 256)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (dummy,), tmp_path,
+            input_names=["images"], output_names=["logits"],
+            dynamic_axes={"images": {0: "batch", 3: "width"}, "logits": {0: "batch", 1: "steps"}},
+            opset_version=13,
+        )
+
+    exported = onnx.load(tmp_path)
+    exported.metadata_props.add(key="languages", value=",".join(languages))
+    onnx.save(exported, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def quantize_recognizer(fp32_path: str, int8_path: str) -> str:
+    """
+    Dynamically quantize the weights of an ONNX recognizer to INT8.
+
+    Args:
+        fp32_path (str): FP32 ONNX recognizer.
+        int8_path (str): Output path.
+
+    Returns:
+        str: Path of the INT8 model.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+    quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+
+    # quantize_dynamic does not keep custom metadata
+    quantized = onnx.load(tmp_path)
+    quantized.metadata_props.extend(onnx.load(fp32_path).metadata_props)
+    onnx.save(quantized, tmp_path)
+    os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+def recognizer_path(onnx_path: str, mode: str) -> str:
+    """
+    ONNX file of a mode: ``onnx_path`` itself, or its ".int8.onnx" sibling.
+
+    Args:
+        onnx_path (str): Path of the FP32 ONNX recognizer.
+        mode (str): "onnx" or "onnx-int8".
+
+    Returns:
+        str: Path of the mode's ONNX file.
+    """
+    if mode == "onnx-int8":
+        return os.path.splitext(onnx_path)[0] + ".int8.onnx"
+    return onnx_path
+
+
+def create_reader(languages: List[str], detector: bool = True, mode: str = "int8",
+                  onnx_path: Optional[str] = None, threads: int = 0) -> easyocr.Reader:
+    """
+    Initialize an EasyOCR reader with the given recognizer mode.
+
+    Args:
+        languages (List[str]): List of language codes (e.g., ["en", "ar"]).
+        detector (bool, optional): Load the CRAFT text detector. Defaults to True.
+        mode (str, optional): One of RECOGNIZER_MODES. Defaults to "int8".
+        onnx_path (str, optional): FP32 ONNX recognizer path (ONNX modes only).
+        threads (int, optional): ONNX Runtime intra-op threads (0 lets it decide).
+
+    Returns:
+        easyocr.Reader: An OCR reader instance that can extract text from images.
+
+    Raises:
+        ValueError: If the mode is unknown, or an ONNX mode has no onnx_path.
+    """
+    if mode not in RECOGNIZER_MODES:
+        raise ValueError(f"Unknown recognizer mode {mode!r}, expected one of {list(RECOGNIZER_MODES)}")
+    if mode.startswith("onnx") and not onnx_path:
+        raise ValueError(f"Recognizer mode {mode!r} needs an onnx_path")
+
+    reader = easyocr.Reader(languages, detector=detector, quantize=(mode == "int8"))
+    if not mode.startswith("onnx"):
+        return reader
+
+    # Export from the FP32 network when missing or built for other languages
+    if onnx_languages(onnx_path) != list(languages):
+        print(f"Exporting OCR recognizer for {languages} to {onnx_path}")
+        export_recognizer(reader, onnx_path, languages)
+
+    path = recognizer_path(onnx_path, mode)
+    if mode == "onnx-int8" and onnx_languages(path) != list(languages):
+        quantize_recognizer(onnx_path, path)
+
+    reader.recognizer = ONNXRecognizer(path, threads)
+    return reader
+
+
+def max_logit_error(reference: easyocr.Reader, candidate: easyocr.Reader, batch: np.ndarray) -> float:
+    """
+    Largest absolute difference between the recognizer outputs of two readers.
+
+    Args:
+        reference (easyocr.Reader): Reference reader (e.g. fp32).
+        candidate (easyocr.Reader): Reader to compare.
+        batch (np.ndarray): float32 input of shape (N, 1, RECOGNIZER_IMG_HEIGHT, W).
+
+    Returns:
+        float: Maximum absolute logit difference.
+    """
+    import torch
+
+    images = torch.from_numpy(batch)
+    with torch.no_grad():
+        expected = reference.recognizer.eval()(images, None)
+        actual = candidate.recognizer.eval()(images, None)
+    return float((expected - actual).abs().max())
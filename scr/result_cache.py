@@ -0,0 +1,233 @@
+"""
+Result Cache Module
+
+This module provides a content-addressed cache for pipeline results, so that
+resubmitted images (retries, popular boxes photographed by many users) skip
+the YOLO + OCR + matching pipeline or the generative model call.
+
+Entries are keyed by a content hash of the image and evicted by LRU order,
+TTL and a memory cap. An optional perceptual hash (dHash) catches
+near-duplicates, and an optional SQLite file keeps entries across restarts.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def content_hash(image: np.ndarray) -> str:
+    """
+    Hash the pixels of a decoded image (identical pixels give the same key,
+    whatever the original encoding).
+
+    Args:
+        image (np.ndarray): Decoded image.
+
+    Returns:
+        str: Hex SHA-256 digest of the image shape and pixel data.
+    """
+    digest = hashlib.sha256(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def bytes_hash(data: bytes) -> str:
+    """
+    Hash raw (encoded) bytes, for callers that never decode the image.
+
+    Args:
+        data (bytes): Encoded image bytes.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+
+    Near-identical photos (re-encoded, slightly resized or brightened) give
+    hashes that differ in only a few bits.
+
+    Args:
+        image (np.ndarray): Decoded BGR or grayscale image.
+
+    Returns:
+        int: 64-bit perceptual hash.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(sum(1 << i for i, bit in enumerate(bits) if bit))
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of JSON-serializable results with a memory cap.
+
+    Attributes:
+        max_entries (int): Maximum number of in-memory entries.
+        max_bytes (int): Maximum total serialized size of in-memory entries.
+        ttl_seconds (float): Lifetime of an entry.
+        phash_distance (int): Maximum Hamming distance for a near-duplicate hit
+            (negative disables perceptual lookups).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600, disk_path: Optional[str] = None,
+                 phash_distance: int = -1):
+        """
+        Create the cache.
+
+        Args:
+            max_entries (int, optional): Maximum in-memory entries. Defaults to 1024.
+            max_bytes (int, optional): Memory cap (serialized size). Defaults to 64 MiB.
+            ttl_seconds (float, optional): Entry lifetime in seconds. Defaults to 3600.
+            disk_path (str, optional): SQLite file that keeps entries across restarts.
+                Defaults to None (memory only).
+            phash_distance (int, optional): Near-duplicate Hamming distance; -1 disables
+                perceptual matching. Defaults to -1.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.phash_distance = phash_distance
+
+        # key -> (created, size, phash, value)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "near_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, phash TEXT, created REAL, value TEXT)"
+            )
+            self._db.commit()
+
+    def get(self, key: str, phash: Optional[int] = None):
+        """
+        Look up a result by content key, falling back to a near-duplicate match.
+
+        Args:
+            key (str): Content hash of the image.
+            phash (int, optional): Perceptual hash of the image, for near-duplicate lookups.
+
+        Returns:
+            Any | None: The cached result, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[3]
+            if entry is not None:
+                self._remove(key)
+
+            if phash is not None and self.phash_distance >= 0:
+                near_key = self._find_near(phash, now)
+                if near_key is not None:
+                    self._entries.move_to_end(near_key)
+                    self._counters["near_hits"] += 1
+                    return self._entries[near_key][3]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, phash, value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[0] <= self.ttl_seconds:
+                    value = json.loads(row[2])
+                    stored_phash = None if row[1] is None else int(row[1], 16)
+                    self._store(key, value, row[2], stored_phash, row[0])
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value, phash: Optional[int] = None) -> None:
+        """
+        Store a result.
+
+        Args:
+            key (str): Content hash of the image.
+            value (Any): JSON-serializable result.
+            phash (int, optional): Perceptual hash of the image.
+        """
+        serialized = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._store(key, value, serialized, phash, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, phash, created, value) VALUES (?, ?, ?, ?)",
+                    (key, None if phash is None else format(phash, "016x"), now, serialized)
+                )
+                self._db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry (memory and disk)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Cache counters and size.
+
+        Returns:
+            dict: Hit/miss/eviction counters, hit ratio, entry count and memory use.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters["hits"] + counters["near_hits"] + counters["disk_hits"] + counters["misses"]
+            counters["hit_ratio"] = (lookups - counters["misses"]) / lookups if lookups else 0.0
+            counters["entries"] = len(self._entries)
+            counters["bytes"] = self._bytes
+            return counters
+
+    def _store(self, key, value, serialized, phash, created) -> None:
+        """Insert an entry in memory and evict down to the limits (lock held)."""
+        if key in self._entries:
+            self._remove(key)
+
+        size = len(serialized)
+        self._entries[key] = (created, size, phash, value)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._counters["evictions"] += 1
+
+    def _remove(self, key) -> None:
+        """Remove an in-memory entry (lock held)."""
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _find_near(self, phash: int, now: float) -> Optional[str]:
+        """Key of the closest live entry within phash_distance, if any (lock held)."""
+        best_key, best_distance = None, self.phash_distance + 1
+        for key, (created, _, other, _) in self._entries.items():
+            if other is None or now - created > self.ttl_seconds:
+                continue
+            distance = bin(phash ^ other).count("1")
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
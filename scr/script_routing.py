@@ -0,0 +1,208 @@
+"""
+Script Routing Module
+
+Drug names on boxes are printed mostly in Latin script. The English+Arabic
+EasyOCR reader runs the large Arabic recognition network on every crop,
+while EasyOCR's English-only network is several times lighter.
+
+ScriptRouter recognizes every text region with the English reader first and
+keeps the result when its confidence is high enough (Latin text). Only the
+remaining regions (Arabic, mixed or unreadable) are recognized again by the
+English+Arabic reader, and the more confident of the two readings is kept.
+Text detection (CRAFT) runs once, with the English+Arabic reader's detector:
+the English reader is created without one, and fallback regions are only
+recognized again, never re-detected. The router has the same ``readtext``
+and ``recognize`` interface as an EasyOCR reader.
+
+Routing is off by default (OCR_SCRIPT_ROUTING); check its latency and match
+agreement on real crops with python -m benchmarks.script_routing first.
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+from scr.ocr_recognizer import create_reader
+from scr.transliteration import text_script
+
+# Recognition confidence above which the English reading of a region is kept
+ROUTING_MIN_CONFIDENCE = 0.5
+
+# readtext arguments that belong to text detection (easyocr.Reader.detect)
+DETECT_ARGS = frozenset([
+    "min_size", "text_threshold", "low_text", "link_threshold", "canvas_size", "mag_ratio",
+    "slope_ths", "ycenter_ths", "height_ths", "width_ths", "add_margin", "threshold",
+    "bbox_min_score", "bbox_min_size", "max_candidates",
+])
+
+
+def box_to_region(box) -> tuple:
+    """
+    Turn a result box back into an EasyOCR input region.
+
+    Args:
+        box (list): Four [x, y] corner points of a result.
+
+    Returns:
+        tuple: ("horizontal", [x_min, x_max, y_min, y_max]) for axis-aligned boxes,
+            ("free", box) otherwise.
+    """
+    xs = [int(p[0]) for p in box]
+    ys = [int(p[1]) for p in box]
+    if box[0][1] == box[1][1] and box[1][0] == box[2][0]:
+        return "horizontal", [min(xs), max(xs), min(ys), max(ys)]
+    return "free", [[int(x), int(y)] for x, y in box]
+
+
+class ScriptRouter:
+    """
+    OCR reader that sends Latin crops to a light English reader only.
+
+    Attributes:
+        latin_reader (easyocr.Reader): English-only reader (recognition only).
+        fallback_reader (easyocr.Reader): Reader for all OCR languages (e.g. English+Arabic),
+            whose detector also finds the text regions of ``readtext``.
+        min_confidence (float): Confidence needed to keep the English reading.
+    """
+
+    def __init__(self, latin_reader, fallback_reader, min_confidence: float = ROUTING_MIN_CONFIDENCE):
+        """
+        Args:
+            latin_reader (easyocr.Reader): English-only reader; its detector is not used.
+            fallback_reader (easyocr.Reader): Reader for all OCR languages.
+            min_confidence (float, optional): Confidence needed to keep the English
+                reading. Defaults to ROUTING_MIN_CONFIDENCE.
+        """
+        self.latin_reader = latin_reader
+        self.fallback_reader = fallback_reader
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._counters = {"latin": 0, "fallback": 0}
+
+    def readtext(self, image, detail: int = 1, **kwargs) -> list:
+        """
+        EasyOCR readtext on one image (crop), routed by script per text region.
+
+        The regions are detected once by the fallback reader's detector, then
+        recognized as in ``recognize``.
+
+        Args:
+            image: Image (array, path or bytes), as for easyocr.Reader.readtext.
+            detail (int, optional): 1 for (box, text, confidence) results, 0 for texts only.
+            **kwargs: Other readtext arguments (``paragraph`` is not supported).
+
+        Returns:
+            list: One result per detected region.
+        """
+        detect_kwargs = {k: kwargs.pop(k) for k in list(kwargs) if k in DETECT_ARGS}
+        horizontal_list, free_list = self.fallback_reader.detect(image, **detect_kwargs)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+        if not horizontal_list and not free_list:
+            return []
+        return self.recognize(image, horizontal_list=horizontal_list, free_list=free_list,
+                              detail=detail, **kwargs)
+
+    def recognize(self, image, horizontal_list: Optional[list] = None, free_list: Optional[list] = None,
+                  detail: int = 1, **kwargs) -> list:
+        """
+        EasyOCR recognize on given regions, routed by script per region.
+
+        All regions are recognized by the English reader in one call; the regions
+        it is not confident about are recognized again together by the fallback
+        reader. Results keep the order of the English call.
+
+        Args:
+            image: Image, as for easyocr.Reader.recognize.
+            horizontal_list (list, optional): [x_min, x_max, y_min, y_max] regions.
+            free_list (list, optional): Four-point regions.
+            detail (int, optional): 1 for (box, text, confidence) results, 0 for texts only.
+            **kwargs: Other recognize arguments (batch_size, reformat, ...).
+
+        Returns:
+            list: One result per region.
+        """
+        latin = self.latin_reader.recognize(image, horizontal_list=horizontal_list, free_list=free_list,
+                                            detail=1, **kwargs)
+
+        retry = [i for i, r in enumerate(latin) if r[2] < self.min_confidence or text_script(r[1]) == "arabic"]
+        self._count("latin", len(latin) - len(retry))
+        self._count("fallback", len(retry))
+
+        results = list(latin)
+        if retry:
+            regions = {"horizontal": [], "free": []}
+            for i in retry:
+                kind, region = box_to_region(latin[i][0])
+                regions[kind].append(region)
+            fallback = self.fallback_reader.recognize(image, horizontal_list=regions["horizontal"],
+                                                      free_list=regions["free"], detail=1, **kwargs)
+
+            # Match the fallback readings back to their regions by box
+            by_box = {_box_key(r[0]): r for r in fallback}
+            for i in retry:
+                other = by_box.get(_box_key(latin[i][0]))
+                if other is not None and other[2] >= latin[i][2]:
+                    results[i] = other
+
+        return results if detail else [r[1] for r in results]
+
+    def stats(self) -> dict:
+        """
+        Routing counters.
+
+        Returns:
+            dict: Text regions kept from the English reader ("latin") and recognized
+                again by the fallback reader ("fallback").
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, key: str, n: int) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+
+def _box_key(box) -> tuple:
+    """Hashable form of a result box."""
+    return tuple((int(x), int(y)) for x, y in box)
+
+
+def latin_onnx_path(onnx_path: Optional[str]) -> Optional[str]:
+    """
+    ONNX recognizer path of the English reader, next to the main one.
+
+    Args:
+        onnx_path (str, optional): ONNX recognizer path of the main reader.
+
+    Returns:
+        Optional[str]: "<name>.en.onnx", or None without onnx_path.
+    """
+    if not onnx_path:
+        return None
+    root, ext = os.path.splitext(onnx_path)
+    return f"{root}.en{ext}"
+
+
+def create_routed_reader(languages: List[str], detector: bool = True, mode: str = "int8",
+                         onnx_path: Optional[str] = None,
+                         min_confidence: float = ROUTING_MIN_CONFIDENCE) -> ScriptRouter:
+    """
+    Create a ScriptRouter over an English reader and a reader for all languages.
+
+    Only the fallback reader loads a CRAFT detector; the English reader is
+    recognition-only.
+
+    Args:
+        languages (List[str]): OCR languages of the fallback reader (e.g., ["en", "ar"]).
+        detector (bool, optional): Load the CRAFT text detector (needed for readtext).
+            Defaults to True.
+        mode (str, optional): Recognizer mode (see scr/ocr_recognizer.py). Defaults to "int8".
+        onnx_path (str, optional): ONNX recognizer path (ONNX modes only).
+        min_confidence (float, optional): Confidence needed to keep the English reading.
+
+    Returns:
+        ScriptRouter: The routed reader.
+    """
+    latin = create_reader(["en"], detector=False, mode=mode, onnx_path=latin_onnx_path(onnx_path))
+    fallback = create_reader(languages, detector=detector, mode=mode, onnx_path=onnx_path)
+    return ScriptRouter(latin, fallback, min_confidence)
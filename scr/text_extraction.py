@@ -2,19 +2,198 @@
 Text Extraction Module
 
 This module provides utilities to:
-1. Extract text from images using YOLO for region detection + EasyOCR for recognition.
+1. Extract text from images using YOLO for region detection + EasyOCR for recognition,
+   all at once or as a stream of per-box results (iter_text_with_yolo).
 2. Clean extracted texts for better downstream matching (e.g., drug name matching).
 """
 
 import cv2
 import easyocr
+import numpy as np
 import re
-import os
-from typing import List
-from scr.image_processing import save_image_temp
+import time
+from typing import Iterator, List, Optional, Tuple
 
+from scr.image_processing import resize_for_detection, scale_boxes
+from scr.metrics import BOXES_PER_IMAGE, TOKENS_PER_IMAGE, record_stage, span
+from scr.transliteration import ARABIC_WORD_RE, normalize_arabic
 
-def extract_text_with_yolo(model, reader: easyocr.Reader, image, conf_threshold: float = 0.5) -> List[str]:
+
+def detect_text_boxes(model, image, conf_threshold: float = 0.5,
+                      det_size: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Detect text regions in an image with YOLO.
+
+    The decoded image is passed to YOLO as an in-memory array, so no temporary
+    file is written and the image is not re-compressed before detection.
+
+    Args:
+        model: YOLO object detection model instance.
+        image (np.ndarray): Input image in OpenCV BGR format.
+        conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+        det_size (int, optional): Run detection on a copy downscaled to this size and
+            map the boxes back onto ``image``. Defaults to None (YOLO resizes itself).
+
+    Returns:
+        List[Tuple[int, int, int, int]]: (x1, y1, x2, y2) pixel boxes of the detected regions.
+    """
+    with span("detect"):
+        if det_size:
+            small, scale = resize_for_detection(image, det_size)
+            results = model.predict(small, imgsz=det_size, verbose=False)
+        else:
+            scale = 1.0
+            results = model.predict(image, verbose=False)
+
+        # Iterate over YOLO detection results
+        boxes = []
+        for r in results:
+            boxes.extend(_boxes_from_result(r, conf_threshold))
+        boxes = scale_boxes(boxes, scale, image.shape)
+
+    BOXES_PER_IMAGE.observe(len(boxes))
+    return boxes
+
+
+def detect_text_boxes_batch(model, images: list, conf_threshold: float = 0.5,
+                            det_size: Optional[int] = None) -> List[List[Tuple[int, int, int, int]]]:
+    """
+    Detect text regions in several images with a single batched YOLO call.
+
+    Args:
+        model: YOLO object detection model instance.
+        images (list[np.ndarray]): Input images in OpenCV BGR format.
+        conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+        det_size (int, optional): Run detection on copies downscaled to this size and
+            map the boxes back onto the input images. Defaults to None.
+
+    Returns:
+        List[List[Tuple[int, int, int, int]]]: (x1, y1, x2, y2) boxes of each image, in input order.
+    """
+    if not images:
+        return []
+
+    with span("detect"):
+        if not det_size:
+            results = model.predict(list(images), verbose=False)
+            boxes_per_image = [_boxes_from_result(r, conf_threshold) for r in results]
+        else:
+            resized = [resize_for_detection(image, det_size) for image in images]
+            results = model.predict([small for small, _ in resized], imgsz=det_size, verbose=False)
+            boxes_per_image = [
+                scale_boxes(_boxes_from_result(r, conf_threshold), scale, image.shape)
+                for r, (_, scale), image in zip(results, resized, images)
+            ]
+
+    for boxes in boxes_per_image:
+        BOXES_PER_IMAGE.observe(len(boxes))
+    return boxes_per_image
+
+
+def _boxes_from_result(result, conf_threshold: float) -> List[Tuple[int, int, int, int]]:
+    """
+    Extract the confident (x1, y1, x2, y2) pixel boxes of one YOLO result.
+
+    Args:
+        result: A single YOLO result (one image).
+        conf_threshold (float): Confidence threshold for detections.
+
+    Returns:
+        List[Tuple[int, int, int, int]]: Boxes at or above the threshold.
+    """
+    boxes = []
+    for box in result.boxes:
+        conf = box.conf[0].cpu().numpy()
+
+        if conf >= conf_threshold:
+            # Extract bounding box coordinates
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
+            boxes.append((int(x1), int(y1), int(x2), int(y2)))
+
+    return boxes
+
+
+def recognize_boxes(reader: easyocr.Reader, image, boxes: List[Tuple[int, int, int, int]]) -> List[str]:
+    """
+    Run recognition-only OCR on the given boxes of an image.
+
+    All boxes are sent to the EasyOCR recognizer in one call (batched on GPU;
+    EasyOCR steps through the boxes itself on CPU), with no CRAFT text detection
+    on the crops, so the reader can be created without its detector network
+    (``detector=False``). Each box is read as a single text line. Boxes that are
+    empty once clipped to the image are skipped, as empty crops are in
+    extract_texts_batch.
+
+    Args:
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        image (np.ndarray): Input image in OpenCV BGR format.
+        boxes (List[Tuple[int, int, int, int]]): (x1, y1, x2, y2) pixel boxes.
+
+    Returns:
+        List[str]: Recognized text of each non-empty box.
+    """
+    # EasyOCR expects horizontal boxes as [x_min, x_max, y_min, y_max]
+    height, width = image.shape[:2]
+    horizontal_list = []
+    for x1, y1, x2, y2 in boxes:
+        x1, x2 = max(x1, 0), min(x2, width)
+        y1, y2 = max(y1, 0), min(y2, height)
+        if x2 > x1 and y2 > y1:
+            horizontal_list.append([x1, x2, y1, y2])
+    if not horizontal_list:
+        return []
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return reader.recognize(
+        gray,
+        horizontal_list=horizontal_list,
+        free_list=[],
+        batch_size=len(horizontal_list),
+        detail=0,
+        reformat=False
+    )
+
+
+def recognize_crops(reader: easyocr.Reader, crops: list) -> List[str]:
+    """
+    Run recognition-only OCR on crops that may come from different images.
+
+    The crops are stacked vertically on one grayscale canvas so that a single
+    recognize call covers all of them.
+
+    Args:
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        crops (list[np.ndarray]): Cropped regions in OpenCV BGR format.
+
+    Returns:
+        List[str]: Recognized text of each crop, in input order.
+    """
+    if not crops:
+        return []
+
+    grays = [cv2.cvtColor(c, cv2.COLOR_BGR2GRAY) for c in crops]
+    canvas = np.zeros((sum(g.shape[0] for g in grays), max(g.shape[1] for g in grays)), dtype=np.uint8)
+
+    horizontal_list = []
+    y = 0
+    for g in grays:
+        h, w = g.shape
+        canvas[y:y + h, :w] = g
+        horizontal_list.append([0, w, y, y + h])
+        y += h
+
+    return reader.recognize(
+        canvas,
+        horizontal_list=horizontal_list,
+        free_list=[],
+        batch_size=len(horizontal_list),
+        detail=0,
+        reformat=False
+    )
+
+
+def extract_text_with_yolo(model, reader: easyocr.Reader, image, conf_threshold: float = 0.5,
+                           recognize_only: bool = False, det_size: Optional[int] = None) -> List[str]:
     """
     Extract text from an image using YOLO for object detection and EasyOCR for text recognition.
 
@@ -23,41 +202,149 @@ def extract_text_with_yolo(model, reader: easyocr.Reader, image, conf_threshold:
         reader (easyocr.Reader): Initialized EasyOCR reader.
         image (np.ndarray): Input image in OpenCV BGR format.
         conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+        recognize_only (bool, optional): Recognize all YOLO boxes in one batch without
+            running EasyOCR's own text detector on each crop. Defaults to False.
+        det_size (int, optional): Detector input size (see detect_text_boxes). Defaults to None.
 
     Returns:
         List[str]: List of recognized text strings extracted from the detected regions.
     """
-    texts = []
-    temp_path = save_image_temp(image)
+    boxes = detect_text_boxes(model, image, conf_threshold, det_size)
+    return ocr_boxes(reader, image, boxes, recognize_only)
 
-    try:
-        results = model.predict(temp_path, verbose=False)
 
-        # Iterate over YOLO detection results
-        for r in results:
-            for box in r.boxes:
-                conf = box.conf[0].cpu().numpy()
+def ocr_boxes(reader: easyocr.Reader, image, boxes: List[Tuple[int, int, int, int]],
+              recognize_only: bool = False) -> List[str]:
+    """
+    Run OCR on the detected regions of an image (the second stage of extract_text_with_yolo).
+
+    Args:
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        image (np.ndarray): Input image in OpenCV BGR format.
+        boxes (List[Tuple[int, int, int, int]]): (x1, y1, x2, y2) pixel boxes.
+        recognize_only (bool, optional): Recognize all boxes in one batch without
+            running EasyOCR's own text detector on each crop. Defaults to False.
+
+    Returns:
+        List[str]: List of recognized text strings extracted from the regions.
+    """
+    with span("ocr"):
+        if recognize_only:
+            return recognize_boxes(reader, image, boxes)
+
+        texts = []
+        for _, result in iter_box_texts(reader, image, boxes):
+            texts.extend(result)
+
+        return texts
+
+
+def iter_box_texts(reader: easyocr.Reader, image, boxes: List[Tuple[int, int, int, int]],
+                   recognize_only: bool = False) -> Iterator[Tuple[Tuple[int, int, int, int], List[str]]]:
+    """
+    Run OCR on the detected regions of an image one box at a time, yielding each
+    box's texts as soon as it is read.
+
+    Args:
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        image (np.ndarray): Input image in OpenCV BGR format.
+        boxes (List[Tuple[int, int, int, int]]): (x1, y1, x2, y2) pixel boxes.
+        recognize_only (bool, optional): Read each box as a single text line without
+            EasyOCR's own text detector. Defaults to False.
+
+    Yields:
+        Tuple[Tuple[int, int, int, int], List[str]]: A box and its recognized texts, in box order.
+    """
+    for box in boxes:
+        x1, y1, x2, y2 = box
+        with span("ocr_box"):
+            if recognize_only:
+                texts = recognize_boxes(reader, image, [box])
+            else:
+                # Run OCR (detection + recognition) on the cropped region
+                texts = reader.readtext(image[y1:y2, x1:x2], detail=0)
+        yield box, texts
+
+
+def iter_text_with_yolo(model, reader: easyocr.Reader, image, conf_threshold: float = 0.5,
+                        recognize_only: bool = False, det_size: Optional[int] = None) -> Iterator[dict]:
+    """
+    Streaming form of extract_text_with_yolo: report the detected boxes first,
+    then the texts of each box as soon as it is recognized.
+
+    Boxes come in YOLO's order (most confident first), so the first texts are
+    usually available after a fraction of the total OCR time. The OCR time of
+    all boxes is recorded as one "ocr" stage observation at the end, without
+    the time the consumer spends between boxes.
+
+    Args:
+        model: YOLO object detection model instance.
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        image (np.ndarray): Input image in OpenCV BGR format.
+        conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+        recognize_only (bool, optional): Read each box without EasyOCR's own text detector.
+            Defaults to False.
+        det_size (int, optional): Detector input size (see detect_text_boxes). Defaults to None.
 
-                if conf >= conf_threshold:
-                    # Extract bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
+    Yields:
+        dict: {"event": "boxes", "boxes": [...]} once, then
+              {"event": "box", "index": i, "box": (x1, y1, x2, y2), "texts": [...]} per box.
+    """
+    boxes = detect_text_boxes(model, image, conf_threshold, det_size)
+    yield {"event": "boxes", "boxes": boxes}
+
+    box_texts = iter_box_texts(reader, image, boxes, recognize_only)
+    ocr_seconds = 0.0
+    for i in range(len(boxes)):
+        start = time.perf_counter()
+        box, texts = next(box_texts)
+        ocr_seconds += time.perf_counter() - start
+        yield {"event": "box", "index": i, "box": box, "texts": texts}
+    record_stage("ocr", ocr_seconds)
 
-                    # Crop the detected region from the image
-                    crop = image[y1:y2, x1:x2]
 
-                    # Run OCR on the cropped region
-                    result = reader.readtext(crop, detail=0)
-                    texts.extend(result)
+def extract_texts_batch(model, reader: easyocr.Reader, images: list, conf_threshold: float = 0.5,
+                        recognize_only: bool = False, det_size: Optional[int] = None) -> List[List[str]]:
+    """
+    Extract text from several images: one batched YOLO call, then OCR of all crops together.
+
+    Args:
+        model: YOLO object detection model instance.
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        images (list[np.ndarray]): Input images in OpenCV BGR format.
+        conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+        recognize_only (bool, optional): Recognize the crops of all images in a single
+            recognition-only call instead of running readtext on each crop. Defaults to False.
+        det_size (int, optional): Detector input size (see detect_text_boxes). Defaults to None.
+
+    Returns:
+        List[List[str]]: Recognized text strings of each image, in input order.
+    """
+    boxes_per_image = detect_text_boxes_batch(model, images, conf_threshold, det_size)
+
+    # Crop every detected region, remembering which image it belongs to
+    crops = []
+    owners = []
+    for i, (image, boxes) in enumerate(zip(images, boxes_per_image)):
+        for x1, y1, x2, y2 in boxes:
+            crop = image[y1:y2, x1:x2]
+            if crop.size:
+                crops.append(crop)
+                owners.append(i)
 
-    finally:
-        # Ensure temporary file is removed
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+    texts = [[] for _ in images]
+    with span("ocr"):
+        if recognize_only:
+            for owner, text in zip(owners, recognize_crops(reader, crops)):
+                texts[owner].append(text)
+        else:
+            for owner, crop in zip(owners, crops):
+                texts[owner].extend(reader.readtext(crop, detail=0))
 
     return texts
 
 
-def clean_extracted_texts(texts: List[str]) -> List[str]:
+def clean_extracted_texts(texts: List[str], record: bool = True) -> List[str]:
     """
     Clean and normalize extracted text strings to improve matching accuracy.
 
@@ -69,24 +356,60 @@ def clean_extracted_texts(texts: List[str]) -> List[str]:
 
     Args:
         texts (List[str]): Raw OCR-extracted texts.
+        record (bool, optional): Count the tokens in the per-image token histogram;
+            False for partial texts (e.g. one box of a streamed image). Defaults to True.
 
     Returns:
         List[str]: List of cleaned and normalized text strings.
     """
-    cleaned = []
-    for t in texts:
-        t = t.lower()
-        t = re.sub(r'[^a-z\s]', '', t)
-        t = t.strip()
-        if t and len(t) > 2:
-            cleaned.append(t)
+    with span("clean"):
+        cleaned = []
+        for t in texts:
+            t = t.lower()
+            t = re.sub(r'[^a-z\s]', '', t)
+            t = t.strip()
+            if t and len(t) > 2:
+                cleaned.append(t)
+
+    if record:
+        TOKENS_PER_IMAGE.observe(len(cleaned), script="latin")
+    return cleaned
+
+
+def clean_arabic_texts(texts: List[str], record: bool = True) -> List[str]:
+    """
+    Keep the Arabic part of extracted texts for transliterated matching.
+
+    Cleaning steps:
+        - Remove diacritics and tatweel, fold letter variants.
+        - Keep Arabic words only (Latin letters, digits and symbols are dropped).
+        - Keep texts longer than 2 characters.
+
+    Args:
+        texts (List[str]): Raw OCR-extracted texts.
+        record (bool, optional): Count the texts in the per-image token histogram.
+            Defaults to True.
+
+    Returns:
+        List[str]: List of normalized Arabic text strings.
+    """
+    with span("clean"):
+        cleaned = []
+        for t in texts:
+            t = " ".join(ARABIC_WORD_RE.findall(normalize_arabic(t)))
+            if len(t) > 2:
+                cleaned.append(t)
+
+    if record:
+        TOKENS_PER_IMAGE.observe(len(cleaned), script="arabic")
     return cleaned
 
 
 if __name__ == "__main__":
     # Example test for cleaning (without YOLO/EasyOCR)
-    sample_texts = ["Panadol® 500mg", "IBUPROFEN!!", "ok", "12"]
+    sample_texts = ["Panadol® 500mg", "IBUPROFEN!!", "ok", "12", "بانادول ٥٠٠ مجم"]
     cleaned = clean_extracted_texts(sample_texts)
 
     print("Original texts:", sample_texts)
     print("Cleaned texts:", cleaned)
+    print("Cleaned Arabic texts:", clean_arabic_texts(sample_texts))
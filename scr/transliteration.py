@@ -0,0 +1,105 @@
+"""
+Transliteration Module
+
+This module lets Arabic OCR output be matched against the Latin drug names of
+the catalog. Both sides are reduced to a common Latin "skeleton":
+    - Arabic text is normalized (diacritics, tatweel and letter variants
+      removed) and transliterated letter by letter ("بانادول" -> "banadul").
+    - Latin names are spelled the way Arabic writes them: no p/v/g/o/e
+      ("panadol" -> "banadul"), c/q/x as k/s, doubled letters collapsed.
+Skeletons are compared with the same fuzzy scorers as Latin tokens.
+"""
+
+import re
+
+# Arabic letters, including the Persian/Urdu additions (digits, marks and tatweel excluded)
+ARABIC_LETTERS = "ء-غف-يٱ-ۓ"
+ARABIC_WORD_RE = re.compile(f"[{ARABIC_LETTERS}]+")
+LATIN_LETTER_RE = re.compile(r"[A-Za-z]")
+
+# Harakat, superscript alef and tatweel
+ARABIC_MARKS_RE = re.compile("[ً-ْٰـ]")
+
+# Letter variants folded before transliteration
+ARABIC_VARIANTS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و",
+})
+
+# Arabic letter -> Latin skeleton (hard "g" is written ج in Egyptian usage)
+ARABIC_TO_LATIN = str.maketrans({
+    "ا": "a", "ب": "b", "پ": "b", "ت": "t", "ث": "s", "ج": "j", "چ": "sh",
+    "ح": "h", "خ": "kh", "د": "d", "ذ": "z", "ر": "r", "ز": "z", "س": "s",
+    "ش": "sh", "ص": "s", "ض": "d", "ط": "t", "ظ": "z", "ع": "a", "غ": "j",
+    "ف": "f", "ڤ": "f", "ق": "k", "ك": "k", "ک": "k", "گ": "j", "ل": "l",
+    "م": "m", "ن": "n", "ه": "h", "ة": "a", "و": "u", "ي": "i", "ی": "i",
+    "ء": "",
+})
+
+# Latin letters Arabic has no letter for, replaced by the one used instead
+LATIN_TO_SKELETON = str.maketrans("pvgwyoe", "bfjuiui")
+
+
+def text_script(text: str) -> str:
+    """
+    Dominant script of a text.
+
+    Args:
+        text (str): Any text.
+
+    Returns:
+        str: "arabic", "latin" or "none" (no letters), by letter count.
+    """
+    arabic = sum(len(w) for w in ARABIC_WORD_RE.findall(text))
+    latin = len(LATIN_LETTER_RE.findall(text))
+    if not arabic and not latin:
+        return "none"
+    return "arabic" if arabic > latin else "latin"
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Remove diacritics and tatweel and fold letter variants (hamza forms, alef maqsura).
+
+    Args:
+        text (str): Arabic text.
+
+    Returns:
+        str: Normalized text.
+    """
+    return ARABIC_MARKS_RE.sub("", text).translate(ARABIC_VARIANTS)
+
+
+def arabic_skeleton(text: str) -> str:
+    """
+    Latin skeleton of an Arabic text.
+
+    Args:
+        text (str): Arabic text (words separated by spaces).
+
+    Returns:
+        str: Lowercase skeleton, words separated by single spaces.
+    """
+    words = ARABIC_WORD_RE.findall(normalize_arabic(text))
+    return " ".join(_collapse(w.translate(ARABIC_TO_LATIN)) for w in words)
+
+
+def latin_skeleton(name: str) -> str:
+    """
+    Latin skeleton of a Latin drug name, spelled the way Arabic writes it.
+
+    Args:
+        name (str): Drug name or substitute.
+
+    Returns:
+        str: Lowercase skeleton, words separated by single spaces.
+    """
+    s = name.lower().replace("ph", "f").replace("ch", "sh")
+    s = re.sub(r"c(?=[eiy])", "s", s).replace("c", "k").replace("q", "k").replace("x", "ks")
+    s = s.translate(LATIN_TO_SKELETON)
+    return " ".join(_collapse(w) for w in re.findall(r"[a-z]+", s))
+
+
+def _collapse(word: str) -> str:
+    """Collapse repeated letters (Arabic writes doubled consonants once)."""
+    return re.sub(r"(.)\1+", r"\1", word)
@@ -0,0 +1,499 @@
+"""
+Video Scan Module
+
+This module scans a continuous frame stream (a webcam, or a video file for
+testing) for drug names while keeping CPU use bounded:
+    - FrameSampler picks the frames worth processing: only when the picture
+      moved (or at least every max_interval seconds), and never more often
+      than the CPU budget allows given the measured processing time.
+    - BoxTracker follows YOLO boxes across the processed frames by IoU, so a
+      box keeps its identity while the camera moves along a shelf.
+    - VideoScanner runs OCR only on boxes that are new or whose content
+      changed since they were last read, and merges the drug matches of
+      every track.
+"""
+
+import argparse
+import time
+from typing import Iterator, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from scr.drug_matching import match_drug_names
+from scr.text_extraction import clean_arabic_texts, clean_extracted_texts, detect_text_boxes, iter_box_texts
+
+# Share of wall time that detection + OCR of the sampled frames may use
+VIDEO_CPU_BUDGET = 0.5
+
+# Mean absolute difference (0-255) between frame thumbnails that counts as motion
+VIDEO_MOTION_THRESHOLD = 6.0
+
+# Process a frame at least this often, even when nothing moves
+VIDEO_MAX_INTERVAL_SECONDS = 2.0
+
+# Minimum IoU between a box and a track's last box to continue the track
+TRACK_IOU_THRESHOLD = 0.3
+
+# Processed frames a track survives without a matching box
+TRACK_MAX_MISSED = 5
+
+# Mean absolute difference of normalized crop signatures above which a box is read again
+CONTENT_CHANGE_THRESHOLD = 0.35
+
+# Size of the frame thumbnails used for motion, and of the crop signatures
+THUMBNAIL_SIZE = (64, 36)
+SIGNATURE_SIZE = (32, 8)
+
+
+def box_iou(a, b) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def crop_signature(image: np.ndarray, box) -> Optional[np.ndarray]:
+    """
+    Small brightness-normalized grayscale thumbnail of a box, to tell whether its content changed.
+
+    Args:
+        image (np.ndarray): BGR frame.
+        box (tuple): (x1, y1, x2, y2) pixel box.
+
+    Returns:
+        Optional[np.ndarray]: Zero-mean, unit-variance float32 signature, or None for an empty crop.
+    """
+    x1, y1, x2, y2 = box
+    crop = image[y1:y2, x1:x2]
+    if not crop.size:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    return (small - small.mean()) / (small.std() + 1e-6)
+
+
+class FrameSampler:
+    """
+    Decides which frames of a stream are processed.
+
+    Attributes:
+        cpu_budget (float): Share of wall time processing may use (0-1].
+        motion_threshold (float): Thumbnail difference that counts as motion.
+        max_interval (float): Longest time between two processed frames, in seconds.
+    """
+
+    def __init__(self, cpu_budget: float = VIDEO_CPU_BUDGET, motion_threshold: float = VIDEO_MOTION_THRESHOLD,
+                 max_interval: float = VIDEO_MAX_INTERVAL_SECONDS):
+        """
+        Args:
+            cpu_budget (float, optional): Share of wall time processing may use. Defaults to VIDEO_CPU_BUDGET.
+            motion_threshold (float, optional): Motion threshold. Defaults to VIDEO_MOTION_THRESHOLD.
+            max_interval (float, optional): Longest time between processed frames. Defaults to
+                VIDEO_MAX_INTERVAL_SECONDS.
+        """
+        self.cpu_budget = cpu_budget
+        self.motion_threshold = motion_threshold
+        self.max_interval = max_interval
+
+        self._thumbnail = None
+        self._sampled_at = None
+        self._next_allowed = 0.0
+
+    def should_process(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        Whether a frame should be processed.
+
+        Args:
+            frame (np.ndarray): BGR frame.
+            now (float, optional): Current time (time.monotonic() by default).
+
+        Returns:
+            bool: True when the CPU budget allows it and the picture moved since the
+                last processed frame (or max_interval has passed).
+        """
+        now = time.monotonic() if now is None else now
+        if now < self._next_allowed:
+            return False
+
+        thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMBNAIL_SIZE,
+                               interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self._thumbnail is not None and now - self._sampled_at < self.max_interval:
+            if np.abs(thumbnail - self._thumbnail).mean() < self.motion_threshold:
+                return False
+
+        self._thumbnail = thumbnail
+        self._sampled_at = now
+        return True
+
+    def record(self, seconds: float, now: Optional[float] = None) -> None:
+        """
+        Report the processing time of a sampled frame, which delays the next one.
+
+        Args:
+            seconds (float): Processing time.
+            now (float, optional): Current time (time.monotonic() by default).
+        """
+        now = time.monotonic() if now is None else now
+        self._next_allowed = now + seconds * (1 - self.cpu_budget) / self.cpu_budget
+
+
+class Track:
+    """
+    A text box followed across frames.
+
+    Attributes:
+        id (int): Track number.
+        box (tuple): Last (x1, y1, x2, y2) box.
+        missed (int): Processed frames since the box was last seen.
+        signature (np.ndarray): Crop signature when the box was last read.
+        texts (List[str]): Raw OCR texts of the last reading.
+        matches (dict): Best match per matched drug name over all readings.
+        reads (int): Number of OCR readings.
+    """
+
+    def __init__(self, track_id: int, box):
+        self.id = track_id
+        self.box = box
+        self.missed = 0
+        self.signature = None
+        self.texts = []
+        self.matches = {}
+        self.reads = 0
+
+    def add_matches(self, matches: List[dict]) -> None:
+        """Merge the matches of a reading, keeping the best score per drug name."""
+        for m in matches:
+            best = self.matches.get(m["matched_name"])
+            if best is None or m["score"] > best["score"]:
+                self.matches[m["matched_name"]] = m
+
+    def best_match(self) -> Optional[dict]:
+        """Highest-scoring match of the track, if any."""
+        return max(self.matches.values(), key=lambda m: m["score"], default=None)
+
+
+class BoxTracker:
+    """
+    Greedy IoU tracker of boxes across processed frames.
+
+    Attributes:
+        iou_threshold (float): Minimum IoU to continue a track.
+        max_missed (int): Processed frames a track survives without a box.
+        tracks (List[Track]): Live tracks.
+        created (int): Number of tracks started so far.
+    """
+
+    def __init__(self, iou_threshold: float = TRACK_IOU_THRESHOLD, max_missed: int = TRACK_MAX_MISSED):
+        """
+        Args:
+            iou_threshold (float, optional): Minimum IoU to continue a track. Defaults to TRACK_IOU_THRESHOLD.
+            max_missed (int, optional): Frames a track survives unseen. Defaults to TRACK_MAX_MISSED.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self.created = 0
+
+    def update(self, boxes: list) -> List[Track]:
+        """
+        Assign the boxes of a frame to tracks, starting new tracks for unmatched boxes.
+
+        Args:
+            boxes (list): (x1, y1, x2, y2) boxes of the frame.
+
+        Returns:
+            List[Track]: The track of each box, in box order.
+        """
+        pairs = sorted(((box_iou(t.box, b), i, j) for i, t in enumerate(self.tracks) for j, b in enumerate(boxes)),
+                       reverse=True)
+        assigned = [None] * len(boxes)
+        used = set()
+        for score, i, j in pairs:
+            if score < self.iou_threshold:
+                break
+            if i not in used and assigned[j] is None:
+                used.add(i)
+                assigned[j] = self.tracks[i]
+
+        for i, track in enumerate(self.tracks):
+            track.missed = 0 if i in used else track.missed + 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for j, box in enumerate(boxes):
+            if assigned[j] is None:
+                self.created += 1
+                assigned[j] = Track(self.created, box)
+                self.tracks.append(assigned[j])
+            assigned[j].box = box
+
+        return assigned
+
+
+class VideoScanner:
+    """
+    Scans a frame stream: sampled detection, tracking, and OCR of new or changed boxes only.
+
+    Attributes:
+        model: YOLO object detection model instance.
+        reader (easyocr.Reader): Initialized EasyOCR reader.
+        dictionary (list[dict] | DrugIndex): Drug dictionary (None for the configured catalog).
+        sampler (FrameSampler): Frame sampling policy.
+        tracker (BoxTracker): Box tracker.
+        last_frame (np.ndarray): Last processed frame.
+    """
+
+    def __init__(self, model, reader, dictionary=None, conf_threshold: float = 0.5, recognize_only: bool = False,
+                 det_size: Optional[int] = 640, sampler: Optional[FrameSampler] = None,
+                 tracker: Optional[BoxTracker] = None, content_threshold: float = CONTENT_CHANGE_THRESHOLD):
+        """
+        Args:
+            model: YOLO object detection model instance.
+            reader (easyocr.Reader): Initialized EasyOCR reader.
+            dictionary (list[dict] | DrugIndex, optional): Drug dictionary. Defaults to the configured catalog.
+            conf_threshold (float, optional): Confidence threshold for YOLO detections. Defaults to 0.5.
+            recognize_only (bool, optional): Read boxes without EasyOCR's own text detector.
+            det_size (int, optional): Detector input size (see detect_text_boxes). Defaults to 640.
+            sampler (FrameSampler, optional): Frame sampling policy. Defaults to FrameSampler().
+            tracker (BoxTracker, optional): Box tracker. Defaults to BoxTracker().
+            content_threshold (float, optional): Signature difference above which a tracked
+                box is read again. Defaults to CONTENT_CHANGE_THRESHOLD.
+        """
+        self.model = model
+        self.reader = reader
+        self.dictionary = dictionary
+        self.conf_threshold = conf_threshold
+        self.recognize_only = recognize_only
+        self.det_size = det_size
+        self.sampler = sampler or FrameSampler()
+        self.tracker = tracker or BoxTracker()
+        self.content_threshold = content_threshold
+
+        self.last_frame = None
+        self._matches = {}
+        self._counters = {"frames": 0, "processed": 0, "boxes": 0, "ocr_reads": 0, "ocr_skipped": 0,
+                          "processing_seconds": 0.0}
+
+    def feed(self, frame: np.ndarray) -> Optional[dict]:
+        """
+        Offer a frame of the stream; it is processed when the sampler selects it.
+
+        Args:
+            frame (np.ndarray): BGR frame.
+
+        Returns:
+            Optional[dict]: The result of process(), or None for a skipped frame.
+        """
+        self._counters["frames"] += 1
+        if not self.sampler.should_process(frame):
+            return None
+
+        start = time.perf_counter()
+        self.last_frame = frame
+        result = self.process(frame)
+        elapsed = time.perf_counter() - start
+        self._counters["processing_seconds"] += elapsed
+        self.sampler.record(elapsed)
+        return result
+
+    def process(self, frame: np.ndarray) -> dict:
+        """
+        Detect and track the boxes of a frame, and read the new or changed ones.
+
+        Args:
+            frame (np.ndarray): BGR frame.
+
+        Returns:
+            dict: "tracks" (id, box, whether it was read now, best matched name of each box)
+                and "new_matches" (drug names found for the first time in this frame).
+        """
+        boxes = detect_text_boxes(self.model, frame, self.conf_threshold, self.det_size)
+        tracks = self.tracker.update(boxes)
+        self._counters["processed"] += 1
+        self._counters["boxes"] += len(boxes)
+
+        # Read boxes that are new or whose content changed since their last reading
+        to_read, signatures = [], []
+        for track in tracks:
+            signature = crop_signature(frame, track.box)
+            if signature is None:
+                continue
+            if track.signature is None or np.abs(signature - track.signature).mean() > self.content_threshold:
+                to_read.append(track)
+                signatures.append(signature)
+        self._counters["ocr_skipped"] += len(tracks) - len(to_read)
+
+        new_matches = []
+        readings = iter_box_texts(self.reader, frame, [t.box for t in to_read], self.recognize_only)
+        for track, signature, (_, texts) in zip(to_read, signatures, readings):
+            track.signature = signature
+            track.texts = texts
+            track.reads += 1
+            self._counters["ocr_reads"] += 1
+
+            matches = match_drug_names(clean_extracted_texts(texts), dictionary=self.dictionary,
+                                       arabic_texts=clean_arabic_texts(texts))
+            track.add_matches(matches)
+            for m in matches:
+                best = self._matches.get(m["matched_name"])
+                if best is None:
+                    new_matches.append(m["matched_name"])
+                if best is None or m["score"] > best["score"]:
+                    self._matches[m["matched_name"]] = {**m, "track_id": track.id}
+
+        read_ids = {t.id for t in to_read}
+        return {
+            "tracks": [
+                {"id": t.id, "box": list(t.box), "read": t.id in read_ids,
+                 "matched_name": (t.best_match() or {}).get("matched_name")}
+                for t in tracks
+            ],
+            "new_matches": new_matches,
+        }
+
+    def scan(self, frames) -> Iterator[dict]:
+        """
+        Feed a whole frame stream.
+
+        Args:
+            frames (Iterable[np.ndarray]): BGR frames (e.g. iter_frames(source)).
+
+        Yields:
+            dict: The result of each processed frame.
+        """
+        for frame in frames:
+            result = self.feed(frame)
+            if result is not None:
+                yield result
+
+    def matches(self) -> List[dict]:
+        """
+        Merged drug matches of all tracks seen so far.
+
+        Returns:
+            List[dict]: Best match per drug name (with the "track_id" it came from),
+                highest score first.
+        """
+        return sorted(self._matches.values(), key=lambda m: m["score"], reverse=True)
+
+    def stats(self) -> dict:
+        """
+        Scan counters.
+
+        Returns:
+            dict: Frames seen and processed, boxes detected, OCR readings run and
+                skipped (unchanged tracked boxes), tracks created and processing time.
+        """
+        return {**self._counters, "tracks": self.tracker.created}
+
+
+def open_video(source: Union[int, str]) -> cv2.VideoCapture:
+    """
+    Open a webcam (by index) or a video file.
+
+    Args:
+        source (int | str): Camera index (e.g. 0 or "0") or video file path.
+
+    Returns:
+        cv2.VideoCapture: The opened capture.
+
+    Raises:
+        ValueError: If the source cannot be opened.
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source {source!r}")
+    return capture
+
+
+def iter_frames(source: Union[int, str], realtime: bool = True) -> Iterator[np.ndarray]:
+    """
+    Read the frames of a webcam or video file.
+
+    Args:
+        source (int | str): Camera index or video file path.
+        realtime (bool, optional): Play video files at their frame rate, dropping the
+            frames the consumer is too slow for, as a camera would. Defaults to True.
+
+    Yields:
+        np.ndarray: BGR frames.
+    """
+    capture = open_video(source)
+    is_file = not isinstance(source, int) and not str(source).isdigit()
+    fps = capture.get(cv2.CAP_PROP_FPS) if is_file else 0
+    start = time.monotonic()
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if realtime and fps > 0:
+                delay = start + capture.get(cv2.CAP_PROP_POS_MSEC) / 1000 - time.monotonic()
+                if delay < -1 / fps:
+                    continue
+                if delay > 0:
+                    time.sleep(delay)
+            yield frame
+    finally:
+        capture.release()
+
+
+def draw_tracks(frame: np.ndarray, tracks: List[Track]) -> np.ndarray:
+    """
+    Draw the live tracks and their best matches on a copy of a frame.
+
+    Args:
+        frame (np.ndarray): BGR frame.
+        tracks (List[Track]): Tracks to draw (e.g. scanner.tracker.tracks).
+
+    Returns:
+        np.ndarray: Annotated copy of the frame.
+    """
+    image = frame.copy()
+    for track in tracks:
+        if track.missed:
+            continue
+        x1, y1, x2, y2 = track.box
+        best = track.best_match()
+        color = (0, 200, 0) if best else (0, 165, 255)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        label = f"#{track.id} {best['matched_name']}" if best else f"#{track.id}"
+        cv2.putText(image, label, (x1, max(15, y1 - 5)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return image
+
+
+if __name__ == "__main__":
+    # Scan a webcam or video file from the command line and print the matches
+    import config
+    from scr.detector import load_detector
+    from scr.ocr_recognizer import create_reader
+    from scr.script_routing import create_routed_reader
+
+    parser = argparse.ArgumentParser(description="Scan a webcam or video file for drug names")
+    parser.add_argument("source", help="Camera index (e.g. 0) or video file path")
+    parser.add_argument("--no-realtime", action="store_true", help="Read video files as fast as possible")
+    args = parser.parse_args()
+
+    model = load_detector(config.MODEL_PATH, config.DETECTOR_BACKEND)
+    if config.OCR_SCRIPT_ROUTING:
+        reader = create_routed_reader(config.OCR_LANGUAGES, detector=not config.OCR_RECOGNIZE_ONLY,
+                                      mode=config.OCR_RECOGNIZER, onnx_path=config.OCR_RECOGNIZER_ONNX_PATH,
+                                      min_confidence=config.OCR_ROUTING_MIN_CONFIDENCE)
+    else:
+        reader = create_reader(config.OCR_LANGUAGES, detector=not config.OCR_RECOGNIZE_ONLY,
+                               mode=config.OCR_RECOGNIZER, onnx_path=config.OCR_RECOGNIZER_ONNX_PATH)
+
+    scanner = VideoScanner(model, reader, recognize_only=config.OCR_RECOGNIZE_ONLY,
+                           sampler=FrameSampler(config.VIDEO_CPU_BUDGET, config.VIDEO_MOTION_THRESHOLD,
+                                                config.VIDEO_MAX_INTERVAL_SECONDS))
+    for result in scanner.scan(iter_frames(args.source, realtime=not args.no_realtime)):
+        for name in result["new_matches"]:
+            print(f"Found: {name}")
+
+    for m in scanner.matches():
+        print(f"{m['matched_name']:<30} score {m['score']:5.1f}  track #{m['track_id']}  ('{m['extracted_word']}')")
+    print(scanner.stats())
@@ -0,0 +1,24 @@
+"""
+Shared test setup: the repository root on sys.path and the bundled drug CSV.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+# Drug dataset shipped with the repository
+DRUG_CSV = os.path.join(REPO_DIR, "dataset", "durg.csv")
+
+
+@pytest.fixture
+def drug_csv(tmp_path):
+    """Copy of the drug CSV that a test may modify."""
+    path = tmp_path / "drugs.csv"
+    with open(DRUG_CSV, "rb") as f:
+        path.write_bytes(f.read())
+    return str(path)
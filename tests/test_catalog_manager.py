@@ -0,0 +1,94 @@
+"""
+Tests for scr/catalog_manager.py: reloads, row diffs and a failing compile.
+"""
+
+import os
+import time
+from array import array
+
+from scr.catalog_manager import CatalogManager, count_changed_rows
+
+
+def touch_later(path):
+    """Move the file's mtime forward so the change is seen even within one second."""
+    later = time.time() + 5
+    os.utime(path, (later, later))
+
+
+def append_row(path, name):
+    with open(path, "rb") as f:
+        ends_with_newline = f.read().endswith(b"\n")
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if not ends_with_newline:
+            f.write("\r\n")
+        f.write(f"{name},10 mg,once daily,Testing,None,,Test class,Test,false,None\r\n")
+    touch_later(path)
+
+
+def test_count_changed_rows_compares_content():
+    old = array("Q", [1, 2, 3, 4])
+    assert count_changed_rows(old, array("Q", [1, 2, 3, 4])) == 0
+    assert count_changed_rows(old, array("Q", [9, 1, 2, 3, 4])) == 1
+    assert count_changed_rows(old, array("Q", [1, 3, 4])) == 1
+    assert count_changed_rows(old, array("Q", [1, 7, 3, 4])) == 1
+
+
+def test_reload_picks_up_changes(drug_csv):
+    manager = CatalogManager(drug_csv)
+    first = manager.get()
+    rows = len(first.records)
+    assert manager.reload()["status"] == "unchanged"
+
+    append_row(drug_csv, "Testamol")
+    result = manager.reload()
+    assert result["status"] == "loaded"
+    assert result["previous_version"] == first.version
+    assert result["changed_rows"] == 1
+    # No prefilter below prefilter_min_size, so nothing to update incrementally
+    assert result["mode"] == "full"
+
+    snapshot = manager.get()
+    assert snapshot is not first
+    assert len(snapshot.records) == rows + 1
+    assert [m["matched_name"] for m in snapshot.index.match(["testamol"], 90)] == ["testamol"]
+    # The old snapshot is left as it was for requests still using it
+    assert first.index.match(["testamol"], 90) == []
+
+
+def test_incremental_reload_with_prefilter(drug_csv):
+    manager = CatalogManager(drug_csv, prefilter_k=50, incremental_max_changed=0.5)
+    manager.get()
+    append_row(drug_csv, "Testamol")
+    result = manager.reload()
+    assert result["mode"] == "incremental"
+    assert [m["matched_name"] for m in manager.get().index.match(["testamol"], 90)] == ["testamol"]
+
+
+def test_reload_survives_failed_compile(drug_csv, tmp_path):
+    # The compiled file cannot be written: its directory does not exist
+    compiled = str(tmp_path / "missing" / "drugs.catalog")
+    manager = CatalogManager(drug_csv, compiled)
+    assert manager.reload()["status"] == "loaded"
+    assert len(manager.get().records) > 0
+    assert not os.path.exists(compiled)
+
+
+def test_failed_reload_keeps_current_snapshot(drug_csv):
+    manager = CatalogManager(drug_csv)
+    snapshot = manager.get()
+    os.remove(drug_csv)
+    assert manager.reload(force=True)["status"] == "failed"
+    assert manager.get() is snapshot
+
+
+def test_background_reload_is_refused_while_one_runs(drug_csv):
+    manager = CatalogManager(drug_csv)
+    manager.get()
+    with manager._reload_lock:
+        assert manager.reload_in_background() is False
+    previous = manager.last_reload
+    assert manager.reload_in_background(force=True) is True
+    deadline = time.monotonic() + 10
+    while manager.last_reload is previous and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manager.last_reload["status"] == "loaded"
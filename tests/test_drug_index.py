@@ -0,0 +1,67 @@
+"""
+Tests for scr/drug_index.py: every matching mode gives the same matches.
+"""
+
+import pytest
+
+from conftest import DRUG_CSV
+from scr.drug_catalog import load_catalog
+from scr.drug_index import DrugIndex
+from scr.match_memo import MatchMemo
+
+# Exact names, OCR misspellings, dosages, packaging words and noise
+TOKENS = [
+    "Augmentin", "augmntin", "cataflam", "CATAFLAM 50mg", "tablets", "panadol", "amoxicilin",
+    "voltaren", "xyz", "paracetamol", "", "brufen 400", "1g", "Augmentin", "pandol", "tab",
+]
+
+
+@pytest.fixture(scope="module")
+def records():
+    return load_catalog(DRUG_CSV)
+
+
+def summary(matches):
+    return [(m["extracted_word"], m["matched_name"], round(m["score"], 6)) for m in matches]
+
+
+@pytest.mark.parametrize("threshold", [60, 70, 90])
+@pytest.mark.parametrize("batched, cascade", [(True, False), (False, True), (True, True)])
+def test_modes_match_the_reference(records, threshold, batched, cascade):
+    index = DrugIndex(records)
+    expected = summary(index.match(TOKENS, threshold))
+    assert expected
+    assert summary(index.match(TOKENS, threshold, batched=batched, cascade=cascade)) == expected
+
+
+@pytest.mark.parametrize("batched, cascade", [(False, False), (True, True)])
+def test_prefilter_matches_the_reference(records, batched, cascade):
+    expected = summary(DrugIndex(records).match(TOKENS, 70))
+    index = DrugIndex(records, prefilter_k=50)
+    assert index.prefilter_k == 50
+    assert summary(index.match(TOKENS, 70, batched=batched, cascade=cascade)) == expected
+
+
+def test_prefilter_below_min_size_is_disabled(records):
+    index = DrugIndex(records, prefilter_k=50, prefilter_min_size=len(records) * 10)
+    assert index.prefilter_k == 0
+
+
+def test_memo_matches_the_reference(records, tmp_path):
+    index = DrugIndex(records, version="v1")
+    memo = MatchMemo(str(tmp_path / "memo.sqlite"))
+    # Cold, warm, then other thresholds answered from (or past) the stored entries
+    for threshold in [70, 70, 90, 60, 70]:
+        expected = summary(index.match(TOKENS, threshold))
+        assert summary(index.match(TOKENS, threshold, memo=memo)) == expected
+        assert summary(index.match(TOKENS, threshold, batched=True, cascade=True, memo=memo)) == expected
+    stats = memo.stats()
+    assert stats["local_hits"] > 0
+    assert stats["errors"] == 0
+
+
+def test_memo_is_ignored_without_version(records, tmp_path):
+    index = DrugIndex(records)
+    memo = MatchMemo(str(tmp_path / "memo.sqlite"))
+    index.match(TOKENS, 70, memo=memo)
+    assert memo.stats()["misses"] == 0
@@ -0,0 +1,71 @@
+"""
+Tests for scr/generative_client.py: coalescing and admission of backend calls.
+"""
+
+import asyncio
+
+import pytest
+
+from scr.generative_client import AsyncGenerativeClient, FakeGenerativeBackend
+from scr.inference_pool import QueueFullError
+
+
+def test_identical_requests_are_coalesced():
+    backend = FakeGenerativeBackend(latency_ms=50)
+    client = AsyncGenerativeClient(backend)
+
+    async def run():
+        return await asyncio.gather(*(client.generate_json(b"image", "prompt") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert backend.calls == 1
+    assert all(result == results[0] for result in results)
+    assert client.stats()["coalesced"] == 4
+    assert client.stats()["in_flight"] == 0
+
+
+def test_different_requests_are_not_coalesced():
+    backend = FakeGenerativeBackend(latency_ms=10)
+    client = AsyncGenerativeClient(backend)
+
+    async def run():
+        await asyncio.gather(client.generate_json(b"image", "prompt"),
+                             client.generate_json(b"image", "other prompt"),
+                             client.generate_json(b"other image", "prompt"))
+
+    asyncio.run(run())
+    assert backend.calls == 3
+    assert client.stats()["coalesced"] == 0
+
+
+def test_rejects_when_queue_is_full():
+    backend = FakeGenerativeBackend(latency_ms=100)
+    client = AsyncGenerativeClient(backend, max_concurrency=1, max_queue=1)
+
+    async def run():
+        return await asyncio.gather(*(client.generate_json(bytes([i]), "prompt") for i in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    # One call runs, one waits for its slot and the third is turned away
+    rejected = [r for r in results if isinstance(r, QueueFullError)]
+    assert len(rejected) == 1
+    assert rejected[0].retry_after == client.retry_after
+    assert backend.calls == 2
+    assert backend.max_concurrent == 1
+    assert client.stats()["rejected"] == 1
+
+
+def test_rejected_request_is_not_retried():
+    backend = FakeGenerativeBackend(latency_ms=50)
+    client = AsyncGenerativeClient(backend, max_concurrency=1, max_queue=0, max_attempts=3)
+
+    async def run():
+        first = asyncio.ensure_future(client.generate_json(b"a", "prompt"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError):
+            await client.generate_json(b"b", "prompt")
+        await first
+
+    asyncio.run(run())
+    assert client.stats()["retries"] == 0
@@ -0,0 +1,48 @@
+"""
+Tests for decode_image in scr/image_processing.py.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from scr.image_processing import decode_image, image_size
+
+
+def encode(image, ext):
+    ok, buffer = cv2.imencode(ext, image)
+    assert ok
+    return buffer.tobytes()
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"not an image",
+    b"\xff\xd8\xff\xe0" + b"\x00" * 16,  # JPEG signature with nothing behind it
+    b"\x89PNG\r\n\x1a\n" + b"\x00" * 16,  # PNG signature with nothing behind it
+    bytes(range(256)) * 4,
+])
+def test_empty_or_garbage_data_gives_none(data):
+    assert decode_image(data) is None
+
+
+def test_truncated_jpeg_does_not_raise():
+    data = encode(np.full((400, 600, 3), 128, np.uint8), ".jpg")
+    result = decode_image(data[:len(data) // 3])
+    assert result is None or result.ndim == 3
+
+
+@pytest.mark.parametrize("ext", [".png", ".jpg"])
+def test_small_image_keeps_its_size(ext):
+    image = np.zeros((120, 200, 3), np.uint8)
+    image[:, 100:] = 255
+    decoded = decode_image(encode(image, ext), max_side=1000)
+    assert decoded.shape == (120, 200, 3)
+
+
+def test_large_jpeg_is_capped():
+    data = encode(np.full((3000, 4000, 3), 200, np.uint8), ".jpg")
+    assert image_size(data) == (4000, 3000)
+    decoded = decode_image(data, max_side=1000)
+    assert max(decoded.shape[:2]) == 1000
+    assert decoded.shape[1] > decoded.shape[0]
@@ -0,0 +1,85 @@
+"""
+Tests for scr/match_memo.py: thresholds, sharing between instances and version switches.
+"""
+
+import pytest
+
+from scr.match_memo import MatchMemo
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "memo.sqlite")
+
+
+def test_match_is_recalled_at_any_threshold(path):
+    memo = MatchMemo(path)
+    memo.put_many("v1", {"panadol": (3, 95.0)}, 70)
+    for threshold in (50, 70, 99):
+        # The caller compares the score with its threshold
+        assert memo.get_many("v1", ["panadol"], threshold) == {"panadol": (3, 95.0)}
+
+
+def test_no_match_holds_for_higher_thresholds_only(path):
+    memo = MatchMemo(path)
+    # A best score under the threshold is stored as "nothing reaches 70"
+    memo.put_many("v1", {"xyz": (5, 60.0), "abc": None}, 70)
+    assert memo.get_many("v1", ["xyz", "abc"], 70) == {"xyz": None, "abc": None}
+    assert memo.get_many("v1", ["xyz", "abc"], 90) == {"xyz": None, "abc": None}
+    # At a lower threshold the token has to be scored again
+    assert memo.get_many("v1", ["xyz", "abc"], 50) == {}
+
+
+def test_lower_threshold_result_replaces_no_match(path):
+    memo = MatchMemo(path)
+    memo.put_many("v1", {"xyz": None}, 70)
+    memo.put_many("v1", {"xyz": (5, 60.0)}, 50)
+    assert memo.get_many("v1", ["xyz"], 50) == {"xyz": (5, 60.0)}
+    assert memo.get_many("v1", ["xyz"], 70) == {"xyz": (5, 60.0)}
+
+
+def test_entries_are_shared_through_the_file(path):
+    MatchMemo(path).put_many("v1", {"panadol": (3, 95.0), "xyz": None}, 70)
+    other = MatchMemo(path)
+    assert other.get_many("v1", ["panadol", "xyz", "unknown"], 70) == {"panadol": (3, 95.0), "xyz": None}
+    assert other.stats()["shared_hits"] == 2
+    assert other.stats()["misses"] == 1
+    assert other.get_many("v2", ["panadol"], 70) == {}
+
+
+def test_switch_drops_only_the_replaced_version(path):
+    memo = MatchMemo(path)
+    memo.switch("v1")
+    memo.put_many("v1", {"panadol": (3, 95.0)}, 70)
+    memo.put_many("v0", {"panadol": (2, 90.0)}, 70)
+
+    memo.switch("v2")
+    memo.put_many("v2", {"panadol": (4, 99.0)}, 70)
+    other = MatchMemo(path)
+    for instance in (memo, other):
+        assert instance.get_many("v1", ["panadol"], 70) == {}
+        assert instance.get_many("v0", ["panadol"], 70) == {"panadol": (2, 90.0)}
+        assert instance.get_many("v2", ["panadol"], 70) == {"panadol": (4, 99.0)}
+
+    # Switching to the current version again keeps its entries
+    memo.switch("v2")
+    assert memo.get_many("v2", ["panadol"], 70) == {"panadol": (4, 99.0)}
+
+
+def test_shared_table_is_trimmed(path):
+    memo = MatchMemo(path, max_entries=100, local_entries=10)
+    for start in range(0, 300, 50):
+        memo.put_many("v1", {f"token{i}": (i, 90.0) for i in range(start, start + 50)}, 70)
+    memo._trim()
+    found = MatchMemo(path).get_many("v1", [f"token{i}" for i in range(300)], 70)
+    assert len(found) == 100
+    assert "token299" in found
+
+
+def test_unusable_file_disables_the_memo(tmp_path):
+    memo = MatchMemo(str(tmp_path / "missing" / "memo.sqlite"))
+    memo.put_many("v1", {"panadol": (3, 95.0)}, 70)
+    # The in-process LRU still answers, and the failed connect is not retried
+    assert memo.get_many("v1", ["panadol"], 70) == {"panadol": (3, 95.0)}
+    assert memo.get_many("v1", ["other"], 70) == {}
+    assert memo.stats()["errors"] == 1